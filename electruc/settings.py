@@ -5,6 +5,8 @@ from pathlib import Path
 import os
 import importlib.util
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Base directory of the project.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -72,10 +74,13 @@ HAS_WHITENOISE = importlib.util.find_spec("whitenoise") is not None
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    # Outside the session middleware so session writes also pin reads to the primary.
+    "portal.routers.ReplicaRoutingMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "portal.account.account_middleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -103,14 +108,143 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "electruc.wsgi.application"
+ASGI_APPLICATION = "electruc.asgi.application"
+
+# Warm each process at startup (reportlab, templates, branding, DB). See portal/warmup.py.
+PORTAL_WARMUP = os.environ.get("PORTAL_WARMUP", "0") == "1"
+
+# Anonymous full-page cache for home/services/faq/contact (0 disables it).
+PAGE_CACHE_SECONDS = int(os.environ.get("PAGE_CACHE_SECONDS", "600"))
+PAGE_CACHE_ALIAS = os.environ.get("PAGE_CACHE_ALIAS", "default")
+# Pinned deploy version (e.g. git sha); empty = hash of the templates and static manifest.
+PAGE_CACHE_VERSION = os.environ.get("PAGE_CACHE_VERSION", "")
+
+# Cross-request cache of request.account (profile + contract + meter point), 0 = per request only.
+ACCOUNT_CACHE_SECONDS = int(os.environ.get("ACCOUNT_CACHE_SECONDS", "0"))
+# Tariff price index (portal/tariffs.py): seconds between checks of the shared version key.
+TARIFF_INDEX_CHECK_SECONDS = float(os.environ.get("TARIFF_INDEX_CHECK_SECONDS", "5"))
 
-# Database (SQLite for simple development use).
-DATABASES = {
+# Async client views (only useful under ASGI, e.g. gunicorn with uvicorn workers).
+PORTAL_ASYNC_VIEWS = os.environ.get("PORTAL_ASYNC_VIEWS", "0") == "1"
+# Threads available to async views for PDF rendering and password hashing.
+BLOCKING_POOL_WORKERS = int(os.environ.get("BLOCKING_POOL_WORKERS", "4"))
+
+def _postgres_database(prefix="POSTGRES_"):
+    """Build a PostgreSQL DATABASES entry from environment variables."""
+    def env(name, default):
+        # Replica settings fall back to the primary ones (same database, user, ...).
+        return os.environ.get(f"{prefix}{name}", os.environ.get(f"POSTGRES_{name}", default))
+
+    database = {
+        "ENGINE": "django.db.backends.postgresql",
+        "NAME": env("DB", "electruc"),
+        "USER": env("USER", "electruc"),
+        "PASSWORD": env("PASSWORD", ""),
+        "HOST": env("HOST", "localhost"),
+        "PORT": env("PORT", "5432"),
+        "CONN_HEALTH_CHECKS": os.environ.get("DB_CONN_HEALTH_CHECKS", "1") == "1",
+        # Must be True behind a transaction-mode pgbouncer (named cursors do not survive it).
+        "DISABLE_SERVER_SIDE_CURSORS": os.environ.get("DB_DISABLE_SERVER_SIDE_CURSORS", "0") == "1",
+        "OPTIONS": {},
+    }
+    if os.environ.get("DB_POOL", "1") == "1":
+        # psycopg_pool inside each worker; persistent connections must stay disabled.
+        database["CONN_MAX_AGE"] = 0
+        database["OPTIONS"]["pool"] = {
+            "min_size": int(os.environ.get("DB_POOL_MIN_SIZE", "2")),
+            "max_size": int(os.environ.get("DB_POOL_MAX_SIZE", "10")),
+            "timeout": float(os.environ.get("DB_POOL_TIMEOUT", "10")),
+        }
+    else:
+        database["CONN_MAX_AGE"] = int(os.environ.get("DB_CONN_MAX_AGE", "60"))
+    return database
+
+
+# Database: SQLite by default, PostgreSQL with DB_ENGINE=postgresql.
+DB_ENGINE = os.environ.get("DB_ENGINE", "sqlite")
+if DB_ENGINE == "postgresql":
+    DATABASES = {"default": _postgres_database()}
+    # Optional streaming replica, used by read-only client views (see portal/routers.py).
+    if os.environ.get("POSTGRES_REPLICA_HOST"):
+        DATABASES["replica"] = _postgres_database("POSTGRES_REPLICA_")
+        DATABASES["replica"]["TEST"] = {"MIRROR": "default"}
+else:
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": os.environ.get("SQLITE_PATH", BASE_DIR / "db.sqlite3"),
+        }
+    }
+
+DATABASE_ROUTERS = ["portal.routers.PrimaryReplicaRouter"]
+# After a write, the browser reads from the primary for this long (covers replication lag).
+REPLICA_PIN_SECONDS = int(os.environ.get("REPLICA_PIN_SECONDS", "15"))
+
+# Opt-in SQLite production profile (several gunicorn workers sharing one file).
+# Pragmas are applied on connection_created (see portal/db.py).
+SQLITE_PRODUCTION_PROFILE = os.environ.get("SQLITE_PRODUCTION_PROFILE", "0") == "1"
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": SQLITE_BUSY_TIMEOUT_MS,
+    "mmap_size": int(os.environ.get("SQLITE_MMAP_SIZE", str(128 * 1024 * 1024))),
+    # Negative value = size in KiB.
+    "cache_size": int(os.environ.get("SQLITE_CACHE_SIZE", "-20000")),
+    "temp_store": "MEMORY",
+}
+if SQLITE_PRODUCTION_PROFILE and DB_ENGINE != "postgresql":
+    DATABASES["default"]["OPTIONS"] = {
+        # Take the write lock at BEGIN so readers-turned-writers never deadlock.
+        "transaction_mode": "IMMEDIATE",
+        "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000,
+    }
+
+# Cache: locmem (dev, one per process), file or db (shared by the workers of one node),
+# redis (any Redis-protocol server). CACHE_LOCATION overrides the backend default.
+CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "locmem")
+_CACHE_BACKENDS = {
+    "locmem": ("django.core.cache.backends.locmem.LocMemCache", "electruc"),
+    "file": ("django.core.cache.backends.filebased.FileBasedCache", str(BASE_DIR / "cache")),
+    "db": ("django.core.cache.backends.db.DatabaseCache", "portal_cache"),
+    "redis": ("django.core.cache.backends.redis.RedisCache", "redis://127.0.0.1:6379/0"),
+}
+if CACHE_BACKEND not in _CACHE_BACKENDS:
+    raise ImproperlyConfigured(f"CACHE_BACKEND must be one of {', '.join(_CACHE_BACKENDS)}.")
+CACHES = {
     "default": {
+        "BACKEND": _CACHE_BACKENDS[CACHE_BACKEND][0],
+        "LOCATION": os.environ.get("CACHE_LOCATION", _CACHE_BACKENDS[CACHE_BACKEND][1]),
+        "TIMEOUT": int(os.environ.get("CACHE_TIMEOUT", "300")),
+        "KEY_PREFIX": os.environ.get("CACHE_KEY_PREFIX", "electruc"),
+    }
+}
+if CACHE_BACKEND != "redis":
+    CACHES["default"]["OPTIONS"] = {"MAX_ENTRIES": int(os.environ.get("CACHE_MAX_ENTRIES", "10000"))}
+# db cache in its own SQLite file, so cache writes never wait on the application database lock
+# (routed by portal.routers; create the table with `createcachetable --database cache`).
+if CACHE_BACKEND == "db" and os.environ.get("CACHE_SQLITE_PATH"):
+    DATABASES["cache"] = {
         "ENGINE": "django.db.backends.sqlite3",
-        "NAME": os.environ.get("SQLITE_PATH", BASE_DIR / "db.sqlite3"),
+        "NAME": os.environ["CACHE_SQLITE_PATH"],
     }
+    if SQLITE_PRODUCTION_PROFILE:
+        DATABASES["cache"]["OPTIONS"] = {"transaction_mode": "IMMEDIATE", "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000}
+
+# Sessions: db (default), cached_db (reads served by the shared cache, writes go through to the
+# database) or signed_cookies (nothing stored server side, no session table traffic at all).
+SESSION_BACKEND = os.environ.get("SESSION_BACKEND", "db")
+_SESSION_ENGINES = {
+    "db": "django.contrib.sessions.backends.db",
+    "cached_db": "django.contrib.sessions.backends.cached_db",
+    "signed_cookies": "django.contrib.sessions.backends.signed_cookies",
 }
+if SESSION_BACKEND not in _SESSION_ENGINES:
+    raise ImproperlyConfigured(f"SESSION_BACKEND must be one of {', '.join(_SESSION_ENGINES)}.")
+if SESSION_BACKEND == "cached_db" and CACHE_BACKEND == "locmem" and not DEBUG:
+    # A per-process cache would keep serving a session another worker has logged out.
+    raise ImproperlyConfigured("SESSION_BACKEND=cached_db needs a shared cache (CACHE_BACKEND=file, db or redis).")
+SESSION_ENGINE = _SESSION_ENGINES[SESSION_BACKEND]
 
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
@@ -127,13 +261,52 @@ USE_TZ = True
 
 STATIC_URL = "/static/"
 STATIC_ROOT = BASE_DIR / "staticfiles"
-if HAS_WHITENOISE:
-    STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {
+        "BACKEND": (
+            "whitenoise.storage.CompressedManifestStaticFilesStorage"
+            if HAS_WHITENOISE
+            else "django.contrib.staticfiles.storage.StaticFilesStorage"
+        )
+    },
+}
+# Identical uploads stored once (hard links to blobs/<aa>/<sha256>, see portal/storage.py).
+if os.environ.get("MEDIA_DEDUP", "0") == "1":
+    STORAGES["default"]["BACKEND"] = "portal.storage.DedupFileSystemStorage"
 
 # Media files (uploads)
 MEDIA_URL = "media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Smart-meter interval data (portal/intervals.py): memory-mapped columns per meter point and month.
+INTERVAL_DATA_ROOT = Path(os.environ.get("INTERVAL_DATA_ROOT", BASE_DIR / "intervals"))
+
+# Uploads: customer files are checked while streaming (portal/uploads.py); small files stay in
+# memory, larger ones are spooled to a temporary file.
+FILE_UPLOAD_HANDLERS = [
+    "portal.uploads.RestrictedUploadHandler",
+    "django.core.files.uploadhandler.MemoryFileUploadHandler",
+    "django.core.files.uploadhandler.TemporaryFileUploadHandler",
+]
+FILE_UPLOAD_MAX_MEMORY_SIZE = int(os.environ.get("FILE_UPLOAD_MAX_MEMORY_SIZE", str(512 * 1024)))
+# Non-file form fields only (forms here are a few KB; admin bulk actions stay well below).
+DATA_UPLOAD_MAX_MEMORY_SIZE = int(os.environ.get("DATA_UPLOAD_MAX_MEMORY_SIZE", str(256 * 1024)))
+DATA_UPLOAD_MAX_NUMBER_FILES = int(os.environ.get("DATA_UPLOAD_MAX_NUMBER_FILES", "10"))
+# Whole multipart body of a customer upload view: larger bodies are refused without being read.
+UPLOAD_MAX_REQUEST_SIZE = int(os.environ.get("UPLOAD_MAX_REQUEST_SIZE", str(25 * 1024 * 1024)))
+
+# Stored-file downloads: "" (streamed by Django), "x-accel" (nginx) or "x-sendfile" (Apache, lighttpd).
+DOWNLOAD_OFFLOAD = os.environ.get("DOWNLOAD_OFFLOAD", "")
+if DOWNLOAD_OFFLOAD not in ("", "x-accel", "x-sendfile"):
+    raise ImproperlyConfigured("DOWNLOAD_OFFLOAD must be empty, x-accel or x-sendfile.")
+# Lifetime of the signed document URLs shown in the client area (seconds, rounded up to a window).
+SIGNED_DOWNLOAD_SECONDS = int(os.environ.get("SIGNED_DOWNLOAD_SECONDS", "300"))
+if SIGNED_DOWNLOAD_SECONDS <= 0:
+    raise ImproperlyConfigured("SIGNED_DOWNLOAD_SECONDS must be a positive number of seconds.")
+# nginx `internal` location aliased to MEDIA_ROOT (see deploy/nginx.conf).
+DOWNLOAD_ACCEL_PREFIX = os.environ.get("DOWNLOAD_ACCEL_PREFIX", "/protected-media/")
+
 # Auth redirects (simple defaults for public pages).
 LOGIN_URL = "login"
 LOGIN_REDIRECT_URL = "/espace-client/"
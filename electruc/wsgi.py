@@ -5,3 +5,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "electruc.settings")
 
 application = get_wsgi_application()
+
+from portal.warmup import warm_up_server  # noqa: E402 (needs the apps loaded above)
+
+warm_up_server()
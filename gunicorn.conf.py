@@ -0,0 +1,20 @@
+"""Gunicorn configuration: load (and warm) the app once in the master, then fork workers."""
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("GUNICORN_WORKERS", "3"))
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "sync")
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "60"))
+
+# Workers fork from a master that already imported Django, reportlab and compiled templates
+# (PORTAL_WARMUP=1), so the first request of a (re)started worker is not a cold one.
+preload_app = True
+
+
+def post_fork(server, worker):
+    from django.conf import settings
+
+    if settings.PORTAL_WARMUP:
+        from portal.warmup import warm_database
+
+        warm_database()
@@ -0,0 +1,124 @@
+"""Request-scoped customer bundle: profile, current contract and meter point of the logged-in user."""
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.utils.decorators import sync_and_async_middleware
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.functional import SimpleLazyObject
+
+from .models import Contract, CustomerProfile
+from .user_cache import invalidate_user_cache, user_cache_key
+
+ACCOUNT_CACHE_NAME = "account"
+
+
+class Account:
+    """What the client views need about a customer, loaded once per request."""
+
+    def __init__(self, user, profile=None, contract=None):
+        self.user = user
+        self.profile = profile
+        self.contract = contract
+
+    @property
+    def meter_point(self):
+        return self.contract.meter_point if self.contract else None
+
+    def __bool__(self):
+        return self.user.is_authenticated
+
+
+def _load(user):
+    # One query in the common case: latest contract + user + profile + meter point.
+    contract = (
+        Contract.objects.select_related("user__customerprofile", "meter_point")
+        .filter(user=user)
+        .order_by("-start_date")
+        .first()
+    )
+    if contract is not None:
+        return getattr(contract.user, "customerprofile", None), contract
+    return CustomerProfile.objects.filter(user=user).first(), None
+
+
+def _set_user(user, profile, contract):
+    """Detach (user=None) or re-attach the User cached on the loaded instances.
+
+    The shared cache must not hold the User (password hash, permissions): it is dropped before
+    caching and the request's user is put back on the copies read from the cache.
+    """
+    for instance in (profile, contract):
+        if instance is None:
+            continue
+        field = type(instance).user.field
+        if user is not None:
+            field.set_cached_value(instance, user)
+        elif field.is_cached(instance):
+            field.delete_cached_value(instance)
+
+
+def get_account(user) -> Account:
+    """Build the Account of a user, from the cache when ACCOUNT_CACHE_SECONDS > 0."""
+    if not user.is_authenticated:
+        return Account(user)
+    if settings.ACCOUNT_CACHE_SECONDS <= 0:
+        return Account(user, *_load(user))
+    key = user_cache_key(user.pk, ACCOUNT_CACHE_NAME)
+    cached = cache.get(key)
+    if cached is None:
+        cached = _load(user)
+        _set_user(None, *cached)
+        cache.set(key, cached, settings.ACCOUNT_CACHE_SECONDS)
+    _set_user(user, *cached)
+    return Account(user, *cached)
+
+
+aget_account = sync_to_async(get_account)
+
+
+@sync_and_async_middleware
+def account_middleware(get_response):
+    """Attach a lazy request.account (place after AuthenticationMiddleware)."""
+    if iscoroutinefunction(get_response):
+
+        async def middleware(request):
+            # Async views load it explicitly with aget_account() (no sync queries in the event loop).
+            request.account = SimpleLazyObject(lambda: get_account(request.user))
+            return await get_response(request)
+
+    else:
+
+        def middleware(request):
+            request.account = SimpleLazyObject(lambda: get_account(request.user))
+            return get_response(request)
+
+    return middleware
+
+
+def invalidate_account(sender, instance, **kwargs):
+    """post_save/post_delete receiver: drop the cached Account of the customers concerned."""
+    if settings.ACCOUNT_CACHE_SECONDS <= 0:
+        return
+    if sender is Contract or sender is CustomerProfile:
+        user_ids = [instance.user_id]
+    elif hasattr(instance, "_account_user_ids"):  # MeterPoint deleted: contracts already SET_NULL
+        user_ids = instance._account_user_ids
+    else:  # MeterPoint
+        user_ids = Contract.objects.filter(meter_point=instance).values_list("user_id", flat=True)
+    for user_id in user_ids:
+        invalidate_user_cache(user_id)
+
+
+def remember_meter_point_customers(sender, instance, **kwargs):
+    """pre_delete receiver: note the customers of a meter point before its contracts are unlinked."""
+    if settings.ACCOUNT_CACHE_SECONDS > 0:
+        instance._account_user_ids = list(
+            Contract.objects.filter(meter_point=instance).values_list("user_id", flat=True)
+        )
+
+
+def invalidate_meter_point_accounts(meter_point_ids):
+    """Drop the cached Account of customers on these meter points (bulk updates send no signal)."""
+    if settings.ACCOUNT_CACHE_SECONDS <= 0:
+        return
+    for user_id in Contract.objects.filter(meter_point_id__in=meter_point_ids).values_list("user_id", flat=True):
+        invalidate_user_cache(user_id)
@@ -1,10 +1,8 @@
 ﻿"""Admin registrations for portal models."""
 import csv
-import calendar
 import random
-from datetime import date
 from datetime import timedelta
-from decimal import Decimal
+from decimal import Decimal, InvalidOperation
 from pathlib import Path
 
 from django import forms
@@ -12,10 +10,16 @@ from django.conf import settings
 from django.contrib import admin, messages
 from django.http import HttpResponse
 from django.contrib.auth import get_user_model
+from django.db import DatabaseError, transaction
+from django.db.models import Q
 from django.shortcuts import redirect, render
 from django.urls import path, reverse
 from django.utils import timezone
+from django.utils.html import format_html
 
+from . import simulator
+from .account import invalidate_meter_point_accounts
+from .billing import month_period, parse_period
 from .models import (
     Attachment,
     Contract,
@@ -27,6 +31,8 @@ from .models import (
     MeterPointHistory,
     MeterReading,
     SupportRequest,
+    Tariff,
+    TariffPrice,
 )
 
 
@@ -34,6 +40,40 @@ class MeterPointCSVImportForm(forms.Form):
     csv_file = forms.FileField(label="Fichier CSV")
 
 
+class TariffSimulationForm(forms.Form):
+    period_from = forms.CharField(label="Du mois (AAAA-MM)", max_length=7)
+    period_to = forms.CharField(label="Au mois (AAAA-MM)", max_length=7)
+    fixed_price = forms.DecimalField(
+        label="Prix fixe (EUR/kWh)", max_digits=6, decimal_places=4, min_value=0, required=False
+    )
+    standing_charge = forms.DecimalField(
+        label="Redevance mensuelle (EUR)", max_digits=8, decimal_places=2, min_value=0, required=False
+    )
+    variable_prices = forms.CharField(
+        label="Prix variables janvier..décembre (EUR/kWh, séparés par des virgules)", required=False
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        for field in ("period_from", "period_to"):
+            try:
+                parse_period(cleaned_data.get(field, ""))
+            except ValueError as exc:
+                self.add_error(field, str(exc))
+        raw_prices = (cleaned_data.get("variable_prices") or "").strip()
+        cleaned_data["variable_prices"] = None
+        if raw_prices:
+            try:
+                prices = [Decimal(value.strip()) for value in raw_prices.split(",")]
+            except InvalidOperation:
+                prices = []
+            if len(prices) != 12 or any(price < 0 for price in prices):
+                self.add_error("variable_prices", "12 prix positifs attendus (janvier à décembre).")
+            else:
+                cleaned_data["variable_prices"] = prices
+        return cleaned_data
+
+
 def _read_csv_rows_from_text(text):
     return csv.DictReader(text.splitlines())
 
@@ -48,78 +88,165 @@ def _decode_csv_bytes(raw_bytes: bytes) -> str:
     return raw_bytes.decode("utf-8", errors="replace")
 
 
-def _month_period(anchor: date, month_offset: int):
-    target_month = anchor.month + month_offset
-    target_year = anchor.year + (target_month - 1) // 12
-    target_month = ((target_month - 1) % 12) + 1
-    period_start = date(target_year, target_month, 1)
-    last_day = calendar.monthrange(target_year, target_month)[1]
-    period_end = date(target_year, target_month, last_day)
-    return period_start, period_end
-
-
-def ensure_meter_point_history(meter_point, months=5):
+IMPORT_BATCH_SIZE = 500
+RESET_BATCH_SIZE = 1000
+METER_POINT_IMPORT_FIELDS = [
+    "address_line1",
+    "address_line2",
+    "postal_code",
+    "city",
+    "country",
+    "holder_firstname",
+    "holder_lastname",
+]
+
+
+def _chunked(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _meter_point_history_items(meter_point, months=5):
+    """Unsaved history rows for the closed months preceding today (deterministic per EAN)."""
     today = timezone.localdate()
-    # Build history for the 5 closed months preceding the import date.
+    items = []
     for offset in range(-months, 0):
-        period_start, period_end = _month_period(today, offset)
+        period_start, period_end = month_period(today, offset)
         seed = f"{meter_point.ean}-{period_start.isoformat()}"
         rng = random.Random(seed)
         consumption = rng.randint(180, 520)
         amount = (Decimal(consumption) * Decimal("0.28")).quantize(Decimal("0.01"))
+        items.append(
+            MeterPointHistory(
+                meter_point=meter_point,
+                period_start=period_start,
+                period_end=period_end,
+                reading_date=period_end,
+                consumption_kwh=consumption,
+                amount_eur=amount,
+            )
+        )
+    return items
+
+
+def ensure_meter_point_history(meter_point, months=5):
+    # Build history for the 5 closed months preceding the import date.
+    for item in _meter_point_history_items(meter_point, months):
         MeterPointHistory.objects.update_or_create(
             meter_point=meter_point,
-            period_start=period_start,
+            period_start=item.period_start,
             defaults={
-                "period_end": period_end,
-                "reading_date": period_end,
-                "consumption_kwh": consumption,
-                "amount_eur": amount,
+                "period_end": item.period_end,
+                "reading_date": item.reading_date,
+                "consumption_kwh": item.consumption_kwh,
+                "amount_eur": item.amount_eur,
             },
         )
 
 
-def import_meter_point_row(row):
+def _meter_point_from_row(row):
     ean = (row.get("meter_ean") or row.get("ean") or "").strip()
     if not ean:
         raise ValueError("EAN manquant")
 
-    supply_address = (row.get("supply_address") or "").strip()
-    postal_code = (row.get("supply_postcode") or "").strip()
-    city = (row.get("supply_city") or "").strip()
+    meter_point = MeterPoint(
+        ean=ean,
+        address_line1=(row.get("supply_address") or "").strip(),
+        address_line2="",
+        postal_code=(row.get("supply_postcode") or "").strip(),
+        city=(row.get("supply_city") or "").strip(),
+        country="BE",
+        holder_firstname=(row.get("firstname") or "").strip(),
+        holder_lastname=(row.get("lastname") or "").strip(),
+    )
+    # Bulk upserts skip model validation: reject rows PostgreSQL would refuse.
+    for field_name in ["ean", *METER_POINT_IMPORT_FIELDS]:
+        if len(getattr(meter_point, field_name)) > MeterPoint._meta.get_field(field_name).max_length:
+            raise ValueError(f"Valeur trop longue: {field_name}")
+    return meter_point
 
-    defaults = {
-        "address_line1": supply_address,
-        "address_line2": "",
-        "postal_code": postal_code,
-        "city": city,
-        "country": "BE",
-        "holder_firstname": (row.get("firstname") or "").strip(),
-        "holder_lastname": (row.get("lastname") or "").strip(),
-    }
 
+def import_meter_point_row(row):
+    meter_point = _meter_point_from_row(row)
     meter_point, created = MeterPoint.objects.update_or_create(
-        ean=ean,
-        defaults=defaults,
+        ean=meter_point.ean,
+        defaults={field_name: getattr(meter_point, field_name) for field_name in METER_POINT_IMPORT_FIELDS},
     )
     ensure_meter_point_history(meter_point)
     return created, not created
 
 
-def import_meter_points_from_reader(reader):
+def _import_meter_point_batch(meter_points):
+    """Upsert meter points and their history in two bulk statements; return created EANs."""
+    existing_eans = set(
+        MeterPoint.objects.filter(ean__in=[item.ean for item in meter_points]).values_list("ean", flat=True)
+    )
+    with transaction.atomic():
+        meter_points = MeterPoint.objects.bulk_create(
+            meter_points,
+            update_conflicts=True,
+            unique_fields=["ean"],
+            update_fields=METER_POINT_IMPORT_FIELDS,
+        )
+        if any(item.pk is None for item in meter_points):
+            pks = dict(
+                MeterPoint.objects.filter(ean__in=[item.ean for item in meter_points]).values_list("ean", "pk")
+            )
+            for item in meter_points:
+                item.pk = pks[item.ean]
+        MeterPointHistory.objects.bulk_create(
+            [history for item in meter_points for history in _meter_point_history_items(item)],
+            update_conflicts=True,
+            unique_fields=["meter_point", "period_start"],
+            update_fields=["period_end", "reading_date", "consumption_kwh", "amount_eur"],
+        )
+    # The upsert sends no post_save: refresh the cached accounts of updated supply points.
+    invalidate_meter_point_accounts([item.pk for item in meter_points if item.ean in existing_eans])
+    return {item.ean for item in meter_points} - existing_eans
+
+
+def import_meter_points_from_reader(reader, batch_size=IMPORT_BATCH_SIZE):
     created_count = 0
     updated_count = 0
     errors = 0
 
-    for row in reader:
-        if not any((value or "").strip() for value in row.values()):
-            continue
+    def parsed_rows():
+        nonlocal errors
+        for row in reader:
+            if not any((value or "").strip() for value in row.values()):
+                continue
+            try:
+                yield row, _meter_point_from_row(row)
+            except Exception:
+                errors += 1
+
+    for batch in _chunked(parsed_rows(), batch_size):
+        # One upsert cannot touch the same EAN twice: keep the last row, count the others as updates.
+        unique = {}
+        for row, meter_point in batch:
+            if meter_point.ean in unique:
+                updated_count += 1
+            unique[meter_point.ean] = (row, meter_point)
         try:
-            created, updated = import_meter_point_row(row)
-            created_count += int(created)
-            updated_count += int(updated)
-        except Exception:
-            errors += 1
+            created_eans = _import_meter_point_batch([meter_point for _, meter_point in unique.values()])
+        except DatabaseError:
+            # Isolate the faulty rows by replaying the batch row by row.
+            for row, _ in unique.values():
+                try:
+                    created, updated = import_meter_point_row(row)
+                    created_count += int(created)
+                    updated_count += int(updated)
+                except Exception:
+                    errors += 1
+            continue
+        created_count += len(created_eans)
+        updated_count += len(unique) - len(created_eans)
 
     return created_count, updated_count, errors
 
@@ -128,18 +255,19 @@ def reset_online_accounts():
     now = timezone.now()
     User = get_user_model()
 
-    invitation_user_ids = list(
-        Invitation.objects.filter(used_by__isnull=False).values_list("used_by_id", flat=True).distinct()
+    users_qs = User.objects.filter(
+        Q(id__in=Invitation.objects.filter(used_by__isnull=False).values("used_by_id"))
+        | Q(id__in=Contract.objects.filter(meter_point__isnull=False).values("user_id")),
+        is_staff=False,
+        is_superuser=False,
     )
-    contract_user_ids = list(
-        Contract.objects.filter(meter_point__isnull=False).values_list("user_id", flat=True).distinct()
-    )
-    user_ids = sorted(set(invitation_user_ids + contract_user_ids))
-
-    users_qs = User.objects.filter(id__in=user_ids, is_staff=False, is_superuser=False)
-    deleted_users_count = users_qs.count()
-    if deleted_users_count:
-        users_qs.delete()
+    # Stream ids (server-side cursor on PostgreSQL), then delete in bounded batches so the
+    # cascade collector never loads every related row at once.
+    user_ids = list(users_qs.order_by("id").values_list("id", flat=True).iterator(chunk_size=RESET_BATCH_SIZE))
+    deleted_users_count = len(user_ids)
+    for batch in _chunked(user_ids, RESET_BATCH_SIZE):
+        with transaction.atomic():
+            User.objects.filter(id__in=batch).delete()
 
     reset_qs = Invitation.objects.filter(meter_point__isnull=False).exclude(
         used_at=None,
@@ -478,8 +606,8 @@ class InvoiceAdmin(admin.ModelAdmin):
 
 @admin.register(MeterReading)
 class MeterReadingAdmin(admin.ModelAdmin):
-    list_display = ("user", "reading_date", "value_kwh", "status", "note")
-    list_filter = ("status",)
+    list_display = ("user", "reading_date", "value_kwh", "status", "is_estimated", "note")
+    list_filter = ("status", "is_estimated")
     search_fields = ("user__username", "user__email")
     actions = ["mark_validated", "mark_rejected"]
 
@@ -509,7 +637,56 @@ class DomiciliationAdmin(admin.ModelAdmin):
 
 @admin.register(Attachment)
 class AttachmentAdmin(admin.ModelAdmin):
-    list_display = ("support_request", "uploaded_at")
+    list_display = ("support_request", "uploaded_at", "preview_thumbnail", "derivatives_status")
+    list_filter = ("derivatives_status",)
+    readonly_fields = ("preview_thumbnail", "preview", "optimized", "derivatives_status")
+
+    @admin.display(description="Aperçu")
+    def preview_thumbnail(self, obj):
+        """Compressed preview instead of the full-size original (built by process_attachments)."""
+        if not obj.preview:
+            return "-"
+        url = reverse("attachment_preview", args=[obj.pk])
+        return format_html('<img src="{}" alt="" loading="lazy" style="max-height:80px;max-width:120px">', url)
+
+
+class TariffPriceInline(admin.TabularInline):
+    model = TariffPrice
+    extra = 1
+
+
+@admin.register(Tariff)
+class TariffAdmin(admin.ModelAdmin):
+    list_display = ("code", "name")
+    inlines = [TariffPriceInline]
+
+    def get_urls(self):
+        custom = [
+            path("simulate/", self.admin_site.admin_view(self.simulate_view), name="portal_tariff_simulate"),
+        ]
+        return custom + super().get_urls()
+
+    def simulate_view(self, request):
+        """What-if on the invoices of a period with candidate prices (vectorized, see portal/simulator.py)."""
+        result = None
+        form = TariffSimulationForm(request.POST or None)
+        if simulator.np is None:
+            messages.error(request, "NumPy n'est pas installé: simulation indisponible.")
+        elif request.method == "POST" and form.is_valid():
+            period_start, _ = parse_period(form.cleaned_data["period_from"])
+            _, period_end = parse_period(form.cleaned_data["period_to"])
+            result = simulator.simulate(
+                simulator.load_base(period_start, period_end),
+                form.cleaned_data["fixed_price"],
+                form.cleaned_data["standing_charge"],
+                form.cleaned_data["variable_prices"],
+            )
+        context = {
+            **self.admin_site.each_context(request),
+            "form": form,
+            "result": result,
+        }
+        return render(request, "admin/portal/tariff/simulate.html", context)
 
 
 @admin.register(CustomerProfile)
@@ -4,3 +4,23 @@ from django.apps import AppConfig
 class PortalConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "portal"
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from django.db.models.signals import post_delete, post_save, pre_delete
+
+        from .account import invalidate_account, remember_meter_point_customers
+        from .db import configure_sqlite_connection
+        from .models import Contract, CustomerProfile, MeterPoint, Tariff, TariffPrice
+        from .tariffs import invalidate_tariffs
+
+        connection_created.connect(configure_sqlite_connection, dispatch_uid="portal_sqlite_profile")
+
+        for model in (Contract, CustomerProfile, MeterPoint):
+            post_save.connect(invalidate_account, sender=model, dispatch_uid=f"portal_account_save_{model.__name__}")
+            post_delete.connect(invalidate_account, sender=model, dispatch_uid=f"portal_account_delete_{model.__name__}")
+        pre_delete.connect(remember_meter_point_customers, sender=MeterPoint, dispatch_uid="portal_account_meter_point")
+
+        for model in (Tariff, TariffPrice):
+            post_save.connect(invalidate_tariffs, sender=model, dispatch_uid=f"portal_tariffs_save_{model.__name__}")
+            post_delete.connect(invalidate_tariffs, sender=model, dispatch_uid=f"portal_tariffs_delete_{model.__name__}")
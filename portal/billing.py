@@ -0,0 +1,188 @@
+"""Monthly billing run: validated meter readings (interval data for bi-hourly contracts) -> invoices, by chunks."""
+import calendar
+from datetime import date, datetime, timedelta
+
+from django.db import transaction
+
+from .models import Contract, Invoice, MeterReading
+
+CHUNK_SIZE = 2000
+# How far back the opening index of a period is looked for.
+OPENING_LOOKBACK_DAYS = 400
+ISSUE_DELAY_DAYS = 3
+
+
+def parse_period(value: str):
+    """'YYYY-MM' -> (first day, last day) of that month."""
+    try:
+        month = datetime.strptime(value, "%Y-%m").date()
+    except ValueError:
+        raise ValueError(f"Periode invalide: {value!r} (attendu AAAA-MM).") from None
+    return month, date(month.year, month.month, calendar.monthrange(month.year, month.month)[1])
+
+
+def month_period(anchor: date, month_offset: int):
+    """(first day, last day) of the month month_offset months away from anchor's month."""
+    target_month = anchor.month + month_offset
+    target_year = anchor.year + (target_month - 1) // 12
+    target_month = ((target_month - 1) % 12) + 1
+    last_day = calendar.monthrange(target_year, target_month)[1]
+    return date(target_year, target_month, 1), date(target_year, target_month, last_day)
+
+
+def invoice_reference(contract_reference: str, period_start) -> str:
+    return f"FAC-{period_start:%Y%m}-{contract_reference}"
+
+
+def billable_contracts(period_start, period_end):
+    return (
+        Contract.objects.filter(status=Contract.STATUS_ACTIVE, start_date__lte=period_end)
+        .select_related("meter_point")
+        .only(
+            "id",
+            "user_id",
+            "reference",
+            "tariff_type",
+            "standing_charge_eur",
+            "fixed_unit_price_eur_kwh",
+            "peak_unit_price_eur_kwh",
+            "offpeak_unit_price_eur_kwh",
+            "meter_point__ean",
+        )
+    )
+
+
+def period_consumption(user_ids, period_start, period_end):
+    """{user_id: (kWh, regularization kWh)} from the validated indexes before and inside the period.
+
+    Normally the delta from the last index before the period to the last one inside it. When the
+    opening index is an estimate and the closing one is measured, consumption runs from the last
+    measured index instead and the estimated kWh billed since then are credited back (regularization
+    <= 0): a real index lower than the estimate is still billed, the over-estimate refunded.
+    """
+    readings = (
+        MeterReading.objects.filter(
+            user_id__in=user_ids,
+            status=MeterReading.STATUS_VALIDATED,
+            reading_date__gte=period_start - timedelta(days=OPENING_LOOKBACK_DAYS),
+            reading_date__lte=period_end,
+        )
+        # Same day: the estimate sorts last, it is the index the previous invoice was based on.
+        .order_by("user_id", "reading_date", "is_estimated", "id")
+        .values_list("user_id", "reading_date", "value_kwh", "is_estimated")
+    )
+    opening, measured_opening, closing, measured_closing = {}, {}, {}, {}
+    for user_id, reading_date, value_kwh, is_estimated in readings.iterator(chunk_size=CHUNK_SIZE * 4):
+        if reading_date < period_start:
+            opening[user_id] = (value_kwh, is_estimated)
+            if not is_estimated:
+                measured_opening[user_id] = value_kwh
+        else:
+            closing[user_id] = value_kwh
+            if not is_estimated:
+                measured_closing[user_id] = value_kwh
+    result = {}
+    for user_id in closing.keys() & opening.keys():
+        opening_value, opening_estimated = opening[user_id]
+        if opening_estimated and user_id in measured_closing and user_id in measured_opening:
+            base, closing_value = measured_opening[user_id], measured_closing[user_id]
+            if closing_value >= base:
+                result[user_id] = (closing_value - base, base - opening_value)
+        elif closing[user_id] >= opening_value:
+            result[user_id] = (closing[user_id] - opening_value, 0)
+    return result
+
+
+def already_billed(user_ids, period_start):
+    return set(Invoice.objects.filter(user_id__in=user_ids, period_start=period_start).values_list("user_id", flat=True))
+
+
+def bill_chunk(contracts, period_start, period_end):
+    """Create the missing invoices of one chunk of contracts; returns (created, already billed, no reading)."""
+    by_user = {}
+    for contract in contracts:
+        by_user.setdefault(contract.user_id, contract)  # one invoice per customer and period
+    billed = already_billed(by_user, period_start)
+    to_bill = [user_id for user_id in by_user if user_id not in billed]
+    consumption = period_consumption(to_bill, period_start, period_end)
+
+    # Contracts of the same offer share their price: compute each distinct amount once.
+    amounts = {}
+    invoices = []
+    for user_id in to_bill:
+        contract = by_user[user_id]
+        # Bi-hourly contracts are priced per band from the interval data, readings are the fallback.
+        tou_bill = contract.time_of_use_bill(period_start, period_end)
+        if tou_bill is None and user_id not in consumption:
+            continue
+        if tou_bill is not None:
+            consumption[user_id] = (tou_bill.consumption_kwh, 0)
+            total, unit_price, standing_charge = tou_bill.total, tou_bill.average_unit_price, tou_bill.standing_charge
+        else:
+            price_key = (
+                contract.tariff_type,
+                contract.standing_charge_eur,
+                contract.fixed_unit_price_eur_kwh,
+                contract.peak_unit_price_eur_kwh,
+                contract.offpeak_unit_price_eur_kwh,
+            )
+            amount_key = (price_key, sum(consumption[user_id]))
+            if amount_key not in amounts:
+                amounts[amount_key] = contract.estimate_invoice_amount(sum(consumption[user_id]), period_end)
+            total, unit_price, standing_charge = amounts[amount_key]
+        invoices.append(
+            Invoice(
+                user_id=user_id,
+                reference=invoice_reference(contract.reference, period_start),
+                period_start=period_start,
+                period_end=period_end,
+                issue_date=period_end + timedelta(days=ISSUE_DELAY_DAYS),
+                consumption_kwh=consumption[user_id][0],
+                regularization_kwh=consumption[user_id][1],
+                unit_price_eur_kwh=unit_price,
+                standing_charge_eur=standing_charge,
+                amount_eur=total,
+                status=Invoice.STATUS_DUE,
+            )
+        )
+    with transaction.atomic():
+        # Another worker or run may bill the same customer meanwhile (two contracts in two pk ranges):
+        # the unique (user, period_start) constraint keeps its invoice, this one is dropped.
+        Invoice.objects.bulk_create(invoices, batch_size=CHUNK_SIZE, ignore_conflicts=True)
+    created = (
+        Invoice.objects.filter(reference__in=[invoice.reference for invoice in invoices], period_start=period_start)
+        .count()
+        if invoices
+        else 0
+    )
+    return {
+        "created": created,
+        "skipped": len(billed) + len(invoices) - created,
+        "missing": len(to_bill) - len(invoices),
+    }
+
+
+def contract_chunks(period_start, period_end, pk_from=None, pk_to=None, chunk_size=CHUNK_SIZE):
+    """Billable contracts (optionally pk_from <= pk < pk_to) as lists of chunk_size, by increasing pk."""
+    contracts = billable_contracts(period_start, period_end).order_by("pk")
+    if pk_from is not None:
+        contracts = contracts.filter(pk__gte=pk_from)
+    if pk_to is not None:
+        contracts = contracts.filter(pk__lt=pk_to)
+    last_pk = 0
+    while True:
+        chunk = list(contracts.filter(pk__gt=last_pk)[:chunk_size])
+        if not chunk:
+            return
+        last_pk = chunk[-1].pk
+        yield chunk
+
+
+def run_billing(period_start, period_end, pk_from=None, pk_to=None, chunk_size=CHUNK_SIZE):
+    """Bill every active contract (optionally pk_from <= pk < pk_to), streaming them by pk chunks."""
+    totals = {"contracts": 0, "created": 0, "skipped": 0, "missing": 0}
+    for chunk in contract_chunks(period_start, period_end, pk_from, pk_to, chunk_size):
+        totals["contracts"] += len(chunk)
+        for key, value in bill_chunk(chunk, period_start, period_end).items():
+            totals[key] += value
+    return totals
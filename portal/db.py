@@ -0,0 +1,20 @@
+"""Database connection tuning (SQLite production profile)."""
+from django.conf import settings
+
+
+def sqlite_pragma_statements(pragmas=None):
+    """Return the PRAGMA statements of the production profile, in execution order."""
+    pragmas = settings.SQLITE_PRAGMAS if pragmas is None else pragmas
+    return [f"PRAGMA {name}={value}" for name, value in pragmas.items()]
+
+
+def configure_sqlite_connection(sender, connection, **kwargs):
+    """Apply the SQLite production pragmas on every new connection (connection_created)."""
+    if connection.vendor != "sqlite" or not getattr(settings, "SQLITE_PRODUCTION_PROFILE", False):
+        return
+    cursor = connection.connection.cursor()
+    try:
+        for statement in sqlite_pragma_statements():
+            cursor.execute(statement)
+    finally:
+        cursor.close()
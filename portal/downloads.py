@@ -0,0 +1,204 @@
+"""Responses and signed URLs for stored user documents (invoices, attachments, domiciliation mandates)."""
+import hashlib
+import hmac
+import mimetypes
+import re
+import secrets
+import time
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.signing import BadSignature, SignatureExpired
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.crypto import salted_hmac
+from django.utils.http import content_disposition_header, http_date, urlsafe_base64_decode, urlsafe_base64_encode
+
+SIGNING_SALT = "portal.downloads.signed-url"
+# More ranges than this are answered with the whole file (avoids many-small-ranges abuse).
+MAX_RANGES = 8
+RANGE_CHUNK_SIZE = 64 * 1024
+# Range bounds: ASCII digits only (str.isdigit() also accepts '²', which int() rejects).
+RANGE_BOUND_RE = re.compile(r"[0-9]*")
+
+
+def stored_file_response(request, field_file, filename=None):
+    """Send a FieldFile as an attachment, or let the front proxy send it (DOWNLOAD_OFFLOAD).
+
+    The caller has already checked ownership; with offloading, the proxy then serves the bytes
+    (and Range requests) from an internal location while the worker is freed immediately.
+    """
+    return storage_file_response(request, field_file.storage, field_file.name, filename)
+
+
+def storage_file_response(request, storage, name, filename=None):
+    filename = filename or name.split("/")[-1]
+    if settings.DOWNLOAD_OFFLOAD == "x-accel":
+        response = HttpResponse(content_type=_content_type(filename))
+        response["X-Accel-Redirect"] = settings.DOWNLOAD_ACCEL_PREFIX + quote(name)
+    elif settings.DOWNLOAD_OFFLOAD == "x-sendfile":
+        response = HttpResponse(content_type=_content_type(filename))
+        response["X-Sendfile"] = storage.path(name)
+    else:
+        return _ranged_file_response(request, storage, name, filename)
+    response["Content-Disposition"] = content_disposition_header(True, filename)
+    return response
+
+
+def parse_range_header(header, size):
+    """Byte ranges of a Range header as inclusive (start, end) pairs.
+
+    None means "ignore the header and send the whole file" (absent, malformed or too many ranges);
+    an empty list means no range is satisfiable (416).
+    """
+    if not header:
+        return None
+    unit, _, spec = header.partition("=")
+    parts = [part.strip() for part in spec.split(",")]
+    if unit.strip().lower() != "bytes" or not spec.strip() or len(parts) > MAX_RANGES:
+        return None
+    ranges = []
+    for part in parts:
+        first, sep, last = part.partition("-")
+        if not sep or not RANGE_BOUND_RE.fullmatch(first) or not RANGE_BOUND_RE.fullmatch(last):
+            return None
+        if first == "":
+            if last == "":
+                return None
+            if int(last) == 0:
+                continue
+            # Suffix range: the last N bytes.
+            start, end = max(0, size - int(last)), size - 1
+        else:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+            if last and int(last) < start:
+                return None
+        if start < size and start <= end:
+            ranges.append((start, end))
+    return ranges
+
+
+def _file_validators(storage, name, size):
+    """Strong ETag and modification time of a stored file (None, None if the storage cannot tell)."""
+    try:
+        modified = storage.get_modified_time(name)
+    except NotImplementedError:
+        return None, None
+    digest = hashlib.sha1(f"{name}:{size}:{modified.timestamp()}".encode("utf-8")).hexdigest()
+    return f'"{digest[:24]}"', modified
+
+
+def _if_range_matches(request, etag, modified):
+    if_range = request.headers.get("If-Range")
+    if not if_range:
+        return True
+    if if_range.startswith(("W/", '"')):
+        # Weak validators never match for If-Range (RFC 9110 13.1.5).
+        return etag is not None and if_range == etag
+    return modified is not None and if_range == http_date(modified.timestamp())
+
+
+def _ranged_file_response(request, storage, name, filename):
+    size = storage.size(name)
+    etag, modified = _file_validators(storage, name, size)
+    last_modified = int(modified.timestamp()) if modified else None
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return not_modified
+
+    ranges = None
+    if request.method in ("GET", "HEAD") and _if_range_matches(request, etag, modified):
+        ranges = parse_range_header(request.headers.get("Range"), size)
+
+    content_type = _content_type(filename)
+    if ranges is None:
+        response = FileResponse(storage.open(name, "rb"), as_attachment=True, filename=filename)
+    elif not ranges:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+    elif len(ranges) == 1:
+        start, end = ranges[0]
+        response = StreamingHttpResponse(_iter_ranges(storage, name, ranges), status=206, content_type=content_type)
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+        response["Content-Length"] = str(end - start + 1)
+    else:
+        boundary = secrets.token_hex(16)
+        part_headers = [
+            f"--{boundary}\r\nContent-Type: {content_type}\r\nContent-Range: bytes {start}-{end}/{size}\r\n\r\n".encode(
+                "ascii"
+            )
+            for start, end in ranges
+        ]
+        closing = f"--{boundary}--\r\n".encode("ascii")
+        length = sum(len(header) + end - start + 1 + 2 for header, (start, end) in zip(part_headers, ranges))
+        response = StreamingHttpResponse(
+            _iter_ranges(storage, name, ranges, part_headers, closing),
+            status=206,
+            content_type=f"multipart/byteranges; boundary={boundary}",
+        )
+        response["Content-Length"] = str(length + len(closing))
+
+    response["Accept-Ranges"] = "bytes"
+    if etag:
+        response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified)
+    if response.status_code != 200:
+        response["Content-Disposition"] = content_disposition_header(True, filename)
+    return response
+
+
+def _iter_ranges(storage, name, ranges, part_headers=None, closing=None):
+    with storage.open(name, "rb") as handle:
+        for index, (start, end) in enumerate(ranges):
+            if part_headers:
+                yield part_headers[index]
+            handle.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = handle.read(min(RANGE_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+            if part_headers:
+                yield b"\r\n"
+        if closing:
+            yield closing
+
+
+def _content_type(filename):
+    return mimetypes.guess_type(filename)[0] or "application/octet-stream"
+
+
+def _mac(payload: bytes) -> bytes:
+    return salted_hmac(SIGNING_SALT, payload, algorithm="sha256").digest()
+
+
+def sign_download(name, owner_id, expires_at=None) -> str:
+    """Token for a stored file: base64(path, owner, expiry) + HMAC-SHA256 of it."""
+    if expires_at is None:
+        ttl = settings.SIGNED_DOWNLOAD_SECONDS
+        # Rounded up to the next TTL window: pages rendered in the same window get the same
+        # (cacheable) URL, valid between one and two TTLs.
+        expires_at = (int(time.time()) // ttl + 2) * ttl
+    payload = f"{name}\n{owner_id}\n{expires_at}".encode("utf-8")
+    return f"{urlsafe_base64_encode(payload)}.{urlsafe_base64_encode(_mac(payload))}"
+
+
+def verify_download(token):
+    """Return (name, owner_id, expires_at); raise BadSignature or SignatureExpired."""
+    try:
+        encoded_payload, encoded_mac = token.split(".")
+        payload = urlsafe_base64_decode(encoded_payload)
+        mac = urlsafe_base64_decode(encoded_mac)
+    except ValueError:
+        raise BadSignature("Jeton mal forme.")
+    if not hmac.compare_digest(mac, _mac(payload)):
+        raise BadSignature("Signature invalide.")
+    name, owner_id, expires_at = payload.decode("utf-8").split("\n")
+    if int(expires_at) < time.time():
+        raise SignatureExpired("Lien expire.")
+    return name, int(owner_id), int(expires_at)
@@ -0,0 +1,165 @@
+"""Estimated readings for customers without a validated reading in the billing period (see the CGV).
+
+Each customer's consumption is modelled as kWh per day = level x SEASONAL_PROFILE[month]. For every
+history sample (MeterPointHistory periods, deltas between consecutive validated readings) the profile
+gives its weighted day count W; the least-squares level is sum(kWh x W) / sum(W x W). All customers of a
+chunk are fitted at once with np.bincount, then the level x W since the last index is added to that
+index and written as a validated reading flagged is_estimated.
+"""
+from datetime import date, timedelta
+
+from django.db import transaction
+
+from . import intervals
+from .billing import CHUNK_SIZE, contract_chunks
+from .models import Contract, Invoice, MeterPointHistory, MeterReading
+
+np = intervals.np
+# Relative daily consumption per calendar month (mean 1), typical Belgian residential profile.
+SEASONAL_PROFILE = (1.25, 1.15, 1.05, 0.95, 0.88, 0.82, 0.80, 0.82, 0.88, 0.98, 1.12, 1.30)
+# History used for the fit; the last index must also be this recent.
+HISTORY_DAYS = 730
+ESTIMATED_NOTE = "Estimation automatique (profil saisonnier)"
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+class SeasonalWeights:
+    """Profile-weighted number of days in [start, end) for arrays of date ordinals."""
+
+    def __init__(self, first_day, end_day):
+        self.first = first_day.toordinal()
+        days = np.arange(self.first, end_day.toordinal() + 1, dtype=np.int64) - EPOCH_ORDINAL
+        months = days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64) % 12
+        self.cumulated = np.concatenate(([0.0], np.cumsum(np.asarray(SEASONAL_PROFILE)[months])))
+
+    def between(self, start_ordinals, end_ordinals):
+        start = np.clip(np.asarray(start_ordinals) - self.first, 0, len(self.cumulated) - 1)
+        end = np.clip(np.asarray(end_ordinals) - self.first, 0, len(self.cumulated) - 1)
+        return self.cumulated[end] - self.cumulated[start]
+
+
+def fit_levels(customer_count, customers, weights, kwh):
+    """Least-squares level (kWh per profile day) of each customer index; NaN without usable samples."""
+    numerator = np.bincount(customers, weights=kwh * weights, minlength=customer_count)
+    denominator = np.bincount(customers, weights=weights * weights, minlength=customer_count)
+    return np.divide(numerator, denominator, out=np.full(customer_count, np.nan), where=denominator > 0)
+
+
+def _reading_columns(user_ids, since, period_start):
+    rows = (
+        MeterReading.objects.filter(
+            user_id__in=user_ids,
+            status=MeterReading.STATUS_VALIDATED,
+            reading_date__gte=since,
+            reading_date__lt=period_start,
+        )
+        .order_by("user_id", "reading_date", "id")
+        .values_list("user_id", "reading_date", "value_kwh", "is_estimated")
+    )
+    columns = ([], [], [], [])
+    for user_id, reading_date, value_kwh, is_estimated in rows.iterator(chunk_size=CHUNK_SIZE * 4):
+        columns[0].append(user_id)
+        columns[1].append(reading_date.toordinal())
+        columns[2].append(value_kwh)
+        columns[3].append(is_estimated)
+    return tuple(np.array(column, dtype=dtype) for column, dtype in zip(columns, (np.int64,) * 3 + (np.bool_,)))
+
+
+def estimate_chunk(contracts, period_start, period_end):
+    """Write the estimated closing index of the customers of one chunk that have no reading in the period."""
+    by_user = {}
+    for contract in contracts:
+        by_user.setdefault(contract.user_id, contract)
+    done = set(
+        Invoice.objects.filter(user_id__in=by_user, period_start=period_start).values_list("user_id", flat=True)
+    )
+    done.update(
+        MeterReading.objects.filter(
+            user_id__in=by_user,
+            status=MeterReading.STATUS_VALIDATED,
+            reading_date__gte=period_start,
+            reading_date__lte=period_end,
+        ).values_list("user_id", flat=True)
+    )
+    for user_id, contract in by_user.items():
+        # Bi-hourly contracts whose interval data covers the period are billed from the meter itself.
+        if contract.tariff_type == Contract.TARIFF_BIHOURLY:
+            if contract.time_of_use_bill(period_start, period_end) is not None:
+                done.add(user_id)
+    users = np.array(sorted(user_id for user_id in by_user if user_id not in done), dtype=np.int64)
+    if not len(users):
+        return {"estimated": 0, "skipped": len(done), "missing": 0}
+
+    since = period_start - timedelta(days=HISTORY_DAYS)
+    weights = SeasonalWeights(since, period_end)
+    reading_users, days, values, estimated = _reading_columns(users.tolist(), since, period_start)
+
+    # Samples: consecutive measured readings of the same customer...
+    pairs = (
+        (reading_users[1:] == reading_users[:-1])
+        & ~estimated[1:]
+        & ~estimated[:-1]
+        & (days[1:] > days[:-1])
+        & (values[1:] >= values[:-1])
+    )
+    sample_users = [reading_users[1:][pairs]]
+    sample_weights = [weights.between(days[:-1][pairs], days[1:][pairs])]
+    sample_kwh = [(values[1:] - values[:-1])[pairs].astype(np.float64)]
+    # ...and the monthly history of their meter point.
+    user_by_meter_point = {
+        by_user[user_id].meter_point_id: user_id for user_id in users.tolist() if by_user[user_id].meter_point_id
+    }
+    history = list(
+        MeterPointHistory.objects.filter(
+            meter_point_id__in=user_by_meter_point, period_start__gte=since, period_end__lt=period_start
+        ).values_list("meter_point_id", "period_start", "period_end", "consumption_kwh")
+    )
+    if history:
+        meter_points, starts, ends, kwh = zip(*history)
+        sample_users.append(np.array([user_by_meter_point[point] for point in meter_points], dtype=np.int64))
+        sample_weights.append(
+            weights.between([start.toordinal() for start in starts], [end.toordinal() + 1 for end in ends])
+        )
+        sample_kwh.append(np.array(kwh, dtype=np.float64))
+    levels = fit_levels(
+        len(users),
+        np.searchsorted(users, np.concatenate(sample_users)),
+        np.concatenate(sample_weights),
+        np.concatenate(sample_kwh),
+    )
+
+    # Last index of each customer (measured or estimated) -> estimated index at the end of the period.
+    if len(reading_users):
+        last = np.flatnonzero(np.append(reading_users[1:] != reading_users[:-1], True))
+    else:
+        last = np.zeros(0, dtype=np.int64)
+    position = np.searchsorted(users, reading_users[last])
+    level = levels[position]
+    usable = ~np.isnan(level)
+    closing = values[last][usable] + np.floor(
+        level[usable] * weights.between(days[last][usable], period_end.toordinal()) + 0.5
+    ).astype(np.int64)
+    readings = [
+        MeterReading(
+            user_id=user_id,
+            reading_date=period_end,
+            value_kwh=value,
+            status=MeterReading.STATUS_VALIDATED,
+            note=ESTIMATED_NOTE,
+            is_estimated=True,
+        )
+        for user_id, value in zip(reading_users[last][usable].tolist(), closing.tolist())
+    ]
+    with transaction.atomic():
+        MeterReading.objects.bulk_create(readings, batch_size=CHUNK_SIZE)
+    return {"estimated": len(readings), "skipped": len(done), "missing": len(users) - len(readings)}
+
+
+def run_estimation(period_start, period_end, chunk_size=CHUNK_SIZE):
+    """Estimate the closing index of every billable customer without a validated reading in the period."""
+    totals = {"contracts": 0, "estimated": 0, "skipped": 0, "missing": 0}
+    for chunk in contract_chunks(period_start, period_end, chunk_size=chunk_size):
+        totals["contracts"] += len(chunk)
+        for key, value in estimate_chunk(chunk, period_start, period_end).items():
+            totals[key] += value
+    return totals
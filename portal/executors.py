@@ -0,0 +1,28 @@
+"""Bounded thread pool for blocking work called from async views (PDF rendering, password hashing)."""
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+_executor = None
+
+
+def get_blocking_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.BLOCKING_POOL_WORKERS,
+            thread_name_prefix="electruc-blocking",
+        )
+    return _executor
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Run a CPU-bound or blocking callable off the event loop.
+
+    Only pass plain data: the callable must not use the ORM (it runs outside Django's
+    thread-sensitive sync thread and would open a connection of its own).
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_blocking_executor(), functools.partial(func, *args, **kwargs))
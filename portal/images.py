@@ -0,0 +1,81 @@
+"""Compressed derivatives (preview, lossless re-encode) of image attachments; originals are never modified."""
+import io
+import logging
+import posixpath
+
+from django.core.files.base import ContentFile
+
+logger = logging.getLogger(__name__)
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow is optional: attachments then stay pending, served without derivatives.
+    Image = None
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg")
+PREVIEW_SIZE = (480, 480)
+PREVIEW_QUALITY = 80
+
+
+def is_image_name(name) -> bool:
+    return str(name).lower().endswith(IMAGE_EXTENSIONS)
+
+
+def derivative_name(name, suffix) -> str:
+    """Name stored next to the original: releve.png -> releve.preview.jpg."""
+    directory, filename = posixpath.split(name)
+    return posixpath.join(directory, f"{posixpath.splitext(filename)[0]}.{suffix}")
+
+
+def render_preview(source) -> bytes:
+    """Downscaled, EXIF-oriented JPEG preview."""
+    with Image.open(source) as image:
+        # JPEG: let the decoder downscale by 1/2..1/8 instead of decoding every pixel.
+        image.draft("RGB", PREVIEW_SIZE)
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail(PREVIEW_SIZE)
+        if image.mode in ("RGBA", "LA", "P"):
+            image = image.convert("RGBA")
+            background = Image.new("RGB", image.size, "white")
+            background.paste(image, mask=image.getchannel("A"))
+            image = background
+        elif image.mode != "RGB":
+            image = image.convert("RGB")
+        output = io.BytesIO()
+        image.save(output, "JPEG", quality=PREVIEW_QUALITY, optimize=True, progressive=True)
+    return output.getvalue()
+
+
+def render_optimized_png(source):
+    """Lossless PNG re-encode (max compression, metadata dropped), or None when it is not smaller."""
+    original = source.read()
+    source.seek(0)
+    with Image.open(source) as image:
+        if image.format != "PNG":
+            return None
+        output = io.BytesIO()
+        image.save(output, "PNG", optimize=True)
+    data = output.getvalue()
+    return data if len(data) < len(original) else None
+
+
+def build_derivatives(attachment) -> str:
+    """Store the derivatives of one attachment and return its new derivatives status."""
+    if not is_image_name(attachment.file.name):
+        return attachment.DERIVATIVES_NONE
+    if Image is None:
+        # Not settled: the attachment is processed once Pillow is installed.
+        return attachment.DERIVATIVES_PENDING
+    storage = attachment.file.storage
+    try:
+        with attachment.file.open("rb") as source:
+            preview = render_preview(source)
+            source.seek(0)
+            optimized = render_optimized_png(source)
+    except (OSError, ValueError, Image.DecompressionBombError) as exc:
+        logger.warning("Image derivatives failed for attachment %s: %s", attachment.pk, exc)
+        return attachment.DERIVATIVES_FAILED
+    attachment.preview.name = storage.save(derivative_name(attachment.file.name, "preview.jpg"), ContentFile(preview))
+    if optimized:
+        attachment.optimized.name = storage.save(derivative_name(attachment.file.name, "min.png"), ContentFile(optimized))
+    return attachment.DERIVATIVES_READY
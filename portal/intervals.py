@@ -0,0 +1,217 @@
+"""Append-only columnar store of smart-meter interval data (memory-mapped NumPy arrays).
+
+Layout: <INTERVAL_DATA_ROOT>/<ean[-2:]>/<ean>/<YYYY-MM>.ts (int64 epoch seconds, UTC, interval start)
+and <YYYY-MM>.kwh (float64), one pair of raw little-endian columns per month. Appends add bytes at
+the end of a month file; late intervals (a backfilled feed gap) rewrite that month through .merge
+files. Readers map the files and slice them without copying. Rollups (portal/rollups.py) live in
+the same directory and are updated under the same lock.
+"""
+import fcntl
+import os
+from contextlib import contextmanager
+from datetime import datetime, time
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional: interval data is then unavailable.
+    np = None
+
+TS_DTYPE = "<i8"
+KWH_DTYPE = "<f8"
+
+
+def _as_epoch_seconds(timestamps):
+    values = np.asarray(timestamps)
+    if np.issubdtype(values.dtype, np.datetime64):
+        return values.astype("datetime64[s]").astype(np.int64)
+    return values.astype(np.int64)
+
+
+def to_epoch(value):
+    """Epoch seconds of an int, datetime64, aware/naive datetime or date (local midnight)."""
+    if value is None or isinstance(value, (int, np.integer)):
+        return value
+    if isinstance(value, np.datetime64):
+        return int(value.astype("datetime64[s]").astype(np.int64))
+    if not isinstance(value, datetime):
+        value = datetime.combine(value, time.min)
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value)
+    return int(value.timestamp())
+
+
+def month_key(epoch_second) -> str:
+    return str(np.datetime64(int(epoch_second), "s").astype("datetime64[M]"))
+
+
+class IntervalStore:
+    """Interval series of one meter point."""
+
+    def __init__(self, ean, root=None):
+        self.ean = ean
+        root = Path(root or settings.INTERVAL_DATA_ROOT)
+        self.directory = root / ean[-2:] / ean
+
+    @property
+    def rollups(self):
+        """Hour/day/month totals maintained on append (portal.rollups.Rollups)."""
+        from .rollups import Rollups
+
+        return Rollups(self)
+
+    def months(self):
+        """Stored month partitions, oldest first ('YYYY-MM')."""
+        if not self.directory.is_dir():
+            return []
+        return sorted(path.stem for path in self.directory.glob("*.ts"))
+
+    @contextmanager
+    def _locked(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self.directory / ".lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _columns(self, month):
+        """(timestamps, kWh) memory maps of one month; empty arrays when the month is not stored."""
+        ts_path = self.directory / f"{month}.ts"
+        kwh_path = self.directory / f"{month}.kwh"
+        if (self.directory / f"{month}.kwh.merge").exists():
+            # A merge stopped between its two renames: its timestamps are already in place.
+            if not (self.directory / f"{month}.ts.merge").exists():
+                kwh_path = self.directory / f"{month}.kwh.merge"
+        try:
+            # After a crash between the two writes the columns may differ: trust the shorter one.
+            count = min(ts_path.stat().st_size // 8, kwh_path.stat().st_size // 8)
+        except FileNotFoundError:
+            count = 0
+        if not count:
+            return np.empty(0, dtype=TS_DTYPE), np.empty(0, dtype=KWH_DTYPE)
+        return (
+            np.memmap(ts_path, dtype=TS_DTYPE, mode="r", shape=(count,)),
+            np.memmap(kwh_path, dtype=KWH_DTYPE, mode="r", shape=(count,)),
+        )
+
+    def append(self, timestamps, kwh):
+        """Add intervals (UTC epoch seconds or datetime64, increasing); already stored ones are skipped.
+
+        Intervals older than the last stored one of their month (a backfilled gap) are merged in.
+
+        Returns {month: (timestamps, kWh)} of what was actually written, for incremental consumers.
+        """
+        timestamps = _as_epoch_seconds(timestamps)
+        kwh = np.asarray(kwh, dtype=np.float64)
+        if timestamps.shape != kwh.shape or timestamps.ndim != 1:
+            raise ValueError("timestamps et kwh doivent etre deux vecteurs de meme longueur.")
+        if len(timestamps) > 1 and np.any(np.diff(timestamps) <= 0):
+            raise ValueError("Les horodatages doivent etre strictement croissants.")
+        written = {}
+        if not len(timestamps):
+            return written
+        months = timestamps.astype("datetime64[s]").astype("datetime64[M]")
+        boundaries = np.flatnonzero(months[1:] != months[:-1]) + 1
+        with self._locked():
+            for start, end in zip((0, *boundaries), (*boundaries, len(timestamps))):
+                month = str(months[start])
+                self._finish_merge(month)
+                stored_ts, stored_kwh = self._columns(month)
+                month_ts, month_kwh = timestamps[start:end], kwh[start:end]
+                if len(stored_ts) and month_ts[0] <= stored_ts[-1]:
+                    position = np.minimum(np.searchsorted(stored_ts, month_ts), len(stored_ts) - 1)
+                    keep = stored_ts[position] != month_ts
+                    month_ts, month_kwh = month_ts[keep], month_kwh[keep]
+                if not len(month_ts):
+                    continue
+                if len(stored_ts) and month_ts[0] < stored_ts[-1]:
+                    self._merge(month, stored_ts, stored_kwh, month_ts, month_kwh)
+                else:
+                    self._write(month, month_ts, month_kwh)
+                # Only new intervals are written: adding them to the rollups keeps every level exact.
+                self.rollups.add(month, month_ts, month_kwh)
+                written[month] = (month_ts, month_kwh)
+        return written
+
+    def _write(self, month, timestamps, kwh):
+        ts_path = self.directory / f"{month}.ts"
+        kwh_path = self.directory / f"{month}.kwh"
+        ts_size = ts_path.stat().st_size if ts_path.exists() else 0
+        kwh_size = kwh_path.stat().st_size if kwh_path.exists() else 0
+        count = min(ts_size, kwh_size) // 8
+        for path, values, dtype in ((ts_path, timestamps, TS_DTYPE), (kwh_path, kwh, KWH_DTYPE)):
+            with open(path, "ab") as handle:
+                handle.truncate(count * 8)  # drop a torn tail left by an interrupted append
+                handle.write(np.ascontiguousarray(values, dtype=dtype).tobytes())
+                handle.flush()
+                os.fsync(handle.fileno())
+
+    def _merge(self, month, stored_ts, stored_kwh, timestamps, kwh):
+        """Rewrite one month with late intervals inserted in order.
+
+        Both columns are written to .merge files, then renamed: timestamps first, which is the commit
+        point (_finish_merge completes or discards an interrupted merge, _columns reads through it).
+        """
+        merged_ts = np.concatenate((stored_ts, timestamps))
+        order = np.argsort(merged_ts, kind="stable")
+        merged_kwh = np.concatenate((stored_kwh, kwh))[order]
+        columns = (("ts", merged_ts[order], TS_DTYPE), ("kwh", merged_kwh, KWH_DTYPE))
+        for suffix, values, dtype in columns:
+            with open(self.directory / f"{month}.{suffix}.merge", "wb") as handle:
+                handle.write(np.ascontiguousarray(values, dtype=dtype).tobytes())
+                handle.flush()
+                os.fsync(handle.fileno())
+        for suffix, _, _ in columns:
+            os.replace(self.directory / f"{month}.{suffix}.merge", self.directory / f"{month}.{suffix}")
+
+    def _finish_merge(self, month):
+        """Complete (timestamps already renamed) or discard (nothing renamed yet) an interrupted merge."""
+        ts_merge = self.directory / f"{month}.ts.merge"
+        kwh_merge = self.directory / f"{month}.kwh.merge"
+        if ts_merge.exists():
+            ts_merge.unlink()
+            kwh_merge.unlink(missing_ok=True)
+        elif kwh_merge.exists():
+            os.replace(kwh_merge, self.directory / f"{month}.kwh")
+
+    def iter_range(self, start=None, end=None):
+        """Yield (timestamps, kWh) views per month for start <= t < end, without copying."""
+        start, end = to_epoch(start), to_epoch(end)
+        first = month_key(start) if start is not None else None
+        last = month_key(end - 1) if end is not None else None
+        for month in self.months():
+            if (first and month < first) or (last and month > last):
+                continue
+            timestamps, kwh = self._columns(month)
+            low = 0 if start is None else int(np.searchsorted(timestamps, start, side="left"))
+            high = len(timestamps) if end is None else int(np.searchsorted(timestamps, end, side="left"))
+            if high > low:
+                yield timestamps[low:high], kwh[low:high]
+
+    def read(self, start=None, end=None):
+        """(timestamps, kWh) for start <= t < end; a view when the range stays in one month."""
+        parts = list(self.iter_range(start, end))
+        if not parts:
+            return np.empty(0, dtype=TS_DTYPE), np.empty(0, dtype=KWH_DTYPE)
+        if len(parts) == 1:
+            return parts[0]
+        return np.concatenate([part[0] for part in parts]), np.concatenate([part[1] for part in parts])
+
+    def covers(self, start, end) -> bool:
+        """True when every UTC hour of [start, end) has at least one stored interval (no feed gap)."""
+        start, end = to_epoch(start), to_epoch(end)
+        first_hour, end_hour = start // 3600, -(-end // 3600)
+        seen = 0
+        # Month partitions split on whole hours: hours seen in each month add up.
+        for timestamps, _ in self.iter_range(first_hour * 3600, end_hour * 3600):
+            hours = timestamps // 3600
+            seen += int(np.count_nonzero(np.diff(hours))) + 1
+        return seen == end_hour - first_hour
+
+    def total_kwh(self, start=None, end=None) -> float:
+        return float(sum(kwh.sum() for _, kwh in self.iter_range(start, end)))
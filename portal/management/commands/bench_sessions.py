@@ -0,0 +1,148 @@
+"""Measure how session storage competes with business writes on SQLite (db vs cached_db vs signed cookies)."""
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from importlib import import_module
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY, get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, transaction
+from django.utils import timezone
+
+from portal.models import MeterReading
+
+ENGINES = ["db", "cached_db", "signed_cookies"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Run concurrent processes doing authenticated requests (session load, periodic message flash) plus "
+        "meter reading inserts on a scratch SQLite database, once per session engine, and report write "
+        "throughput, p95 write latency and 'database is locked' errors."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=3, help="Concurrent processes (like gunicorn workers).")
+        parser.add_argument("--duration", type=float, default=5.0, help="Seconds per engine.")
+        parser.add_argument("--write-ratio", type=float, default=0.2, help="Share of requests inserting a reading.")
+        parser.add_argument("--flash-every", type=int, default=3, help="One session write every N requests.")
+        parser.add_argument("--engines", default=",".join(ENGINES), help="Comma separated SESSION_BACKEND values.")
+        parser.add_argument("--child", action="store_true", help="Internal: run one worker.")
+        parser.add_argument("--index", type=int, default=0, help="Internal: worker index.")
+        parser.add_argument("--start-at", type=float, default=0.0, help="Internal: common start timestamp.")
+
+    def handle(self, *args, **options):
+        if options["child"]:
+            self.stdout.write(json.dumps(self._run_child(options)))
+            return
+
+        engines = [engine for engine in options["engines"].split(",") if engine]
+        unknown = set(engines) - set(ENGINES)
+        if unknown:
+            raise CommandError(f"Moteurs inconnus: {', '.join(sorted(unknown))}")
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            env = dict(
+                os.environ,
+                DB_ENGINE="sqlite",
+                SQLITE_PATH=str(Path(tmp_dir) / "bench.sqlite3"),
+                CACHE_BACKEND="file",
+                CACHE_LOCATION=str(Path(tmp_dir) / "cache"),
+            )
+            self._manage(["migrate", "--noinput", "-v", "0"], env)
+            for engine in engines:
+                result = self._run_engine(dict(env, SESSION_BACKEND=engine), options)
+                self.stdout.write(
+                    f"{engine:<15} requetes/s: {result['requests_per_s']:>7.0f} | "
+                    f"ecritures metier/s: {result['writes_per_s']:>6.0f} | "
+                    f"p95 ecriture: {result['write_p95_ms']:>6.1f} ms | "
+                    f"erreurs 'database is locked': {result['locked_errors']}"
+                )
+
+    def _manage(self, arguments, env):
+        command = [sys.executable, str(settings.BASE_DIR / "manage.py"), *arguments]
+        completed = subprocess.run(command, env=env, capture_output=True, text=True, check=False)
+        if completed.returncode != 0:
+            raise CommandError(completed.stderr.strip() or f"Echec de {' '.join(arguments)}")
+        return completed.stdout
+
+    def _run_engine(self, env, options):
+        start_at = time.time() + 3  # leaves time for every process to import Django
+        base = [
+            sys.executable,
+            str(settings.BASE_DIR / "manage.py"),
+            "bench_sessions",
+            "--child",
+            "--duration",
+            str(options["duration"]),
+            "--write-ratio",
+            str(options["write_ratio"]),
+            "--flash-every",
+            str(options["flash_every"]),
+            "--start-at",
+            repr(start_at),
+        ]
+        processes = [
+            subprocess.Popen(base + ["--index", str(index)], env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+            for index in range(max(1, options["workers"]))
+        ]
+        results = []
+        for process in processes:
+            stdout, stderr = process.communicate()
+            if process.returncode != 0:
+                raise CommandError(stderr.strip() or "Echec d'un processus de mesure.")
+            results.append(json.loads(stdout.strip().splitlines()[-1]))
+
+        latencies = sorted(value for result in results for value in result["write_ms"])
+        p95 = latencies[max(1, math.ceil(0.95 * len(latencies))) - 1] if latencies else 0.0
+        return {
+            "requests_per_s": sum(result["requests"] for result in results) / options["duration"],
+            "writes_per_s": len(latencies) / options["duration"],
+            "write_p95_ms": p95,
+            "locked_errors": sum(result["locked"] for result in results),
+        }
+
+    def _run_child(self, options):
+        engine = import_module(settings.SESSION_ENGINE)
+        user = get_user_model().objects.create(username=f"bench-{settings.SESSION_BACKEND}-{options['index']}")
+        store = engine.SessionStore()
+        store[SESSION_KEY] = str(user.pk)
+        store.save()
+        session_key = store.session_key
+
+        rng = random.Random(options["index"])
+        requests = locked = 0
+        write_ms = []
+        time.sleep(max(0.0, options["start_at"] - time.time()))
+        deadline = time.perf_counter() + options["duration"]
+        while time.perf_counter() < deadline:
+            requests += 1
+            try:
+                # Every authenticated request loads its session...
+                store = engine.SessionStore(session_key)
+                store.get(SESSION_KEY)
+                # ...and a message flash now and then modifies it.
+                if requests % options["flash_every"] == 0:
+                    store["_flash"] = requests
+                    store.save()
+                    session_key = store.session_key
+                if rng.random() < options["write_ratio"]:
+                    started = time.perf_counter()
+                    with transaction.atomic():
+                        MeterReading.objects.create(
+                            user=user,
+                            reading_date=timezone.localdate(),
+                            value_kwh=requests,
+                            status=MeterReading.STATUS_SUBMITTED,
+                        )
+                    write_ms.append((time.perf_counter() - started) * 1000)
+            except OperationalError:
+                locked += 1
+        return {"requests": requests, "locked": locked, "write_ms": write_ms}
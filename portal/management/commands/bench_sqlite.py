@@ -0,0 +1,109 @@
+"""Compare SQLite default settings with the production profile under concurrent workers."""
+import multiprocessing
+import random
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from portal.db import sqlite_pragma_statements
+
+# Python's sqlite3 default, which is also Django's default.
+DEFAULT_TIMEOUT_S = 5.0
+
+
+def _prepare(db_path, production):
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    if production:
+        for statement in sqlite_pragma_statements():
+            conn.execute(statement)
+    conn.execute("CREATE TABLE reading (id INTEGER PRIMARY KEY, user_id INTEGER, value_kwh INTEGER)")
+    conn.executemany(
+        "INSERT INTO reading (user_id, value_kwh) VALUES (?, ?)",
+        ((i % 500, i) for i in range(20000)),
+    )
+    conn.execute("CREATE INDEX reading_user ON reading (user_id)")
+    conn.close()
+
+
+def _worker(db_path, production, duration, write_ratio, seed, results):
+    rng = random.Random(seed)
+    if production:
+        conn = sqlite3.connect(db_path, isolation_level=None, timeout=0)
+        for statement in sqlite_pragma_statements():
+            conn.execute(statement)
+        begin = "BEGIN IMMEDIATE"
+    else:
+        conn = sqlite3.connect(db_path, isolation_level=None, timeout=DEFAULT_TIMEOUT_S)
+        begin = "BEGIN"
+
+    reads = writes = locked = 0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        user_id = rng.randrange(500)
+        try:
+            if rng.random() < write_ratio:
+                # Same shape as a form submission: read the last value, then insert.
+                conn.execute(begin)
+                last = conn.execute(
+                    "SELECT MAX(value_kwh) FROM reading WHERE user_id = ?", (user_id,)
+                ).fetchone()[0] or 0
+                conn.execute("INSERT INTO reading (user_id, value_kwh) VALUES (?, ?)", (user_id, last + 1))
+                conn.execute("COMMIT")
+                writes += 1
+            else:
+                conn.execute("SELECT COUNT(*), SUM(value_kwh) FROM reading WHERE user_id = ?", (user_id,)).fetchone()
+                reads += 1
+        except sqlite3.OperationalError:
+            locked += 1
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+    conn.close()
+    results.put((reads, writes, locked))
+
+
+def run_benchmark(production, workers, duration, write_ratio):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = str(Path(tmp_dir) / "bench.sqlite3")
+        _prepare(db_path, production)
+        results = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(
+                target=_worker,
+                args=(db_path, production, duration, write_ratio, index, results),
+            )
+            for index in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        totals = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+    reads = sum(item[0] for item in totals)
+    writes = sum(item[1] for item in totals)
+    locked = sum(item[2] for item in totals)
+    return {
+        "reads_per_s": reads / duration,
+        "writes_per_s": writes / duration,
+        "locked_errors": locked,
+    }
+
+
+class Command(BaseCommand):
+    help = "Benchmark concurrent readers/writers on SQLite: default settings versus SQLITE_PRODUCTION_PROFILE pragmas."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=3, help="Concurrent processes (like gunicorn workers).")
+        parser.add_argument("--duration", type=float, default=5.0, help="Seconds per scenario.")
+        parser.add_argument("--write-ratio", type=float, default=0.2, help="Share of operations that write.")
+
+    def handle(self, *args, **options):
+        for label, production in (("defaut", False), ("profil production", True)):
+            result = run_benchmark(production, options["workers"], options["duration"], options["write_ratio"])
+            self.stdout.write(
+                f"{label:<18} lectures/s: {result['reads_per_s']:>9.0f} | "
+                f"ecritures/s: {result['writes_per_s']:>7.0f} | "
+                f"erreurs 'database is locked': {result['locked_errors']}"
+            )
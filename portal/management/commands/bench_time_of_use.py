@@ -0,0 +1,66 @@
+"""Measure bi-hourly pricing of a full year of quarter-hour interval data for many meters."""
+import time
+from datetime import date
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+
+from portal import tou
+from portal.rollups import local_midnight
+
+QUARTER_HOUR = 900
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a year of synthetic quarter-hour consumption per meter (in memory) and split it into "
+        "peak/off-peak bands with the NumPy band masks, batch by batch, then report meters per second."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--meters", type=int, default=10000)
+        parser.add_argument("--year", type=int, default=date.today().year - 1)
+        parser.add_argument("--batch-size", type=int, default=250, help="Meters priced per matrix product.")
+        parser.add_argument("--peak-price", default="0.3150")
+        parser.add_argument("--offpeak-price", default="0.2350")
+        parser.add_argument("--seed", type=int, default=49)
+
+    def handle(self, *args, **options):
+        if tou.np is None:
+            raise CommandError("NumPy n'est pas installe.")
+        np = tou.np
+        prices = (Decimal(options["peak_price"]), Decimal(options["offpeak_price"]))
+        start = local_midnight(date(options["year"], 1, 1))
+        end = local_midnight(date(options["year"] + 1, 1, 1))
+        timestamps = np.arange(start, end, QUARTER_HOUR, dtype=np.int64)
+        rng = np.random.default_rng(options["seed"])
+
+        started = time.perf_counter()
+        masks = tou.BIHOURLY.masks(timestamps)
+        calendar_s = time.perf_counter() - started
+
+        pricing_s = 0.0
+        band_kwh = np.zeros(tou.BIHOURLY.band_count)
+        revenue_cents = 0
+        remaining = options["meters"]
+        while remaining > 0:
+            size = min(options["batch_size"], remaining)
+            kwh = rng.gamma(2.0, 0.05, size=(size, len(timestamps)))
+            started = time.perf_counter()
+            by_band = kwh @ masks
+            _, cents = tou.band_amounts_cents(by_band, prices)
+            pricing_s += time.perf_counter() - started
+            band_kwh += by_band.sum(axis=0)
+            revenue_cents += int(cents.sum())
+            remaining -= size
+
+        meters = options["meters"]
+        self.stdout.write(f"Compteurs: {meters} | intervalles par compteur: {len(timestamps)}")
+        self.stdout.write(f"Calendrier (masques de bandes): {calendar_s * 1000:.1f} ms")
+        self.stdout.write(
+            f"Tarification: {pricing_s:.2f} s ({meters / pricing_s if pricing_s else 0:.0f} compteurs/s, "
+            f"{meters * len(timestamps) / pricing_s / 1e6 if pricing_s else 0:.0f} M intervalles/s)"
+        )
+        for label, value in zip(tou.BIHOURLY.labels, band_kwh):
+            self.stdout.write(f"{label}: {value:,.0f} kWh")
+        self.stdout.write(f"Energie facturee: {Decimal(revenue_cents) / tou.CENTS_SCALE:,.2f} EUR")
@@ -0,0 +1,118 @@
+"""Measure first-request latency of a fresh process, with and without PORTAL_WARMUP."""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+
+from portal.models import Invoice
+from portal.warmup import warm_up_server
+
+PUBLIC_PATHS = ["/", "/connexion/"]
+
+
+def _client_paths(invoice):
+    paths = ["/espace-client/", "/espace-client/factures/"]
+    if invoice is not None:
+        paths.append(f"/espace-client/factures/{invoice.pk}/pdf/")
+    return paths
+
+
+class Command(BaseCommand):
+    help = (
+        "Start fresh processes (cold, then with PORTAL_WARMUP=1) and report process start-up time "
+        "and the time to the first response of public pages, client pages and an invoice PDF."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=3, help="Fresh processes per mode (median is reported).")
+        parser.add_argument("--username", default="", help="Client account used for authenticated pages.")
+        parser.add_argument("--child", action="store_true", help="Internal: measure the current process.")
+        parser.add_argument("--session", default="", help="Internal: session key of the client account.")
+        parser.add_argument("--paths", default="", help="Internal: comma separated paths to request.")
+
+    def handle(self, *args, **options):
+        if options["child"]:
+            self._measure_child(options)
+            return
+
+        user = self._pick_user(options["username"])
+        paths = list(PUBLIC_PATHS)
+        session_key = ""
+        if user is not None:
+            client = Client()
+            client.force_login(user)
+            session_key = client.cookies[settings.SESSION_COOKIE_NAME].value
+            paths += _client_paths(Invoice.objects.filter(user=user).order_by("-issue_date").first())
+
+        results = {}
+        for mode, warmup in (("cold", "0"), ("warm", "1")):
+            runs = [self._spawn(warmup, session_key, paths) for _ in range(max(1, options["runs"]))]
+            results[mode] = {
+                "startup_ms": round(statistics.median(run["startup_ms"] for run in runs), 1),
+                "first_response_ms": {
+                    path: round(statistics.median(run["first_response_ms"][path] for run in runs), 1) for path in paths
+                },
+            }
+
+        self.stdout.write(json.dumps(results, indent=2))
+        for path in paths:
+            cold = results["cold"]["first_response_ms"][path]
+            warm = results["warm"]["first_response_ms"][path]
+            self.stdout.write(f"{path:<45} froid {cold:8.1f} ms   chaud {warm:8.1f} ms")
+
+    def _pick_user(self, username):
+        User = get_user_model()
+        if username:
+            user = User.objects.filter(username=username).first()
+            if user is None:
+                raise CommandError(f"Compte introuvable: {username}")
+            return user
+        invoice = Invoice.objects.select_related("user").filter(user__is_active=True, user__is_staff=False).first()
+        return invoice.user if invoice else None
+
+    def _spawn(self, warmup, session_key, paths):
+        env = dict(os.environ, PORTAL_WARMUP=warmup, BENCH_WARMUP_T0=repr(time.time()))
+        completed = subprocess.run(
+            [
+                sys.executable,
+                str(settings.BASE_DIR / "manage.py"),
+                "bench_warmup",
+                "--child",
+                "--session",
+                session_key,
+                "--paths",
+                ",".join(paths),
+            ],
+            env=env,
+            capture_output=True,
+            text=True,
+            check=False,
+        )
+        if completed.returncode != 0:
+            raise CommandError(completed.stderr.strip() or "Echec du processus de mesure.")
+        return json.loads(completed.stdout.strip().splitlines()[-1])
+
+    def _measure_child(self, options):
+        # Everything up to here (interpreter, django.setup(), server warm-up) is start-up.
+        warm_up_server()
+        startup = time.time() - float(os.environ.get("BENCH_WARMUP_T0", time.time()))
+        host = next((host.lstrip(".") for host in settings.ALLOWED_HOSTS if host != "*"), "localhost")
+        client = Client(HTTP_HOST=host)
+        if options["session"]:
+            client.cookies[settings.SESSION_COOKIE_NAME] = options["session"]
+        timings = {}
+        for path in filter(None, options["paths"].split(",")):
+            started = time.perf_counter()
+            response = client.get(path)
+            response.getvalue()
+            timings[path] = (time.perf_counter() - started) * 1000
+            if response.status_code >= 400:
+                raise CommandError(f"{path}: HTTP {response.status_code}")
+        self.stdout.write(json.dumps({"startup_ms": startup * 1000, "first_response_ms": timings}))
@@ -0,0 +1,111 @@
+"""Turn validated meter readings into the invoices of one month, optionally across several processes."""
+import json
+import os
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from portal import billing
+
+COUNTERS = ("contracts", "created", "skipped", "missing")
+
+
+class Command(BaseCommand):
+    help = (
+        "Bill active contracts for --period YYYY-MM from validated readings (bulk inserts by chunk, "
+        "idempotent: customers already invoiced for the period are skipped)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--period", required=True, help="Month to bill, YYYY-MM.")
+        parser.add_argument("--workers", type=int, default=1, help="Processes sharing the contracts by pk range.")
+        parser.add_argument("--chunk-size", type=int, default=billing.CHUNK_SIZE, help="Contracts per chunk.")
+        parser.add_argument(
+            "--estimate",
+            action="store_true",
+            help="First run estimate_readings for the period (customers without a validated reading).",
+        )
+        parser.add_argument("--child", action="store_true", help="Internal: run one worker.")
+        parser.add_argument("--pk-from", type=int, help="Internal: first contract pk (inclusive).")
+        parser.add_argument("--pk-to", type=int, help="Internal: last contract pk (exclusive).")
+
+    def handle(self, *args, **options):
+        try:
+            period_start, period_end = billing.parse_period(options["period"])
+        except ValueError as exc:
+            raise CommandError(str(exc)) from exc
+        chunk_size = max(1, options["chunk_size"])
+
+        if options["child"]:
+            totals = billing.run_billing(period_start, period_end, options["pk_from"], options["pk_to"], chunk_size)
+            self.stdout.write(json.dumps(totals))
+            return
+
+        if options["estimate"]:
+            call_command("estimate_readings", period=options["period"], chunk_size=chunk_size, stdout=self.stdout)
+
+        workers = max(1, options["workers"])
+        if workers > 1 and connection.vendor == "sqlite":
+            # A single SQLite writer: parallel inserts only queue up (and time out) on the write lock.
+            self.stdout.write("SQLite: un seul processus d'ecriture, --workers ignore.")
+            workers = 1
+        started = time.perf_counter()
+        bounds = self._pk_bounds(period_start, period_end, workers)
+        if len(bounds) <= 2:
+            totals = billing.run_billing(period_start, period_end, chunk_size=chunk_size)
+        else:
+            totals = self._run_workers(options["period"], bounds, chunk_size)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"Periode {options['period']}: {totals['contracts']} contrats, {totals['created']} factures creees, "
+            f"{totals['skipped']} deja facturees, {totals['missing']} sans releve "
+            f"({elapsed:.2f}s, {totals['contracts'] / elapsed if elapsed else 0:.0f} contrats/s)."
+        )
+
+    def _pk_bounds(self, period_start, period_end, workers):
+        """Split the contracts into contiguous pk ranges of about the same size."""
+        pks = billing.billable_contracts(period_start, period_end).order_by("pk").values_list("pk", flat=True)
+        count = pks.count()
+        if workers == 1 or count < 2 * workers:
+            return [None, None]
+        bounds = [pks[count * index // workers] for index in range(1, workers)]
+        return [None, *bounds, None]
+
+    def _run_workers(self, period, bounds, chunk_size):
+        processes = []
+        for pk_from, pk_to in zip(bounds, bounds[1:]):
+            command = [
+                sys.executable,
+                str(settings.BASE_DIR / "manage.py"),
+                "billing_run",
+                "--child",
+                "--period",
+                period,
+                "--chunk-size",
+                str(chunk_size),
+            ]
+            if pk_from is not None:
+                command += ["--pk-from", str(pk_from)]
+            if pk_to is not None:
+                command += ["--pk-to", str(pk_to)]
+            processes.append(
+                subprocess.Popen(command, env=os.environ.copy(), stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+            )
+        totals = dict.fromkeys(COUNTERS, 0)
+        errors = []
+        for process in processes:
+            stdout, stderr = process.communicate()
+            if process.returncode != 0:
+                errors.append(stderr.strip() or "Echec d'un processus de facturation.")
+                continue
+            for key, value in json.loads(stdout.strip().splitlines()[-1]).items():
+                totals[key] += value
+        if errors:
+            # Finished ranges are committed; running the same period again only bills what is left.
+            raise CommandError("\n".join(errors))
+        return totals
@@ -0,0 +1,70 @@
+"""Convert existing media files into hard links to content-addressed blobs and collect unused blobs."""
+import os
+from pathlib import Path
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+
+from portal.storage import BLOB_DIR, DedupFileSystemStorage, file_sha256, tag_digest
+
+
+class Command(BaseCommand):
+    help = "Deduplicate MEDIA_ROOT (hard links to blobs/<aa>/<sha256>) and remove blobs no longer linked."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--gc", action="store_true", help="Only remove blobs no file links to any more.")
+        parser.add_argument("--dry-run", action="store_true", help="Report the savings without touching files.")
+
+    def handle(self, *args, **options):
+        if not isinstance(default_storage, DedupFileSystemStorage):
+            raise CommandError("Le stockage par defaut n'est pas deduplique (MEDIA_DEDUP=1).")
+        root = Path(default_storage.location)
+        if not options["gc"]:
+            self.dedup(default_storage, root, options["dry_run"])
+        self.collect(root / BLOB_DIR, options["dry_run"])
+
+    def dedup(self, storage, root, dry_run):
+        files = linked = saved = 0
+        seen = set()
+        for path in sorted(root.rglob("*")):
+            if not path.is_file() or path.is_symlink() or BLOB_DIR in path.relative_to(root).parts[:1]:
+                continue
+            files += 1
+            stat = path.stat()
+            digest = file_sha256(path)
+            blob = storage.blob_path(digest)
+            if blob.exists() and os.path.samefile(blob, path):
+                seen.add(digest)
+                if not dry_run:
+                    tag_digest(blob, digest)  # linked before digests were recorded on the inode
+                continue
+            if blob.exists() or digest in seen:
+                saved += stat.st_size
+            seen.add(digest)
+            linked += 1
+            if dry_run:
+                continue
+            blob.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                os.link(path, blob)
+            except FileExistsError:
+                # Same content already stored: swap the file for a link to the blob.
+                tmp = path.with_name(f".{path.name}.dedup")
+                os.link(blob, tmp)
+                os.replace(tmp, path)
+            tag_digest(blob, digest)
+        verb = "a relier" if dry_run else "relies"
+        self.stdout.write(f"{files} fichiers, {linked} {verb}, {saved / 1024 / 1024:.1f} Mo economises.")
+
+    def collect(self, blob_root, dry_run):
+        removed = freed = 0
+        if blob_root.is_dir():
+            for blob in blob_root.glob("*/*"):
+                stat = blob.stat()
+                if blob.name.startswith(".") or stat.st_nlink > 1:
+                    continue
+                removed += 1
+                freed += stat.st_size
+                if not dry_run:
+                    blob.unlink()
+        self.stdout.write(f"{removed} blobs orphelins supprimes ({freed / 1024 / 1024:.1f} Mo).")
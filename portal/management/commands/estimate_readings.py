@@ -0,0 +1,34 @@
+"""Write estimated closing indexes for customers without a validated reading in a billing month."""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from portal import billing, estimation
+
+
+class Command(BaseCommand):
+    help = (
+        "Fit each customer's history (meter point history and validated readings) to the seasonal profile "
+        "and write an estimated validated reading at the end of --period YYYY-MM for every billable customer "
+        "without a validated reading in that month. Run it before billing_run (or use billing_run --estimate)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--period", required=True, help="Month to estimate, YYYY-MM.")
+        parser.add_argument("--chunk-size", type=int, default=billing.CHUNK_SIZE, help="Contracts per chunk.")
+
+    def handle(self, *args, **options):
+        if estimation.np is None:
+            raise CommandError("NumPy n'est pas installe.")
+        try:
+            period_start, period_end = billing.parse_period(options["period"])
+        except ValueError as exc:
+            raise CommandError(str(exc)) from exc
+        started = time.perf_counter()
+        totals = estimation.run_estimation(period_start, period_end, max(1, options["chunk_size"]))
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"Periode {options['period']}: {totals['contracts']} contrats, {totals['estimated']} index estimes, "
+            f"{totals['skipped']} avec releve ou deja factures, {totals['missing']} sans historique suffisant "
+            f"({elapsed:.2f}s)."
+        )
@@ -0,0 +1,63 @@
+"""Load smart-meter interval data (CSV: ean;timestamp;kwh) into the columnar interval store."""
+import csv
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from portal import intervals
+from portal.models import MeterPoint
+
+
+class Command(BaseCommand):
+    help = (
+        "Append 15-minute (or hourly) readings from a CSV file with columns ean, timestamp (ISO 8601 "
+        "with offset) and kwh, sorted by ean then time. Already stored intervals are skipped, late ones "
+        "(a backfilled gap) are merged in."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("csv_path", help="CSV file, ';' or ',' separated, with a header row.")
+        parser.add_argument("--batch-size", type=int, default=100000, help="Rows buffered per meter before appending.")
+
+    def handle(self, *args, **options):
+        if intervals.np is None:
+            raise CommandError("NumPy n'est pas installe (pip install numpy).")
+        started = time.perf_counter()
+        known = set(MeterPoint.objects.values_list("ean", flat=True))
+        self.rows = self.written = 0
+        self.unknown = set()
+        batch_size = max(1, options["batch_size"])
+
+        with open(options["csv_path"], newline="", encoding="utf-8-sig") as handle:
+            dialect = csv.Sniffer().sniff(handle.read(4096), delimiters=";,")
+            handle.seek(0)
+            ean, timestamps, kwh = None, [], []
+            for row in csv.DictReader(handle, dialect=dialect):
+                self.rows += 1
+                if row["ean"] != ean or len(timestamps) >= batch_size:
+                    self.flush(ean, timestamps, kwh, known)
+                    ean, timestamps, kwh = row["ean"], [], []
+                try:
+                    timestamps.append(int(datetime.fromisoformat(row["timestamp"]).timestamp()))
+                    kwh.append(float(row["kwh"]))
+                except ValueError as exc:
+                    raise CommandError(f"Ligne {self.rows + 1}: {exc}") from exc
+            self.flush(ean, timestamps, kwh, known)
+
+        self.stdout.write(
+            f"{self.rows} lignes lues, {self.written} intervalles ajoutes, {len(self.unknown)} EAN inconnus "
+            f"({time.perf_counter() - started:.2f}s)."
+        )
+
+    def flush(self, ean, timestamps, kwh, known):
+        if not timestamps:
+            return
+        if ean not in known:
+            self.unknown.add(ean)
+            return
+        try:
+            written = intervals.IntervalStore(ean).append(timestamps, kwh)
+        except ValueError as exc:
+            raise CommandError(f"EAN {ean}: {exc}") from exc
+        self.written += sum(len(month_ts) for month_ts, _ in written.values())
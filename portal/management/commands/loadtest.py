@@ -0,0 +1,279 @@
+"""Replay scripted customer journeys concurrently and report latency percentiles per route."""
+import json
+import math
+import platform
+import re
+import subprocess
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import date
+from http.cookiejar import CookieJar
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.core.wsgi import get_wsgi_application
+
+from .seed_load import load_username
+
+CSRF_RE = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+INVOICE_PDF_RE = re.compile(r'href="(/espace-client/factures/\d+/pdf/)"')
+
+# Route names reported in the JSON output (stable across commits).
+JOURNEY_ROUTES = [
+    "login_form",
+    "login_submit",
+    "client_dashboard",
+    "client_invoices",
+    "invoice_pdf_download",
+    "client_readings",
+    "client_readings_submit",
+]
+
+
+class _NoRedirectHandler(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+class _QuietRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(samples, duration):
+    """Build per-route statistics (milliseconds) from {route: [(elapsed_s, ok), ...]}."""
+    routes = {}
+    for route, items in samples.items():
+        timings = sorted(elapsed * 1000 for elapsed, _ in items)
+        routes[route] = {
+            "count": len(items),
+            "errors": sum(1 for _, ok in items if not ok),
+            "throughput_rps": round(len(items) / duration, 2) if duration else None,
+            "mean_ms": round(sum(timings) / len(timings), 2) if timings else None,
+            "p50_ms": _round(percentile(timings, 50)),
+            "p95_ms": _round(percentile(timings, 95)),
+            "p99_ms": _round(percentile(timings, 99)),
+            "max_ms": _round(timings[-1] if timings else None),
+        }
+    total = sum(route["count"] for route in routes.values())
+    return {
+        "requests": total,
+        "errors": sum(route["errors"] for route in routes.values()),
+        "duration_s": round(duration, 3),
+        "throughput_rps": round(total / duration, 2) if duration else None,
+    }, routes
+
+
+def _round(value):
+    return None if value is None else round(value, 2)
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+            timeout=5,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+class CustomerJourney:
+    """One simulated customer browsing the portal with its own cookie jar."""
+
+    def __init__(self, base_url, username, password, record):
+        self.base_url = base_url.rstrip("/")
+        self.username = username
+        self.password = password
+        self.record = record
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(CookieJar()),
+            _NoRedirectHandler(),
+        )
+
+    def request(self, route, path, data=None, expect=None):
+        """Time one request; it fails on an error status, or on any other status than `expect` if given."""
+        body = urllib.parse.urlencode(data).encode("utf-8") if data is not None else None
+        req = urllib.request.Request(f"{self.base_url}{path}", data=body)
+        if body is not None:
+            req.add_header("Referer", f"{self.base_url}{path}")
+        started = time.perf_counter()
+        try:
+            with self.opener.open(req, timeout=60) as response:
+                status = response.status
+                content = response.read()
+        except urllib.error.HTTPError as exc:
+            status = exc.code
+            content = exc.read()
+        except Exception:
+            # Connection errors, truncated responses...: count the request as failed, keep the thread going.
+            status = None
+            content = b""
+        elapsed = time.perf_counter() - started
+        ok = (status is not None and status < 400) if expect is None else status == expect
+        self.record(route, elapsed, ok)
+        return status, content.decode("utf-8", errors="replace")
+
+    def run(self, iteration):
+        _, page = self.request("login_form", "/connexion/")
+        token = _csrf_token(page)
+        # A refused login re-renders the form with a 200: only the redirect counts as a success.
+        status, _ = self.request(
+            "login_submit",
+            "/connexion/",
+            {"csrfmiddlewaretoken": token, "username": self.username, "password": self.password},
+            expect=302,
+        )
+        if status != 302:
+            return
+
+        self.request("client_dashboard", "/espace-client/")
+        _, page = self.request("client_invoices", "/espace-client/factures/")
+        pdf_links = INVOICE_PDF_RE.findall(page)
+        if pdf_links:
+            self.request("invoice_pdf_download", pdf_links[0])
+
+        _, page = self.request("client_readings", "/espace-client/releves/")
+        self.request(
+            "client_readings_submit",
+            "/espace-client/releves/",
+            {
+                "csrfmiddlewaretoken": _csrf_token(page),
+                "reading_date": date.today().isoformat(),
+                "value_kwh": 900000 + iteration,
+            },
+        )
+
+
+def _csrf_token(page):
+    match = CSRF_RE.search(page)
+    return match.group(1) if match else ""
+
+
+class Command(BaseCommand):
+    help = (
+        "Run concurrent customer journeys (login, dashboard, invoices, PDF, reading) against the portal "
+        "and print throughput and p50/p95/p99 latency per route as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default="", help="Target base URL (default: start the WSGI app in-process).")
+        parser.add_argument("--users", type=int, default=10, help="Concurrent simulated customers (threads).")
+        parser.add_argument("--iterations", type=int, default=5, help="Journeys per simulated customer.")
+        parser.add_argument("--warmup", type=int, default=1, help="Journeys per thread excluded from statistics.")
+        parser.add_argument("--accounts", type=int, default=0, help="Number of seed_load accounts to rotate (default: --users).")
+        parser.add_argument("--password", default="demo1234", help="Password of the seed_load accounts.")
+        parser.add_argument("--output", default="", help="Write the JSON report to this file.")
+        parser.add_argument("--baseline", default="", help="Previous JSON report to compare p95 against.")
+
+    def handle(self, *args, **options):
+        users = max(1, options["users"])
+        accounts = options["accounts"] or users
+        server = None
+        base_url = options["url"]
+        if not base_url:
+            server = ThreadedWSGIServer(("127.0.0.1", 0), _QuietRequestHandler, allow_reuse_address=True)
+            server.set_app(get_wsgi_application())
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            base_url = f"http://127.0.0.1:{server.server_port}"
+
+        lock = threading.Lock()
+        samples = {route: [] for route in JOURNEY_ROUTES}
+        recording = threading.Event()
+
+        def record(route, elapsed, ok):
+            if recording.is_set():
+                with lock:
+                    samples[route].append((elapsed, ok))
+
+        def worker(thread_index, barrier):
+            journey = CustomerJourney(
+                base_url,
+                username=load_username(thread_index % accounts + 1),
+                password=options["password"],
+                record=record,
+            )
+            try:
+                for iteration in range(options["warmup"]):
+                    journey.run(iteration)
+            except Exception:
+                barrier.abort()
+                raise
+            barrier.wait()
+            for iteration in range(options["iterations"]):
+                journey.run(options["warmup"] + iteration)
+
+        # The last thread to arrive turns recording on before any worker is released.
+        barrier = threading.Barrier(users + 1, action=recording.set)
+        threads = [threading.Thread(target=worker, args=(index, barrier)) for index in range(users)]
+        try:
+            for thread in threads:
+                thread.start()
+            try:
+                barrier.wait()
+            except threading.BrokenBarrierError:
+                raise CommandError("Echec pendant la phase de chauffe.")
+            started = time.perf_counter()
+            for thread in threads:
+                thread.join()
+            duration = time.perf_counter() - started
+        finally:
+            if server:
+                server.shutdown()
+                server.server_close()
+
+        totals, routes = summarize(samples, duration)
+        if not samples["client_dashboard"]:
+            raise CommandError("Aucun parcours n'a abouti: lancer d'abord seed_load et verifier --url/--password.")
+
+        report = {
+            "meta": {
+                "git_revision": _git_revision(),
+                "target": options["url"] or "in-process",
+                "users": users,
+                "iterations": options["iterations"],
+                "warmup": options["warmup"],
+                "journey": JOURNEY_ROUTES,
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "database": settings.DATABASES["default"]["ENGINE"],
+            },
+            "total": totals,
+            "routes": routes,
+        }
+        if options["baseline"]:
+            report["baseline_delta_p95_ms"] = _compare(report, options["baseline"])
+
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as handle:
+                handle.write(output + "\n")
+        self.stdout.write(output)
+
+
+def _compare(report, baseline_path):
+    with open(baseline_path, encoding="utf-8") as handle:
+        baseline = json.load(handle)
+    delta = {}
+    for route, stats in report["routes"].items():
+        previous = baseline.get("routes", {}).get(route, {}).get("p95_ms")
+        if previous is not None and stats["p95_ms"] is not None:
+            delta[route] = round(stats["p95_ms"] - previous, 2)
+    return delta
@@ -0,0 +1,52 @@
+"""Background worker building compressed previews of image attachments."""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from portal import images
+from portal.models import Attachment
+
+
+class Command(BaseCommand):
+    help = "Build previews / lossless PNG re-encodes for pending image attachments, once or every --interval seconds."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=50, help="Attachments processed per batch.")
+        parser.add_argument("--interval", type=int, default=0, help="Poll every N seconds (0 = drain once).")
+        parser.add_argument("--retry-failed", action="store_true", help="Queue failed attachments again first.")
+
+    def handle(self, *args, **options):
+        if images.Image is None:
+            # Leave the images pending instead of settling them without a preview.
+            raise CommandError("Pillow n'est pas installe: aucun apercu ne peut etre genere.")
+        if options["retry_failed"]:
+            Attachment.objects.filter(derivatives_status=Attachment.DERIVATIVES_FAILED).update(
+                derivatives_status=Attachment.DERIVATIVES_PENDING
+            )
+        while True:
+            started = time.perf_counter()
+            counts = self.drain(max(1, options["batch_size"]))
+            if any(counts.values()):
+                summary = ", ".join(f"{count} {status}" for status, count in counts.items())
+                self.stdout.write(f"Pieces jointes traitees: {summary} ({time.perf_counter() - started:.2f}s).")
+            if not options["interval"]:
+                break
+            time.sleep(options["interval"])
+
+    def drain(self, batch_size):
+        pending = Attachment.objects.filter(derivatives_status=Attachment.DERIVATIVES_PENDING)
+        image_filter = Q()
+        for extension in images.IMAGE_EXTENSIONS:
+            image_filter |= Q(file__iendswith=extension)
+        # PDFs and other documents never get derivatives: settle them in one UPDATE.
+        settled = pending.exclude(image_filter).update(derivatives_status=Attachment.DERIVATIVES_NONE)
+        counts = {Attachment.DERIVATIVES_NONE: settled}
+        while True:
+            batch = list(pending.filter(image_filter).order_by("pk")[:batch_size])
+            if not batch:
+                return counts
+            for attachment in batch:
+                attachment.derivatives_status = images.build_derivatives(attachment)
+                counts[attachment.derivatives_status] = counts.get(attachment.derivatives_status, 0) + 1
+            Attachment.objects.bulk_update(batch, ["preview", "optimized", "derivatives_status"])
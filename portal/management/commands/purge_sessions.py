@@ -0,0 +1,45 @@
+"""Delete expired sessions in small batches so the purge never holds the write lock for long."""
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = "Delete expired sessions in batches (short write transactions), once or every --interval seconds."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="Sessions deleted per transaction.")
+        parser.add_argument("--pause", type=float, default=0.05, help="Seconds to sleep between batches.")
+        parser.add_argument("--interval", type=int, default=0, help="Repeat every N seconds (0 = run once).")
+
+    def handle(self, *args, **options):
+        store_class = import_module(settings.SESSION_ENGINE).SessionStore
+        if not hasattr(store_class, "get_model_class"):
+            self.stdout.write("Sessions sans table (cookies signes, cache): rien a purger.")
+            return
+
+        model = store_class.get_model_class()
+        while True:
+            started = time.perf_counter()
+            deleted = self.purge(model, max(1, options["batch_size"]), options["pause"])
+            self.stdout.write(f"{deleted} sessions expirees supprimees ({time.perf_counter() - started:.2f}s).")
+            if not options["interval"]:
+                break
+            # Do not hold a connection (and a WAL read snapshot) while sleeping.
+            connection.close()
+            time.sleep(options["interval"])
+
+    def purge(self, model, batch_size, pause):
+        now = timezone.now()
+        deleted = 0
+        while True:
+            keys = list(model.objects.filter(expire_date__lt=now).values_list("session_key", flat=True)[:batch_size])
+            if not keys:
+                return deleted
+            deleted += model.objects.filter(session_key__in=keys).delete()[0]
+            if pause:
+                time.sleep(pause)
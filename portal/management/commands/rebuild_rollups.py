@@ -0,0 +1,29 @@
+"""Recompute the hour/day/month rollups from the raw interval data."""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from portal import intervals
+from portal.models import MeterPoint
+
+
+class Command(BaseCommand):
+    help = "Rebuild consumption rollups from stored intervals (all meter points, or --ean)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--ean", action="append", help="Only this meter point (repeatable).")
+
+    def handle(self, *args, **options):
+        if intervals.np is None:
+            raise CommandError("NumPy n'est pas installe (pip install numpy).")
+        started = time.perf_counter()
+        eans = options["ean"] or MeterPoint.objects.order_by("ean").values_list("ean", flat=True).iterator()
+        rebuilt = 0
+        for ean in eans:
+            store = intervals.IntervalStore(ean)
+            if not store.months():
+                continue
+            with store._locked():
+                store.rollups.rebuild()
+            rebuilt += 1
+        self.stdout.write(f"{rebuilt} compteurs recalcules ({time.perf_counter() - started:.2f}s).")
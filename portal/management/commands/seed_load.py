@@ -0,0 +1,248 @@
+"""Generate a large synthetic dataset for load testing and capacity planning."""
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from portal.billing import month_period
+from portal.models import (
+    Contract,
+    CustomerProfile,
+    Invitation,
+    Invoice,
+    MeterPoint,
+    MeterReading,
+    SupportRequest,
+)
+
+LOAD_USERNAME_PREFIX = "load."
+LOAD_EAN_PREFIX = "549"
+
+FIRST_NAMES = ["Aline", "Marc", "Sophie", "Luc", "Nadia", "Pieter", "Julie", "Karim", "Els", "Thomas"]
+LAST_NAMES = ["Dupont", "Leroy", "Peeters", "Janssens", "Maes", "Lambert", "Dubois", "Claes", "Renard", "Goossens"]
+CITIES = [
+    ("1000", "Bruxelles"),
+    ("4000", "Liege"),
+    ("5000", "Namur"),
+    ("6000", "Charleroi"),
+    ("7000", "Mons"),
+    ("9000", "Gent"),
+]
+STREETS = ["Rue des Carmes", "Avenue Louise", "Chaussee de Liege", "Rue du Marche", "Boulevard d'Avroy"]
+SUBJECTS = ["Question sur une facture", "Mise a jour des coordonnees", "Suivi d'une demande"]
+
+
+def load_username(index: int) -> str:
+    return f"{LOAD_USERNAME_PREFIX}{index:07d}@example.com"
+
+
+def load_ean(index: int) -> str:
+    return f"{LOAD_EAN_PREFIX}{index:015d}"
+
+
+class Command(BaseCommand):
+    help = (
+        "Create N synthetic customers with M months of history using batched bulk inserts "
+        "(users, profiles, contracts, meter points, invitations, invoices, readings, requests)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--customers", type=int, default=1000, help="Number of customers to create.")
+        parser.add_argument("--months", type=int, default=12, help="Months of invoice/reading history per customer.")
+        parser.add_argument("--batch-size", type=int, default=1000, help="Customers per bulk insert batch.")
+        parser.add_argument("--seed", type=int, default=2026, help="Random seed (same seed = same data).")
+        parser.add_argument("--password", default="demo1234", help="Password shared by all generated accounts.")
+        parser.add_argument("--clear", action="store_true", help="Delete previously generated load data first.")
+
+    def handle(self, *args, **options):
+        customers = options["customers"]
+        months = options["months"]
+        batch_size = max(1, options["batch_size"])
+        if customers < 1 or months < 0:
+            raise CommandError("--customers doit etre >= 1 et --months >= 0.")
+
+        User = get_user_model()
+        existing = User.objects.filter(username__startswith=LOAD_USERNAME_PREFIX)
+        if options["clear"]:
+            started = time.perf_counter()
+            deleted_users = existing.count()
+            existing.delete()
+            MeterPoint.objects.filter(ean__startswith=LOAD_EAN_PREFIX).delete()
+            self.stdout.write(f"Donnees de charge supprimees: {deleted_users} comptes ({time.perf_counter() - started:.1f}s).")
+        elif existing.exists():
+            raise CommandError("Des donnees de charge existent deja. Relancer avec --clear.")
+
+        # Hashing is deliberately slow: compute once and reuse for every row.
+        password_hash = make_password(options["password"])
+        secret_code_hash = make_password("LOAD-0000")
+
+        today = timezone.localdate()
+        periods = [month_period(today, offset) for offset in range(-months, 0)]
+
+        started = time.perf_counter()
+        for batch_start in range(0, customers, batch_size):
+            batch_indexes = range(batch_start + 1, min(batch_start + batch_size, customers) + 1)
+            with transaction.atomic():
+                counts = self._create_batch(
+                    batch_indexes,
+                    periods=periods,
+                    seed=options["seed"],
+                    password_hash=password_hash,
+                    secret_code_hash=secret_code_hash,
+                )
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"- clients {batch_indexes[0]}-{batch_indexes[-1]}: "
+                f"{counts['invoices']} factures, {counts['readings']} releves, "
+                f"{counts['requests']} demandes ({elapsed:.1f}s)"
+            )
+
+        self.stdout.write(self.style.SUCCESS(f"{customers} clients de charge crees en {time.perf_counter() - started:.1f}s."))
+
+    def _create_batch(self, indexes, periods, seed, password_hash, secret_code_hash):
+        User = get_user_model()
+        now = timezone.now()
+        rngs = {index: random.Random(f"{seed}-{index}") for index in indexes}
+
+        users = []
+        meter_points = []
+        for index in indexes:
+            rng = rngs[index]
+            postal_code, city = rng.choice(CITIES)
+            first_name = rng.choice(FIRST_NAMES)
+            last_name = rng.choice(LAST_NAMES)
+            users.append(
+                User(
+                    username=load_username(index),
+                    email=load_username(index),
+                    password=password_hash,
+                    first_name=first_name,
+                    last_name=last_name,
+                    is_active=True,
+                )
+            )
+            meter_points.append(
+                MeterPoint(
+                    ean=load_ean(index),
+                    address_line1=f"{rng.choice(STREETS)} {rng.randint(1, 250)}",
+                    postal_code=postal_code,
+                    city=city,
+                    country="BE",
+                    holder_firstname=first_name,
+                    holder_lastname=last_name,
+                )
+            )
+
+        users = _bulk_create_with_pks(User, users, "username")
+        meter_points = _bulk_create_with_pks(MeterPoint, meter_points, "ean")
+
+        invitations = []
+        contracts = []
+        profiles = []
+        for index, user, meter_point in zip(indexes, users, meter_points):
+            rng = rngs[index]
+            is_variable = rng.random() < 0.4
+            invitations.append(
+                Invitation(
+                    meter_point=meter_point,
+                    secret_code_hash=secret_code_hash,
+                    expires_at=now + timedelta(days=30),
+                    used_at=now,
+                    used_by=user,
+                )
+            )
+            contracts.append(
+                Contract(
+                    user=user,
+                    meter_point=meter_point,
+                    reference=f"CTR-LOAD-{index:07d}",
+                    start_date=periods[0][0] if periods else timezone.localdate(),
+                    plan_name="Offre Variable Indexee" if is_variable else "Offre Fixe Securisee",
+                    tariff_type=Contract.TARIFF_VARIABLE if is_variable else Contract.TARIFF_FIXED,
+                    supply_address=meter_point.full_address,
+                    status=Contract.STATUS_ACTIVE,
+                )
+            )
+            street, _, number = meter_point.address_line1.rpartition(" ")
+            profiles.append(
+                CustomerProfile(
+                    user=user,
+                    customer_ref=f"CLI-LOAD-{index:07d}",
+                    ean=meter_point.ean,
+                    supply_address_street=street,
+                    supply_address_number=number,
+                    supply_address_postal_code=meter_point.postal_code,
+                    supply_address_city=meter_point.city,
+                    billing_address_street=street,
+                    billing_address_number=number,
+                    billing_address_postal_code=meter_point.postal_code,
+                    billing_address_city=meter_point.city,
+                )
+            )
+        Invitation.objects.bulk_create(invitations)
+        Contract.objects.bulk_create(contracts)
+        CustomerProfile.objects.bulk_create(profiles)
+
+        invoices = []
+        readings = []
+        support_requests = []
+        for index, user, contract in zip(indexes, users, contracts):
+            rng = rngs[index]
+            meter_index = rng.randint(1000, 40000)
+            for period_number, (period_start, period_end) in enumerate(periods, start=1):
+                consumption = rng.randint(120, 620)
+                meter_index += consumption
+                total, unit_price, standing_charge = contract.estimate_invoice_amount(consumption, period_end)
+                invoices.append(
+                    Invoice(
+                        user=user,
+                        reference=f"FAC-LOAD-{index:07d}-{period_start:%Y%m}",
+                        period_start=period_start,
+                        period_end=period_end,
+                        issue_date=period_end + timedelta(days=3),
+                        consumption_kwh=consumption,
+                        unit_price_eur_kwh=unit_price,
+                        standing_charge_eur=standing_charge,
+                        amount_eur=total,
+                        status=Invoice.STATUS_PAID if period_number < len(periods) else Invoice.STATUS_DUE,
+                    )
+                )
+                readings.append(
+                    MeterReading(
+                        user=user,
+                        reading_date=period_end,
+                        value_kwh=meter_index,
+                        status=MeterReading.STATUS_VALIDATED,
+                    )
+                )
+            for _ in range(rng.randint(0, 2)):
+                support_requests.append(
+                    SupportRequest(
+                        user=user,
+                        subject=rng.choice(SUBJECTS),
+                        message="Demande generee pour les tests de charge.",
+                        status=rng.choice([SupportRequest.STATUS_OPEN, SupportRequest.STATUS_CLOSED]),
+                    )
+                )
+
+        Invoice.objects.bulk_create(invoices, batch_size=5000)
+        MeterReading.objects.bulk_create(readings, batch_size=5000)
+        SupportRequest.objects.bulk_create(support_requests, batch_size=5000)
+        return {"invoices": len(invoices), "readings": len(readings), "requests": len(support_requests)}
+
+
+def _bulk_create_with_pks(model, objects, lookup_field):
+    """Bulk insert rows and make sure primary keys are set (not all backends return them)."""
+    created = model.objects.bulk_create(objects)
+    if all(obj.pk is not None for obj in created):
+        return created
+    keys = [getattr(obj, lookup_field) for obj in created]
+    pks = dict(model.objects.filter(**{f"{lookup_field}__in": keys}).values_list(lookup_field, "pk"))
+    for obj in created:
+        obj.pk = pks[getattr(obj, lookup_field)]
+    return created
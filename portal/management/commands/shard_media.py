@@ -0,0 +1,85 @@
+"""Move flat media files into their hashed <prefix>/<aa>/<bb>/ directories and rewrite the paths in bulk."""
+import os
+import time
+from pathlib import Path
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from portal.models import Attachment, Domiciliation, Invoice
+from portal.storage import ShardedUploadTo
+
+FIELDS = [(Invoice, "pdf_file"), (Domiciliation, "document"), (Attachment, "file")]
+
+
+class Command(BaseCommand):
+    help = "Move existing uploads into two-level hashed directories, in batches (resumable)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="Rows moved and updated per transaction.")
+        parser.add_argument("--pause", type=float, default=0.0, help="Seconds to sleep between batches.")
+        parser.add_argument("--dry-run", action="store_true", help="Count the files to move without touching them.")
+
+    def handle(self, *args, **options):
+        if not hasattr(default_storage, "path"):
+            raise CommandError("Stockage sans chemin local: migration impossible.")
+        batch_size = max(1, options["batch_size"])
+        for model, field_name in FIELDS:
+            upload_to = model._meta.get_field(field_name).upload_to
+            if not isinstance(upload_to, ShardedUploadTo):
+                continue
+            started = time.perf_counter()
+            moved, missing = self.migrate(model, field_name, upload_to, batch_size, options)
+            self.stdout.write(
+                f"{model._meta.label}.{field_name}: {moved} fichiers deplaces, {missing} introuvables "
+                f"({time.perf_counter() - started:.2f}s)."
+            )
+
+    def migrate(self, model, field_name, upload_to, batch_size, options):
+        moved = missing = 0
+        last_pk = 0
+        rows = model.objects.exclude(**{f"{field_name}__isnull": True}).exclude(**{field_name: ""}).order_by("pk")
+        while True:
+            batch = list(rows.filter(pk__gt=last_pk).values_list("pk", field_name)[:batch_size])
+            if not batch:
+                return moved, missing
+            last_pk = batch[-1][0]
+            pending = [(pk, name, upload_to.sharded_name(name)) for pk, name in batch if not upload_to.is_sharded(name)]
+            if options["dry_run"]:
+                moved += len(pending)
+                continue
+            done = []
+            for pk, old_name, new_name in pending:
+                final_name = self.move(old_name, new_name)
+                if final_name:
+                    done.append((pk, old_name, final_name))
+                else:
+                    missing += 1
+            try:
+                with transaction.atomic():
+                    model.objects.bulk_update(
+                        [model(pk=pk, **{field_name: new_name}) for pk, _, new_name in done], [field_name]
+                    )
+            except Exception:
+                # Put the files back so the rows keep pointing at them.
+                for _, old_name, new_name in done:
+                    self.move(new_name, old_name)
+                raise
+            moved += len(done)
+            if options["pause"]:
+                time.sleep(options["pause"])
+
+    def move(self, old_name, new_name):
+        """Rename the file on disk; return the name it ended up under, or None if it is missing."""
+        source = Path(default_storage.path(old_name))
+        target = Path(default_storage.path(new_name))
+        if not source.exists():
+            # Already moved by an interrupted run: only the database path is left to update.
+            return new_name if target.exists() else None
+        if target.exists() and not os.path.samefile(source, target):
+            new_name = default_storage.get_available_name(new_name)
+            target = Path(default_storage.path(new_name))
+        target.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(source, target)
+        return new_name
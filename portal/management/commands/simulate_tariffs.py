@@ -0,0 +1,63 @@
+"""What-if: impact of candidate tariff terms on the invoices of a period, for the whole customer base."""
+import time
+from decimal import Decimal, InvalidOperation
+
+from django.core.management.base import BaseCommand, CommandError
+
+from portal import billing, simulator
+
+
+def _price(value):
+    try:
+        return Decimal(value)
+    except InvalidOperation:
+        raise CommandError(f"Prix invalide: {value!r}") from None
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-price every invoice of --from..--to (YYYY-MM) with candidate terms (NumPy, integer cents, "
+        "ROUND_HALF_UP) and report revenue and the distribution of bill changes per customer."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--from", dest="period_from", required=True, help="First month, YYYY-MM.")
+        parser.add_argument("--to", dest="period_to", required=True, help="Last month, YYYY-MM.")
+        parser.add_argument("--fixed-price", type=_price, help="Candidate EUR/kWh for fixed contracts.")
+        parser.add_argument("--standing-charge", type=_price, help="Candidate monthly standing charge (EUR).")
+        parser.add_argument("--variable-prices", help="12 comma separated EUR/kWh, January to December.")
+
+    def handle(self, *args, **options):
+        if simulator.np is None:
+            raise CommandError("NumPy n'est pas installe (pip install numpy).")
+        try:
+            period_start, _ = billing.parse_period(options["period_from"])
+            _, period_end = billing.parse_period(options["period_to"])
+        except ValueError as exc:
+            raise CommandError(str(exc)) from exc
+        variable_prices = None
+        if options["variable_prices"]:
+            variable_prices = [_price(value) for value in options["variable_prices"].split(",")]
+            if len(variable_prices) != 12:
+                raise CommandError("--variable-prices attend 12 prix (janvier a decembre).")
+
+        started = time.perf_counter()
+        base = simulator.load_base(period_start, period_end)
+        loaded = time.perf_counter()
+        result = simulator.simulate(base, options["fixed_price"], options["standing_charge"], variable_prices)
+        computed = time.perf_counter()
+
+        self.stdout.write(
+            f"{result['invoices']} factures, {result['customers']} clients "
+            f"(chargement {loaded - started:.2f}s, calcul {computed - loaded:.3f}s)."
+        )
+        self.stdout.write(
+            f"Chiffre d'affaires: {result['current_revenue']} EUR -> {result['candidate_revenue']} EUR "
+            f"({result['revenue_change']:+} EUR)."
+        )
+        self.stdout.write(
+            f"Clients en hausse: {result['increased']}, en baisse: {result['decreased']}, "
+            f"inchanges: {result['unchanged']}."
+        )
+        for row in result["percentiles"]:
+            self.stdout.write(f"  p{row['percentile']:<3} {row['change']:+} EUR ({row['change_pct']:+.1f} %)")
@@ -0,0 +1,38 @@
+"""Checkpoint the SQLite WAL file and refresh query planner statistics."""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+CHECKPOINT_MODES = ["PASSIVE", "FULL", "RESTART", "TRUNCATE"]
+
+
+class Command(BaseCommand):
+    help = "Run PRAGMA wal_checkpoint and PRAGMA optimize on the SQLite database (once or every --interval seconds)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--mode", choices=CHECKPOINT_MODES, default="TRUNCATE", help="wal_checkpoint mode.")
+        parser.add_argument("--interval", type=int, default=0, help="Repeat every N seconds (0 = run once).")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("Commande reservee a SQLite.")
+
+        while True:
+            self.run_once(options["mode"])
+            if not options["interval"]:
+                break
+            # Do not hold a connection (and a WAL read snapshot) while sleeping.
+            connection.close()
+            time.sleep(options["interval"])
+
+    def run_once(self, mode):
+        started = time.perf_counter()
+        with connection.cursor() as cursor:
+            cursor.execute(f"PRAGMA wal_checkpoint({mode})")
+            busy, wal_pages, checkpointed_pages = cursor.fetchone()
+            cursor.execute("PRAGMA optimize")
+        self.stdout.write(
+            f"Checkpoint {mode}: {checkpointed_pages}/{wal_pages} pages WAL"
+            f"{' (bloque par un lecteur)' if busy else ''}, optimize OK ({time.perf_counter() - started:.2f}s)."
+        )
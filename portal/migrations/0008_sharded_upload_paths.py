@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:01
+
+import portal.storage
+import portal.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portal', '0007_contract_fixed_unit_price_eur_kwh_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='attachment',
+            name='file',
+            field=models.FileField(upload_to=portal.storage.ShardedUploadTo('support_attachments'), validators=[portal.validators.validate_upload_extension, portal.validators.validate_upload_size]),
+        ),
+        migrations.AlterField(
+            model_name='domiciliation',
+            name='document',
+            field=models.FileField(upload_to=portal.storage.ShardedUploadTo('domiciliation'), validators=[portal.validators.validate_upload_extension, portal.validators.validate_upload_size]),
+        ),
+        migrations.AlterField(
+            model_name='invoice',
+            name='pdf_file',
+            field=models.FileField(blank=True, null=True, upload_to=portal.storage.ShardedUploadTo('invoices'), validators=[portal.validators.validate_upload_extension, portal.validators.validate_upload_size]),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:03
+
+import portal.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portal', '0008_sharded_upload_paths'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attachment',
+            name='derivatives_status',
+            field=models.CharField(choices=[('pending', 'À traiter'), ('ready', 'Aperçu disponible'), ('none', 'Sans aperçu'), ('failed', 'Échec')], db_index=True, default='pending', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='attachment',
+            name='optimized',
+            field=models.FileField(blank=True, upload_to=portal.storage.ShardedUploadTo('support_attachments')),
+        ),
+        migrations.AddField(
+            model_name='attachment',
+            name='preview',
+            field=models.FileField(blank=True, upload_to=portal.storage.ShardedUploadTo('support_attachments')),
+        ),
+    ]
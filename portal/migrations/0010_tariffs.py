@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def create_variable_tariff(apps, schema_editor):
+    # No prices yet: variable contracts keep the seasonal default prices until some are added.
+    Tariff = apps.get_model("portal", "Tariff")
+    Tariff.objects.get_or_create(code="variable", defaults={"name": "Offre Variable Indexee"})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portal', '0009_attachment_derivatives'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tariff',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.SlugField(max_length=30, unique=True)),
+                ('name', models.CharField(max_length=100)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TariffPrice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('valid_from', models.DateField()),
+                ('unit_price_eur_kwh', models.DecimalField(decimal_places=4, max_digits=6)),
+                ('tariff', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='prices', to='portal.tariff')),
+            ],
+            options={
+                'ordering': ['tariff', 'valid_from'],
+                'constraints': [models.UniqueConstraint(fields=('tariff', 'valid_from'), name='unique_tariff_price_start')],
+            },
+        ),
+        migrations.RunPython(create_variable_tariff, migrations.RunPython.noop),
+    ]
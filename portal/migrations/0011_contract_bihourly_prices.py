@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:27
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portal', '0010_tariffs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contract',
+            name='offpeak_unit_price_eur_kwh',
+            field=models.DecimalField(decimal_places=4, default=Decimal('0.2350'), max_digits=6),
+        ),
+        migrations.AddField(
+            model_name='contract',
+            name='peak_unit_price_eur_kwh',
+            field=models.DecimalField(decimal_places=4, default=Decimal('0.3150'), max_digits=6),
+        ),
+        migrations.AlterField(
+            model_name='contract',
+            name='tariff_type',
+            field=models.CharField(choices=[('fixed', 'Fixe'), ('variable', 'Variable'), ('bihourly', 'Bihoraire (heures pleines / creuses)')], default='fixed', max_length=20),
+        ),
+    ]
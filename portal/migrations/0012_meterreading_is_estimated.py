@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portal', '0011_contract_bihourly_prices'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='meterreading',
+            name='is_estimated',
+            field=models.BooleanField(default=False),
+        ),
+    ]
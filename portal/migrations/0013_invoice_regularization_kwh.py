@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portal', '0012_meterreading_is_estimated'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='invoice',
+            name='regularization_kwh',
+            field=models.IntegerField(default=0),
+        ),
+    ]
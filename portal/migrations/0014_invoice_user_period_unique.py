@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:46
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portal', '0013_invoice_regularization_kwh'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='invoice',
+            constraint=models.UniqueConstraint(fields=('user', 'period_start'), name='portal_invoice_user_period_unique'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portal', '0014_invoice_user_period_unique'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tariff',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='tariffprice',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -1,6 +1,7 @@
 ﻿"""Business models (simple and pedagogical)."""
 import secrets
 import string
+from datetime import timedelta
 from decimal import Decimal, ROUND_HALF_UP
 
 from django.conf import settings
@@ -9,8 +10,13 @@ from django.core.exceptions import ValidationError
 from django.db import models
 from django.utils import timezone
 
+from .storage import ShardedUploadTo
+from .tariffs import tariff_index
+from .tou import blended_unit_price
 from .validators import validate_upload_extension, validate_upload_size
 
+CENT = Decimal("0.01")
+
 
 class MeterPoint(models.Model):
     """Supply point used for invitation-based onboarding."""
@@ -37,6 +43,13 @@ class MeterPoint(models.Model):
                 raise ValidationError("Le code EAN ne peut pas etre modifie.")
         super().save(*args, **kwargs)
 
+    @property
+    def intervals(self):
+        """Smart-meter interval data of this supply point (portal.intervals.IntervalStore)."""
+        from .intervals import IntervalStore
+
+        return IntervalStore(self.ean)
+
     @property
     def full_address(self) -> str:
         line2 = f", {self.address_line2}" if self.address_line2 else ""
@@ -65,6 +78,34 @@ class MeterPointHistory(models.Model):
         return f"{self.meter_point.ean} {self.period_start:%Y-%m}"
 
 
+class Tariff(models.Model):
+    """Priced offer; contracts on the variable tariff use the one whose code is "variable"."""
+
+    code = models.SlugField(max_length=30, unique=True)
+    name = models.CharField(max_length=100)
+    # Max(updated_at) tells the workers a tariff changed when the cache is per process (see tariffs.py).
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return self.name
+
+
+class TariffPrice(models.Model):
+    """Unit price valid from valid_from until the next price of the same tariff."""
+
+    tariff = models.ForeignKey(Tariff, on_delete=models.CASCADE, related_name="prices")
+    valid_from = models.DateField()
+    unit_price_eur_kwh = models.DecimalField(max_digits=6, decimal_places=4)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["tariff", "valid_from"]
+        constraints = [models.UniqueConstraint(fields=["tariff", "valid_from"], name="unique_tariff_price_start")]
+
+    def __str__(self) -> str:
+        return f"{self.tariff} {self.valid_from:%Y-%m-%d}"
+
+
 class Contract(models.Model):
     """Energy supply contract linked to a user."""
 
@@ -80,9 +121,11 @@ class Contract(models.Model):
 
     TARIFF_FIXED = "fixed"
     TARIFF_VARIABLE = "variable"
+    TARIFF_BIHOURLY = "bihourly"
     TARIFF_CHOICES = [
         (TARIFF_FIXED, "Fixe"),
         (TARIFF_VARIABLE, "Variable"),
+        (TARIFF_BIHOURLY, "Bihoraire (heures pleines / creuses)"),
     ]
 
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
@@ -93,6 +136,8 @@ class Contract(models.Model):
     tariff_type = models.CharField(max_length=20, choices=TARIFF_CHOICES, default=TARIFF_FIXED)
     standing_charge_eur = models.DecimalField(max_digits=8, decimal_places=2, default=Decimal("12.00"))
     fixed_unit_price_eur_kwh = models.DecimalField(max_digits=6, decimal_places=4, default=Decimal("0.2850"))
+    peak_unit_price_eur_kwh = models.DecimalField(max_digits=6, decimal_places=4, default=Decimal("0.3150"))
+    offpeak_unit_price_eur_kwh = models.DecimalField(max_digits=6, decimal_places=4, default=Decimal("0.2350"))
     supply_address = models.CharField(max_length=200)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_ACTIVE)
 
@@ -102,30 +147,42 @@ class Contract(models.Model):
     def unit_price_for_date(self, target_date) -> Decimal:
         if self.tariff_type == self.TARIFF_FIXED:
             return Decimal(self.fixed_unit_price_eur_kwh)
-
-        monthly_prices = {
-            1: Decimal("0.3450"),
-            2: Decimal("0.3380"),
-            3: Decimal("0.3220"),
-            4: Decimal("0.2980"),
-            5: Decimal("0.2790"),
-            6: Decimal("0.2650"),
-            7: Decimal("0.2580"),
-            8: Decimal("0.2620"),
-            9: Decimal("0.2770"),
-            10: Decimal("0.3010"),
-            11: Decimal("0.3280"),
-            12: Decimal("0.3420"),
-        }
-        return monthly_prices.get(target_date.month, Decimal("0.3000"))
+        if self.tariff_type == self.TARIFF_BIHOURLY:
+            return blended_unit_price(self.peak_unit_price_eur_kwh, self.offpeak_unit_price_eur_kwh)
+        return tariff_index().unit_price(self.TARIFF_VARIABLE, target_date)
 
     def estimate_invoice_amount(self, consumption_kwh: int, period_end):
         unit_price = self.unit_price_for_date(period_end)
         standing_charge = Decimal(self.standing_charge_eur)
-        energy_amount = (Decimal(consumption_kwh) * unit_price).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-        total = (standing_charge + energy_amount).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+        energy_amount = (Decimal(consumption_kwh) * unit_price).quantize(CENT, rounding=ROUND_HALF_UP)
+        total = (standing_charge + energy_amount).quantize(CENT, rounding=ROUND_HALF_UP)
         return total, unit_price, standing_charge
 
+    def time_of_use_bill(self, period_start, period_end):
+        """Bi-hourly bill (portal.tou.TouBill) of the period from the meter's interval data.
+
+        None unless the interval data covers every hour of the period: a lagging or interrupted feed
+        would otherwise bill missing hours as 0 kWh.
+        """
+        if self.tariff_type != self.TARIFF_BIHOURLY or self.meter_point is None:
+            return None
+        from . import tou
+        from .rollups import local_midnight
+
+        store = self.meter_point.intervals
+        start, end = local_midnight(period_start), local_midnight(period_end + timedelta(days=1))
+        if tou.np is None or not store.covers(start, end):
+            return None
+        # Bands are whole hours: the hourly rollup prices the same as the raw intervals.
+        timestamps, kwh = store.rollups.hourly(start, end)
+        return tou.price_intervals(
+            tou.BIHOURLY,
+            timestamps,
+            kwh,
+            (self.peak_unit_price_eur_kwh, self.offpeak_unit_price_eur_kwh),
+            self.standing_charge_eur,
+        )
+
 
 class Invitation(models.Model):
     """Invitation generated by admin for self-registration."""
@@ -218,12 +275,14 @@ class Invoice(models.Model):
     period_end = models.DateField()
     issue_date = models.DateField()
     consumption_kwh = models.PositiveIntegerField(default=0)
+    # Estimated kWh billed before and credited back once a real index is known (<= 0).
+    regularization_kwh = models.IntegerField(default=0)
     unit_price_eur_kwh = models.DecimalField(max_digits=6, decimal_places=4, default=Decimal("0.0000"))
     standing_charge_eur = models.DecimalField(max_digits=8, decimal_places=2, default=Decimal("0.00"))
     amount_eur = models.DecimalField(max_digits=8, decimal_places=2)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_DUE)
     pdf_file = models.FileField(
-        upload_to="invoices/",
+        upload_to=ShardedUploadTo("invoices"),
         blank=True,
         null=True,
         validators=[validate_upload_extension, validate_upload_size],
@@ -231,6 +290,10 @@ class Invoice(models.Model):
 
     class Meta:
         ordering = ["-issue_date"]
+        constraints = [
+            # One invoice per customer and period, even across concurrent billing runs.
+            models.UniqueConstraint(fields=["user", "period_start"], name="portal_invoice_user_period_unique"),
+        ]
 
     def __str__(self) -> str:
         return f"{self.reference}"
@@ -254,6 +317,7 @@ class MeterReading(models.Model):
     value_kwh = models.PositiveIntegerField()
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_SUBMITTED)
     note = models.CharField(max_length=255, blank=True)
+    is_estimated = models.BooleanField(default=False)
 
     class Meta:
         ordering = ["-reading_date"]
@@ -305,7 +369,7 @@ class Domiciliation(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
     document = models.FileField(
-        upload_to="domiciliation/",
+        upload_to=ShardedUploadTo("domiciliation"),
         validators=[validate_upload_extension, validate_upload_size],
     )
 
@@ -319,12 +383,30 @@ class Domiciliation(models.Model):
 class Attachment(models.Model):
     """Attachment linked to a support request (1-n)."""
 
+    DERIVATIVES_PENDING = "pending"
+    DERIVATIVES_READY = "ready"
+    DERIVATIVES_NONE = "none"
+    DERIVATIVES_FAILED = "failed"
+
+    DERIVATIVES_CHOICES = [
+        (DERIVATIVES_PENDING, "À traiter"),
+        (DERIVATIVES_READY, "Aperçu disponible"),
+        (DERIVATIVES_NONE, "Sans aperçu"),
+        (DERIVATIVES_FAILED, "Échec"),
+    ]
+
     support_request = models.ForeignKey(SupportRequest, on_delete=models.CASCADE, related_name="attachments")
     file = models.FileField(
-        upload_to="support_attachments/",
+        upload_to=ShardedUploadTo("support_attachments"),
         validators=[validate_upload_extension, validate_upload_size],
     )
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    # Filled by the process_attachments worker, stored next to the original (which is never modified).
+    preview = models.FileField(upload_to=ShardedUploadTo("support_attachments"), blank=True)
+    optimized = models.FileField(upload_to=ShardedUploadTo("support_attachments"), blank=True)
+    derivatives_status = models.CharField(
+        max_length=10, choices=DERIVATIVES_CHOICES, default=DERIVATIVES_PENDING, db_index=True
+    )
 
     class Meta:
         ordering = ["-uploaded_at"]
@@ -0,0 +1,81 @@
+"""Full-page cache for anonymous GETs of public pages."""
+import functools
+import hashlib
+import re
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.utils.translation import get_language
+
+CSRF_INPUT_RE = re.compile(rb'(name="csrfmiddlewaretoken" value=")[^"]*(")')
+CSRF_PLACEHOLDER = b"__ELECTRUC_CSRF_TOKEN__"
+
+
+@functools.lru_cache(maxsize=1)
+def template_version():
+    """Deploy version of the rendered pages: PAGE_CACHE_VERSION, else a hash of templates and static manifest."""
+    if settings.PAGE_CACHE_VERSION:
+        return settings.PAGE_CACHE_VERSION
+    digest = hashlib.sha1()
+    for directory in (Path(settings.BASE_DIR) / "templates", Path(apps.get_app_config("portal").path) / "templates"):
+        for path in sorted(directory.rglob("*")):
+            if path.is_file():
+                digest.update(path.relative_to(directory).as_posix().encode("utf-8"))
+                digest.update(path.read_bytes())
+    manifest = Path(settings.STATIC_ROOT) / "staticfiles.json"
+    if manifest.exists():
+        digest.update(manifest.read_bytes())
+    return digest.hexdigest()[:12]
+
+
+def page_cache_key(request):
+    return f"page:{template_version()}:{get_language()}:{request.path}"
+
+
+def _is_cacheable(request):
+    return (
+        settings.PAGE_CACHE_SECONDS > 0
+        and request.method in ("GET", "HEAD")
+        and not request.GET
+        and not request.user.is_authenticated
+        # len() does not consume pending messages, which must be shown by a fresh render.
+        and not len(messages.get_messages(request))
+    )
+
+
+def _with_csrf_token(request, content):
+    if CSRF_PLACEHOLDER not in content:
+        return content
+    return content.replace(CSRF_PLACEHOLDER, get_token(request).encode("ascii"))
+
+
+def cache_anonymous_page(view_func):
+    """Serve anonymous GETs from the cache; the CSRF input is re-filled for every request."""
+
+    @functools.wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if not _is_cacheable(request):
+            return view_func(request, *args, **kwargs)
+
+        cache = caches[settings.PAGE_CACHE_ALIAS]
+        key = page_cache_key(request)
+        cached = cache.get(key)
+        if cached is not None:
+            content, content_type = cached
+            response = HttpResponse(_with_csrf_token(request, content), content_type=content_type)
+            response["X-Page-Cache"] = "hit"
+            return response
+
+        response = view_func(request, *args, **kwargs)
+        if response.status_code == 200 and not response.streaming and not response.cookies:
+            content = CSRF_INPUT_RE.sub(rb"\1" + CSRF_PLACEHOLDER + rb"\2", response.content)
+            cache.set(key, (content, response["Content-Type"]), settings.PAGE_CACHE_SECONDS)
+            response["X-Page-Cache"] = "miss"
+        return response
+
+    return wrapper
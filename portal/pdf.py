@@ -0,0 +1,553 @@
+"""PDF documents (invoice, contract, CGV, direct debit form) built from plain data.
+
+These functions never touch the request or the database, so they can run in a worker thread.
+"""
+import functools
+from io import BytesIO
+from decimal import Decimal
+
+from django.contrib.staticfiles import finders
+
+
+def _get_reportlab():
+    try:
+        from reportlab.lib.pagesizes import A4
+        from reportlab.lib.units import mm
+        from reportlab.pdfgen import canvas
+    except ModuleNotFoundError:
+        return None, None, None
+    return A4, mm, canvas
+
+
+def _build_fallback_pdf(document_title: str, lines=None) -> bytes:
+    """Build a minimal valid PDF without external dependencies."""
+    lines = lines or []
+
+    def _escape_pdf_text(text):
+        return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+    content_rows = [
+        "BT",
+        "/F1 16 Tf",
+        "50 800 Td",
+        f"({_escape_pdf_text(document_title)}) Tj",
+        "ET",
+    ]
+    y = 770
+    for row in lines[:20]:
+        content_rows.extend(
+            [
+                "BT",
+                "/F1 11 Tf",
+                f"50 {y} Td",
+                f"({_escape_pdf_text(str(row))}) Tj",
+                "ET",
+            ]
+        )
+        y -= 18
+    stream = "\n".join(content_rows).encode("latin-1", errors="replace")
+
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Contents 4 0 R /Resources << /Font << /F1 5 0 R >> >> >>",
+        f"<< /Length {len(stream)} >>\nstream\n".encode("ascii") + stream + b"\nendstream",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+
+    pdf = bytearray(b"%PDF-1.4\n")
+    offsets = [0]
+    for idx, obj in enumerate(objects, start=1):
+        offsets.append(len(pdf))
+        pdf.extend(f"{idx} 0 obj\n".encode("ascii"))
+        pdf.extend(obj)
+        pdf.extend(b"\nendobj\n")
+
+    xref_pos = len(pdf)
+    pdf.extend(f"xref\n0 {len(objects) + 1}\n".encode("ascii"))
+    pdf.extend(b"0000000000 65535 f \n")
+    for offset in offsets[1:]:
+        pdf.extend(f"{offset:010d} 00000 n \n".encode("ascii"))
+    pdf.extend(f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\n".encode("ascii"))
+    pdf.extend(f"startxref\n{xref_pos}\n%%EOF\n".encode("ascii"))
+    return bytes(pdf)
+
+
+LOGO_WIDTH_MM = 57
+LOGO_HEIGHT_MM = 18
+# Print resolution of the header logo: every extra pixel is recompressed into each PDF.
+LOGO_DPI = 200
+
+
+@functools.lru_cache(maxsize=1)
+def _branding_logo():
+    """Header logo, decoded and downscaled once per process (file path if Pillow is missing)."""
+    logo_path = finders.find("branding/logo-transparent.png") or finders.find("branding/logo.png")
+    if not logo_path:
+        return None
+    try:
+        from PIL import Image
+    except ImportError:
+        return logo_path
+    with Image.open(logo_path) as source:
+        logo = source.copy()
+    logo.thumbnail((round(LOGO_WIDTH_MM / 25.4 * LOGO_DPI), round(LOGO_HEIGHT_MM / 25.4 * LOGO_DPI)))
+    return logo
+
+
+def _draw_pdf_header(pdf, mm, title: str):
+    logo = _branding_logo()
+    if logo:
+        if not isinstance(logo, str):
+            from reportlab.lib.utils import ImageReader
+
+            logo = ImageReader(logo)
+        pdf.drawImage(
+            logo,
+            20 * mm,
+            268 * mm,
+            width=LOGO_WIDTH_MM * mm,
+            height=LOGO_HEIGHT_MM * mm,
+            preserveAspectRatio=True,
+            mask="auto",
+            anchor="sw",
+        )
+    else:
+        pdf.setFont("Helvetica-Bold", 16)
+        pdf.drawString(20 * mm, 277 * mm, "Electruc")
+
+    pdf.setFont("Helvetica-Bold", 10)
+    pdf.drawRightString(190 * mm, 285 * mm, "Electruc SA")
+    pdf.setFont("Helvetica", 9)
+    pdf.drawRightString(190 * mm, 280 * mm, "Avenue des Services 100")
+    pdf.drawRightString(190 * mm, 275 * mm, "1000 Bruxelles - Belgique")
+    pdf.drawRightString(190 * mm, 270 * mm, "TVA BE0123.456.789")
+
+    pdf.setStrokeColorRGB(0.85, 0.88, 0.9)
+    pdf.line(20 * mm, 266 * mm, 190 * mm, 266 * mm)
+
+    pdf.setFont("Helvetica-Bold", 16)
+    pdf.drawString(20 * mm, 258 * mm, title)
+
+
+
+def build_invoice_pdf(invoice, user, profile) -> bytes:
+    """Invoice PDF for an invoice without stored file."""
+    A4, mm, canvas = _get_reportlab()
+    if not canvas:
+        fallback_pdf = _build_fallback_pdf(
+            document_title=f"Facture {invoice.reference}",
+            lines=[
+                f"Date d'emission: {invoice.issue_date}",
+                f"Periode: {invoice.period_start} -> {invoice.period_end}",
+                f"Montant: {invoice.amount_eur} EUR",
+                f"Statut: {invoice.get_status_display()}",
+            ],
+        )
+        return fallback_pdf
+    buffer = BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=A4)
+    _draw_pdf_header(pdf, mm, "Facture")
+    client_name = user.get_full_name() or user.username
+    client_lines = [client_name]
+    if profile:
+        client_lines.append(f"{profile.supply_address_street} {profile.supply_address_number}".strip())
+        client_lines.append(f"{profile.supply_address_postal_code} {profile.supply_address_city}".strip())
+    if user.email:
+        client_lines.append(user.email)
+
+    # Client block
+    pdf.setStrokeColorRGB(0.87, 0.9, 0.92)
+    pdf.rect(20 * mm, 215 * mm, 80 * mm, 35 * mm, stroke=1, fill=0)
+    pdf.setFont("Helvetica-Bold", 9)
+    pdf.drawString(23 * mm, 245 * mm, "Facturee a")
+    pdf.setFont("Helvetica", 9)
+    y_client = 240 * mm
+    for line in client_lines[:4]:
+        pdf.drawString(23 * mm, y_client, line)
+        y_client -= 5 * mm
+
+    # Document metadata block
+    pdf.rect(110 * mm, 215 * mm, 80 * mm, 35 * mm, stroke=1, fill=0)
+    pdf.setFont("Helvetica", 9)
+    pdf.drawString(113 * mm, 245 * mm, f"Reference: {invoice.reference}")
+    pdf.drawString(113 * mm, 240 * mm, f"Date d'emission: {invoice.issue_date:%d/%m/%Y}")
+    pdf.drawString(113 * mm, 235 * mm, f"Periode: {invoice.period_start:%d/%m/%Y}")
+    pdf.drawString(113 * mm, 230 * mm, f"au {invoice.period_end:%d/%m/%Y}")
+    pdf.drawString(113 * mm, 225 * mm, f"Statut: {invoice.get_status_display()}")
+
+    total = Decimal(invoice.amount_eur)
+    abonnement = Decimal(invoice.standing_charge_eur or Decimal("0.00")).quantize(Decimal("0.01"))
+    consommation = (Decimal(invoice.consumption_kwh) * Decimal(invoice.unit_price_eur_kwh)).quantize(Decimal("0.01"))
+    regularisation = (Decimal(invoice.regularization_kwh) * Decimal(invoice.unit_price_eur_kwh)).quantize(
+        Decimal("0.01")
+    )
+    taxes = (total - abonnement - consommation - regularisation).quantize(Decimal("0.01"))
+
+    # Detail table
+    table_left = 20 * mm
+    table_width = 170 * mm
+    table_top = 202 * mm
+    row_height = 9 * mm
+    rows = [
+        ("Abonnement mensuel", abonnement),
+        (
+            f"Consommation energie ({invoice.consumption_kwh} kWh x {Decimal(invoice.unit_price_eur_kwh)} EUR/kWh)",
+            consommation,
+        ),
+        ("Taxes et contributions", taxes),
+    ]
+    if invoice.regularization_kwh:
+        rows.insert(
+            2,
+            (
+                f"Regularisation estimation ({invoice.regularization_kwh} kWh x "
+                f"{Decimal(invoice.unit_price_eur_kwh)} EUR/kWh)",
+                regularisation,
+            ),
+        )
+
+    pdf.setFillColorRGB(0.95, 0.97, 0.98)
+    pdf.rect(table_left, table_top, table_width, row_height, stroke=0, fill=1)
+    pdf.setFillColorRGB(0, 0, 0)
+    pdf.setFont("Helvetica-Bold", 9)
+    pdf.drawString(table_left + 3 * mm, table_top + 3 * mm, "Description")
+    pdf.drawRightString(table_left + table_width - 3 * mm, table_top + 3 * mm, "Montant")
+    pdf.setStrokeColorRGB(0.87, 0.9, 0.92)
+    pdf.rect(table_left, table_top - (len(rows) + 1) * row_height, table_width, (len(rows) + 1) * row_height, stroke=1, fill=0)
+
+    y_row = table_top - row_height + 3 * mm
+    pdf.setFont("Helvetica", 9)
+    for description, amount in rows:
+        pdf.drawString(table_left + 3 * mm, y_row, description)
+        pdf.drawRightString(table_left + table_width - 3 * mm, y_row, f"{amount} EUR")
+        pdf.line(table_left, y_row - 3 * mm, table_left + table_width, y_row - 3 * mm)
+        y_row -= row_height
+
+    # Below the table, whose height depends on the optional regularization row.
+    y_total = table_top - (len(rows) + 2) * row_height
+    pdf.setFont("Helvetica-Bold", 10)
+    pdf.drawString(132 * mm, y_total, "Total TTC")
+    pdf.drawRightString(187 * mm, y_total, f"{total} EUR")
+
+    pdf.setFont("Helvetica", 8)
+    pdf.drawString(20 * mm, 20 * mm, "Paiement a 15 jours date de facture. Merci de votre confiance.")
+    pdf.drawString(20 * mm, 15 * mm, "Document de demonstration - Electruc Portal.")
+
+    pdf.showPage()
+    pdf.save()
+
+    return buffer.getvalue()
+
+
+def build_direct_debit_form_pdf() -> bytes:
+    """Fillable direct debit form (PDF AcroForm)."""
+    A4, mm, canvas = _get_reportlab()
+    if not canvas:
+        fallback_pdf = _build_fallback_pdf(
+            document_title="Formulaire de domiciliation SEPA",
+            lines=[
+                "Nom et prenom: __________________________",
+                "Adresse: __________________________",
+                "Code postal / Ville: __________________________",
+                "IBAN: __________________________",
+                "BIC: __________________________",
+                "Date et signature: __________________________",
+            ],
+        )
+        return fallback_pdf
+
+    buffer = BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=A4)
+    _draw_pdf_header(pdf, mm, "Formulaire de domiciliation SEPA")
+
+    pdf.setFont("Helvetica", 10)
+    pdf.drawString(20 * mm, 248 * mm, "Completez les champs, puis enregistrez et transmettez le document signe.")
+
+    pdf.setStrokeColorRGB(0.87, 0.9, 0.92)
+    pdf.rect(20 * mm, 206 * mm, 170 * mm, 36 * mm, stroke=1, fill=0)
+    pdf.setFont("Helvetica-Bold", 9)
+    pdf.drawString(23 * mm, 236 * mm, "Informations du titulaire")
+    pdf.setFont("Helvetica", 9)
+    pdf.drawString(23 * mm, 229 * mm, "Nom et prenom")
+    pdf.drawString(23 * mm, 222 * mm, "Adresse")
+    pdf.drawString(23 * mm, 215 * mm, "Code postal / Ville")
+
+    pdf.rect(20 * mm, 170 * mm, 170 * mm, 30 * mm, stroke=1, fill=0)
+    pdf.setFont("Helvetica-Bold", 9)
+    pdf.drawString(23 * mm, 194 * mm, "Coordonnees bancaires")
+    pdf.setFont("Helvetica", 9)
+    pdf.drawString(23 * mm, 187 * mm, "IBAN")
+    pdf.drawString(23 * mm, 180 * mm, "BIC")
+
+    pdf.rect(20 * mm, 136 * mm, 170 * mm, 28 * mm, stroke=1, fill=0)
+    pdf.setFont("Helvetica-Bold", 9)
+    pdf.drawString(23 * mm, 158 * mm, "Mandat")
+    pdf.setFont("Helvetica", 9)
+    pdf.drawString(23 * mm, 151 * mm, "J'autorise Electruc SA a prelever les montants dus sur le compte indique.")
+    pdf.drawString(23 * mm, 145 * mm, "Ce mandat reste valable jusqu'a revocation explicite du titulaire.")
+
+    pdf.rect(20 * mm, 108 * mm, 170 * mm, 22 * mm, stroke=1, fill=0)
+    pdf.setFont("Helvetica", 9)
+    pdf.drawString(23 * mm, 121 * mm, "Date")
+    pdf.drawString(88 * mm, 121 * mm, "Lieu")
+    pdf.drawString(23 * mm, 113 * mm, "Signature")
+
+    form = pdf.acroForm
+    from reportlab.lib import colors
+
+    field_border = colors.Color(0.7, 0.75, 0.8)
+    field_text = colors.black
+    form.textfield(
+        name="holder_name",
+        x=62 * mm,
+        y=226.5 * mm,
+        width=122 * mm,
+        height=6 * mm,
+        borderStyle="inset",
+        borderColor=field_border,
+        fillColor=None,
+        textColor=field_text,
+        forceBorder=True,
+    )
+    form.textfield(
+        name="holder_address",
+        x=62 * mm,
+        y=219.5 * mm,
+        width=122 * mm,
+        height=6 * mm,
+        borderStyle="inset",
+        borderColor=field_border,
+        fillColor=None,
+        textColor=field_text,
+        forceBorder=True,
+    )
+    form.textfield(
+        name="holder_city",
+        x=62 * mm,
+        y=212.5 * mm,
+        width=122 * mm,
+        height=6 * mm,
+        borderStyle="inset",
+        borderColor=field_border,
+        fillColor=None,
+        textColor=field_text,
+        forceBorder=True,
+    )
+    form.textfield(
+        name="iban",
+        x=62 * mm,
+        y=184.5 * mm,
+        width=122 * mm,
+        height=6 * mm,
+        borderStyle="inset",
+        borderColor=field_border,
+        fillColor=None,
+        textColor=field_text,
+        forceBorder=True,
+    )
+    form.textfield(
+        name="bic",
+        x=62 * mm,
+        y=177.5 * mm,
+        width=122 * mm,
+        height=6 * mm,
+        borderStyle="inset",
+        borderColor=field_border,
+        fillColor=None,
+        textColor=field_text,
+        forceBorder=True,
+    )
+    form.textfield(
+        name="mandate_date",
+        x=34 * mm,
+        y=118 * mm,
+        width=44 * mm,
+        height=6 * mm,
+        borderStyle="inset",
+        borderColor=field_border,
+        fillColor=None,
+        textColor=field_text,
+        forceBorder=True,
+    )
+    form.textfield(
+        name="mandate_place",
+        x=96 * mm,
+        y=118 * mm,
+        width=40 * mm,
+        height=6 * mm,
+        borderStyle="inset",
+        borderColor=field_border,
+        fillColor=None,
+        textColor=field_text,
+        forceBorder=True,
+    )
+    form.textfield(
+        name="holder_signature",
+        x=48 * mm,
+        y=110 * mm,
+        width=136 * mm,
+        height=6 * mm,
+        borderStyle="inset",
+        borderColor=field_border,
+        fillColor=None,
+        textColor=field_text,
+        forceBorder=True,
+    )
+
+    pdf.setFont("Helvetica", 8)
+    pdf.drawString(20 * mm, 20 * mm, "Document de demonstration - Electruc Portal.")
+    pdf.showPage()
+    pdf.save()
+
+    return buffer.getvalue()
+
+
+def build_cgv_pdf() -> bytes:
+    """Branded CGV PDF."""
+    A4, mm, canvas = _get_reportlab()
+    if not canvas:
+        fallback_pdf = _build_fallback_pdf(
+            document_title="Conditions generales de vente - Electruc",
+            lines=[
+                "1. Objet: fourniture d'energie selon contrat en vigueur.",
+                "2. Facturation: mensuelle, payable dans les delais indiques.",
+                "3. Releves: le client transmet ses index selon les modalites du portail.",
+                "4. Donnees: traitement conforme au RGPD.",
+            ],
+        )
+        return fallback_pdf
+
+    buffer = BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=A4)
+    _draw_pdf_header(pdf, mm, "Conditions generales de vente")
+
+    sections = [
+        ("1. Objet", "Les presentes CGV definissent les conditions de fourniture d'energie pour les clients particuliers."),
+        ("2. Contrat", "Le contrat prend effet a la date indiquee sur le document contractuel et reste en vigueur selon les modalites prevues."),
+        ("3. Prix et facturation", "La facturation est mensuelle. Le detail des montants est accessible depuis l'espace client."),
+        ("4. Paiement", "Le paiement est exigible a l'echeance indiquee sur la facture. Des frais peuvent s'appliquer en cas de retard."),
+        ("5. Releves et consommation", "Le client transmet ses releves via le portail; Electruc peut estimer la consommation en l'absence de releve."),
+        ("6. Service client", "Les demandes sont traitees via l'espace client, par e-mail ou formulaire de contact."),
+        ("7. Donnees personnelles", "Les donnees sont traitees conformement a la reglementation en vigueur et a la politique de confidentialite."),
+        ("8. Droit applicable", "Le contrat est soumis au droit belge. Les tribunaux competents sont ceux du ressort du siege social."),
+    ]
+
+    y = 248 * mm
+    for title, text in sections:
+        if y < 40 * mm:
+            pdf.showPage()
+            _draw_pdf_header(pdf, mm, "Conditions generales de vente")
+            y = 248 * mm
+        pdf.setFont("Helvetica-Bold", 10)
+        pdf.drawString(20 * mm, y, title)
+        y -= 6 * mm
+        pdf.setFont("Helvetica", 9)
+        pdf.drawString(20 * mm, y, text)
+        y -= 10 * mm
+
+    pdf.setFont("Helvetica", 8)
+    pdf.drawString(20 * mm, 20 * mm, "Version pedagogique - Electruc Portal.")
+    pdf.showPage()
+    pdf.save()
+
+    return buffer.getvalue()
+
+
+def build_contract_pdf(contract, user, profile) -> bytes:
+    """Contract PDF for the given contract holder."""
+    A4, mm, canvas = _get_reportlab()
+    if not canvas:
+        fallback_pdf = _build_fallback_pdf(
+            document_title=f"Contrat {contract.reference}",
+            lines=[
+                f"Offre: {contract.plan_name}",
+                f"Date de debut: {contract.start_date}",
+                f"Statut: {contract.get_status_display()}",
+                f"Adresse: {contract.supply_address}",
+                f"EAN: {profile.ean if profile else '-'}",
+            ],
+        )
+        return fallback_pdf
+
+    buffer = BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=A4)
+    _draw_pdf_header(pdf, mm, "Contrat d'energie")
+
+    client_name = user.get_full_name() or user.username
+    client_lines = [client_name]
+    if user.email:
+        client_lines.append(user.email)
+    if profile:
+        client_lines.append(f"{profile.supply_address_street} {profile.supply_address_number}".strip())
+        client_lines.append(f"{profile.supply_address_postal_code} {profile.supply_address_city}".strip())
+
+    pdf.setStrokeColorRGB(0.87, 0.9, 0.92)
+    pdf.rect(20 * mm, 218 * mm, 80 * mm, 32 * mm, stroke=1, fill=0)
+    pdf.setFont("Helvetica-Bold", 9)
+    pdf.drawString(23 * mm, 245 * mm, "Titulaire du contrat")
+    pdf.setFont("Helvetica", 9)
+    y_client = 240 * mm
+    for line in client_lines[:4]:
+        pdf.drawString(23 * mm, y_client, line)
+        y_client -= 5 * mm
+
+    pdf.rect(110 * mm, 218 * mm, 80 * mm, 32 * mm, stroke=1, fill=0)
+    pdf.setFont("Helvetica", 9)
+    pdf.drawString(113 * mm, 245 * mm, f"Reference: {contract.reference}")
+    pdf.drawString(113 * mm, 240 * mm, f"Date de debut: {contract.start_date:%d/%m/%Y}")
+    pdf.drawString(113 * mm, 235 * mm, f"Offre: {contract.plan_name}")
+    pdf.drawString(113 * mm, 230 * mm, f"Statut: {contract.get_status_display()}")
+    pdf.drawString(113 * mm, 225 * mm, f"EAN: {profile.ean if profile else '-'}")
+
+    # Contract summary section
+    section_top = 206 * mm
+    pdf.setFont("Helvetica-Bold", 11)
+    pdf.drawString(20 * mm, section_top, "Resume des conditions")
+    pdf.setFont("Helvetica", 9)
+    summary_lines = [
+        f"Adresse de fourniture: {contract.supply_address}",
+        "Facturation: mensuelle, paiement a 15 jours.",
+        "Duree: contrat a duree indeterminee, resiliation possible selon CGV.",
+        "Support client: disponible via l'espace client et formulaire de contact.",
+    ]
+    y_text = section_top - 8 * mm
+    for line in summary_lines:
+        pdf.drawString(20 * mm, y_text, line)
+        y_text -= 6 * mm
+
+    # Small clauses table
+    table_left = 20 * mm
+    table_width = 170 * mm
+    table_top = 165 * mm
+    row_height = 9 * mm
+    clauses = [
+        ("Type d'offre", contract.plan_name),
+        ("Frequence de releve", "Mensuelle"),
+        ("Canal de facturation", "Portail client"),
+        ("Reference point de fourniture", profile.ean if profile else "-"),
+    ]
+    pdf.setFillColorRGB(0.95, 0.97, 0.98)
+    pdf.rect(table_left, table_top, table_width, row_height, stroke=0, fill=1)
+    pdf.setFillColorRGB(0, 0, 0)
+    pdf.setFont("Helvetica-Bold", 9)
+    pdf.drawString(table_left + 3 * mm, table_top + 3 * mm, "Element")
+    pdf.drawRightString(table_left + table_width - 3 * mm, table_top + 3 * mm, "Valeur")
+    pdf.setStrokeColorRGB(0.87, 0.9, 0.92)
+    pdf.rect(table_left, table_top - (len(clauses) + 1) * row_height, table_width, (len(clauses) + 1) * row_height, stroke=1, fill=0)
+
+    y_row = table_top - row_height + 3 * mm
+    pdf.setFont("Helvetica", 9)
+    for label, value in clauses:
+        pdf.drawString(table_left + 3 * mm, y_row, str(label))
+        pdf.drawRightString(table_left + table_width - 3 * mm, y_row, str(value))
+        pdf.line(table_left, y_row - 3 * mm, table_left + table_width, y_row - 3 * mm)
+        y_row -= row_height
+
+    pdf.setFont("Helvetica", 8)
+    pdf.drawString(20 * mm, 20 * mm, "Conditions generales disponibles dans l'espace client.")
+    pdf.drawString(20 * mm, 15 * mm, "Document de demonstration - Electruc Portal.")
+    pdf.showPage()
+    pdf.save()
+
+    return buffer.getvalue()
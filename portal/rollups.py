@@ -0,0 +1,215 @@
+"""Consumption rollups (hour -> day -> month) kept next to the interval data, updated on every append.
+
+Per meter point directory (see portal/intervals.py):
+- <YYYY-MM>.hour: kWh per UTC hour of that month (dense float64, hours in month)
+- <YYYY>.day: kWh per local day of that year (366 slots, index = day of year - 1)
+- <YYYY>.month: kWh per local month of that year (12 slots)
+Day and month buckets follow TIME_ZONE; Belgian offsets are whole hours, so each local day is
+exactly a run of UTC hours. Queries read the coarsest level that covers the requested range.
+"""
+import calendar
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from pathlib import Path
+
+from django.utils import timezone
+
+from . import intervals
+
+np = intervals.np
+HOUR = 3600
+DAY_SLOTS = 366
+
+
+def local_midnight(day) -> int:
+    return int(timezone.make_aware(datetime.combine(day, time.min)).timestamp())
+
+
+def local_date(epoch_second) -> date:
+    return datetime.fromtimestamp(int(epoch_second), timezone.get_current_timezone()).date()
+
+
+def _month_start(month) -> int:
+    return int(datetime.strptime(month, "%Y-%m").replace(tzinfo=dt_timezone.utc).timestamp())
+
+
+def _add_month(day, months=1) -> date:
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+class Rollups:
+    """Rollup files of one meter point (an IntervalStore's directory)."""
+
+    def __init__(self, store):
+        self.store = store
+        self.directory = Path(store.directory)
+
+    def _read(self, name):
+        """Whole level file as an array (a few KB: cheaper to read than to map), None if absent."""
+        try:
+            return np.fromfile(self.directory / name, dtype="<f8")
+        except FileNotFoundError:
+            return None
+
+    def _open_for_update(self, name, slots):
+        path = self.directory / name
+        if not path.exists():
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with open(path, "wb") as handle:
+                handle.truncate(slots * 8)
+        return np.memmap(path, dtype="<f8", mode="r+", shape=(slots,))
+
+    @staticmethod
+    def _hours_in(month) -> int:
+        year, number = map(int, month.split("-"))
+        return calendar.monthrange(year, number)[1] * 24
+
+    # --- maintenance -------------------------------------------------------------------------
+
+    def add(self, month, timestamps, kwh):
+        """Fold intervals just appended to one UTC month into the hour, day and month levels."""
+        if not len(timestamps):
+            return
+        hour_slots = self._hours_in(month)
+        hour_index = (np.asarray(timestamps) - _month_start(month)) // HOUR
+        hour_totals = np.bincount(hour_index, weights=kwh, minlength=hour_slots)
+        touched = np.flatnonzero(hour_totals)
+        hours = self._open_for_update(f"{month}.hour", hour_slots)
+        hours[touched] += hour_totals[touched]
+        hours.flush()
+
+        # Few distinct hours per append (at most 744): their local day/month is computed one by one.
+        day_updates, month_updates = {}, {}
+        for index in touched:
+            day = local_date(_month_start(month) + int(index) * HOUR)
+            value = hour_totals[index]
+            day_updates.setdefault(day.year, {}).setdefault(day.timetuple().tm_yday - 1, 0.0)
+            day_updates[day.year][day.timetuple().tm_yday - 1] += value
+            month_updates.setdefault(day.year, {}).setdefault(day.month - 1, 0.0)
+            month_updates[day.year][day.month - 1] += value
+        for name, updates, slots in (("day", day_updates, DAY_SLOTS), ("month", month_updates, 12)):
+            for year, values in updates.items():
+                level = self._open_for_update(f"{year}.{name}", slots)
+                slot_indexes = np.fromiter(values.keys(), dtype=np.int64)
+                level[slot_indexes] += np.fromiter(values.values(), dtype=np.float64)
+                level.flush()
+
+    def rebuild(self):
+        """Recompute every level from the raw intervals (after a crash or a manual repair)."""
+        for pattern in ("*.hour", "*.day", "*.month"):
+            for path in self.directory.glob(pattern):
+                path.unlink()
+        for month in self.store.months():
+            timestamps, kwh = self.store._columns(month)
+            self.add(month, timestamps, kwh)
+
+    # --- queries -----------------------------------------------------------------------------
+
+    def hourly(self, start, end):
+        """(hour start epochs, kWh) for whole UTC hours in [start, end)."""
+        start, end = intervals.to_epoch(start) // HOUR * HOUR, -(-intervals.to_epoch(end) // HOUR) * HOUR
+        epochs = np.arange(start, end, HOUR, dtype=np.int64)
+        values = np.zeros(len(epochs))
+        month = intervals.month_key(start) if len(epochs) else None
+        while month and _month_start(month) < end:
+            level = self._read(f"{month}.hour")
+            month_start = _month_start(month)
+            if level is not None:
+                low = max(start, month_start)
+                high = min(end, month_start + len(level) * HOUR)
+                values[(low - start) // HOUR : (high - start) // HOUR] = level[
+                    (low - month_start) // HOUR : (high - month_start) // HOUR
+                ]
+            month = intervals.month_key(month_start + self._hours_in(month) * HOUR)
+        return epochs, values
+
+    def daily(self, first_day, end_day):
+        """(dates, kWh) per local day for first_day <= day < end_day."""
+        days = [first_day + timedelta(days=offset) for offset in range((end_day - first_day).days)]
+        values = np.zeros(len(days))
+        for year in range(first_day.year, end_day.year + 1):
+            level = self._read(f"{year}.day")
+            if level is None:
+                continue
+            low, high = max(first_day, date(year, 1, 1)), min(end_day, date(year + 1, 1, 1))
+            if high > low:
+                offset = (low - first_day).days
+                count = (high - low).days
+                first_slot = low.timetuple().tm_yday - 1
+                values[offset : offset + count] = level[first_slot : first_slot + count]
+        return days, values
+
+    def monthly(self, first_month, end_month):
+        """(first days of month, kWh) per local month for first_month <= month < end_month."""
+        months = []
+        month = date(first_month.year, first_month.month, 1)
+        while month < end_month:
+            months.append(month)
+            month = _add_month(month)
+        values = np.zeros(len(months))
+        years = {}
+        for position, month in enumerate(months):
+            if month.year not in years:
+                years[month.year] = self._read(f"{month.year}.month")
+            if years[month.year] is not None:
+                values[position] = years[month.year][month.month - 1]
+        return months, values
+
+    def total(self, start, end) -> float:
+        """kWh over [start, end), each part read from the coarsest level covering it exactly."""
+        start, end = intervals.to_epoch(start), intervals.to_epoch(end)
+        first_hour, last_hour = -(-start // HOUR) * HOUR, end // HOUR * HOUR
+        if first_hour >= last_hour:
+            return self.store.total_kwh(start, end)
+        total = self.store.total_kwh(start, first_hour) + self.store.total_kwh(last_hour, end)
+
+        first_day = local_date(first_hour)
+        if local_midnight(first_day) < first_hour:
+            first_day += timedelta(days=1)
+        end_day = local_date(last_hour)
+        if local_midnight(first_day) >= local_midnight(end_day):
+            return total + float(self.hourly(first_hour, last_hour)[1].sum())
+        total += float(self.hourly(first_hour, local_midnight(first_day))[1].sum())
+        total += float(self.hourly(local_midnight(end_day), last_hour)[1].sum())
+
+        first_month = first_day if first_day.day == 1 else _add_month(first_day)
+        end_month = date(end_day.year, end_day.month, 1)
+        if first_month >= end_month:
+            return total + float(self.daily(first_day, end_day)[1].sum())
+        total += float(self.daily(first_day, first_month)[1].sum())
+        total += float(self.daily(end_month, end_day)[1].sum())
+        return total + float(self.monthly(first_month, end_month)[1].sum())
+
+    def series(self, start, end):
+        """Chart data for [start, end) at the coarsest resolution giving a readable number of points."""
+        start, end = intervals.to_epoch(start), intervals.to_epoch(end)
+        span = end - start
+        if span <= 2 * 86400:
+            epochs, values = self.hourly(start, end)
+            labels = [datetime.fromtimestamp(int(epoch), timezone.get_current_timezone()).strftime("%H:%M") for epoch in epochs]
+            return "hour", labels, values
+        first_day, end_day = local_date(start), local_date(end - 1) + timedelta(days=1)
+        if span <= 92 * 86400:
+            days, values = self.daily(first_day, end_day)
+            return "day", [day.strftime("%d/%m") for day in days], values
+        months, values = self.monthly(first_day, _add_month(end_day - timedelta(days=1)))
+        return "month", [month.strftime("%b %Y") for month in months], values
+
+
+def monthly_chart(meter_point, months, today=None):
+    """(labels, kWh) of the last `months` local months, or None without interval data."""
+    if np is None or meter_point is None or not meter_point.intervals.months():
+        return None
+    today = today or timezone.localdate()
+    end = _add_month(today)
+    first_days, values = meter_point.intervals.rollups.monthly(_add_month(end, -months), end)
+    return [day.strftime("%b %Y") for day in first_days], [round(float(value)) for value in values]
+
+
+def daily_chart(meter_point, days, today=None):
+    """(labels, kWh) of the last `days` local days including today, or None without interval data."""
+    if np is None or meter_point is None or not meter_point.intervals.months():
+        return None
+    today = today or timezone.localdate()
+    first_days, values = meter_point.intervals.rollups.daily(today - timedelta(days=days - 1), today + timedelta(days=1))
+    return [day.strftime("%d/%m") for day in first_days], [round(float(value), 1) for value in values]
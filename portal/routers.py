@@ -0,0 +1,98 @@
+"""Primary/replica database routing for read-only client views."""
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+
+REPLICA_ALIAS = "replica"
+CACHE_ALIAS = "cache"
+# App label of the DatabaseCache model (django.core.cache.backends.db).
+CACHE_APP_LABEL = "django_cache"
+PIN_COOKIE_NAME = "electruc_db_pin"
+
+# Set by ReplicaRoutingMiddleware for the duration of a request.
+_use_replica = ContextVar("electruc_use_replica", default=False)
+_wrote = ContextVar("electruc_wrote", default=False)
+
+
+def replica_configured() -> bool:
+    return REPLICA_ALIAS in connections.databases
+
+
+def _cache_database(model):
+    """Alias for DatabaseCache queries: the dedicated cache database when configured, else the primary."""
+    return CACHE_ALIAS if CACHE_ALIAS in connections.databases else "default"
+
+
+def read_from_replica(view_func):
+    """Mark a view as read-only: its GET/HEAD queries may be served by the replica."""
+    view_func.use_read_replica = True
+    return view_func
+
+
+class PrimaryReplicaRouter:
+    """Reads go to the replica only inside replica-marked requests; everything else uses the primary."""
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label == CACHE_APP_LABEL:
+            return _cache_database(model)
+        if _use_replica.get() and not _wrote.get() and replica_configured():
+            return REPLICA_ALIAS
+        return None
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label == CACHE_APP_LABEL:
+            # Cache writes are not user data: they must not pin the browser to the primary.
+            return _cache_database(model)
+        # From the first write on, this request (and the pinned session) reads its own writes.
+        _wrote.set(True)
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if app_label == CACHE_APP_LABEL:
+            return db == _cache_database(None)
+        if db == CACHE_ALIAS:
+            return False
+        return db != REPLICA_ALIAS
+
+
+class ReplicaRoutingMiddleware:
+    """Route replica-marked GET/HEAD views to the replica unless the browser is pinned to the primary.
+
+    Any write (or unsafe method) pins the browser to the primary for REPLICA_PIN_SECONDS with a
+    cookie, which covers replication lag without writing to the session table.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        wrote_token = _wrote.set(False)
+        replica_token = _use_replica.set(False)
+        try:
+            response = self.get_response(request)
+            if _wrote.get() or request.method not in ("GET", "HEAD", "OPTIONS"):
+                response.set_cookie(
+                    PIN_COOKIE_NAME,
+                    "1",
+                    max_age=settings.REPLICA_PIN_SECONDS,
+                    httponly=True,
+                    samesite="Lax",
+                    secure=settings.SESSION_COOKIE_SECURE,
+                )
+            return response
+        finally:
+            _use_replica.reset(replica_token)
+            _wrote.reset(wrote_token)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (
+            getattr(view_func, "use_read_replica", False)
+            and request.method in ("GET", "HEAD")
+            and PIN_COOKIE_NAME not in request.COOKIES
+        ):
+            _use_replica.set(True)
+        return None
@@ -0,0 +1,139 @@
+"""Tariff what-if simulator: re-price a whole period of invoices at once, in integer cents with NumPy."""
+from decimal import ROUND_HALF_UP, Decimal
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional: the simulator is then unavailable.
+    np = None
+
+from .models import Contract, Invoice
+from .tariffs import DEFAULT_MONTHLY_PRICES, tariff_index
+
+# Unit prices have 4 decimals: work in 1/10000 EUR per kWh, amounts in cents.
+PRICE_SCALE = 10000
+CENTS_SCALE = 100
+PERCENTILES = (5, 25, 50, 75, 95)
+
+
+def to_units(value, scale) -> int:
+    return int((Decimal(value) * scale).to_integral_value(rounding=ROUND_HALF_UP))
+
+
+def to_eur(cents) -> Decimal:
+    return Decimal(int(cents)) / CENTS_SCALE
+
+
+def amount_cents(consumption_kwh, price_units, standing_cents):
+    """Vectorized estimate_invoice_amount: standing + energy rounded half-up to the cent."""
+    energy = consumption_kwh * price_units
+    # Exact ROUND_HALF_UP of energy / 100: half away from zero, also for regularized (negative) kWh.
+    step = PRICE_SCALE // CENTS_SCALE
+    return standing_cents + np.sign(energy) * ((np.abs(energy) + step // 2) // step)
+
+
+class BillingBase:
+    """One row per invoice of the period, with the pricing inputs of the customer's contract."""
+
+    def __init__(self, user_ids, end_ordinals, months, consumption, variable, standing_cents, fixed_units):
+        self.user_ids = user_ids
+        self.end_ordinals = end_ordinals
+        self.months = months
+        self.consumption = consumption
+        self.variable = variable
+        self.standing_cents = standing_cents
+        self.fixed_units = fixed_units
+
+    def __len__(self):
+        return len(self.consumption)
+
+    def current_variable_units(self):
+        """Variable price of each row from the tariff table (seasonal default before the first price)."""
+        starts, prices = tariff_index().prices(Contract.TARIFF_VARIABLE)
+        defaults = np.array([to_units(price, PRICE_SCALE) for price in DEFAULT_MONTHLY_PRICES], dtype=np.int64)
+        units = defaults[self.months - 1]
+        if starts:
+            start_ordinals = np.array([start.toordinal() for start in starts], dtype=np.int64)
+            table = np.array([to_units(price, PRICE_SCALE) for price in prices], dtype=np.int64)
+            position = np.searchsorted(start_ordinals, self.end_ordinals, side="right") - 1
+            covered = position >= 0
+            units[covered] = table[position[covered]]
+        return units
+
+    def amounts(self, fixed_price=None, standing_charge=None, variable_prices=None):
+        """Invoice amounts in cents, with the current contract terms or the given candidate ones."""
+        fixed = self.fixed_units if fixed_price is None else np.full(len(self), to_units(fixed_price, PRICE_SCALE))
+        if variable_prices is None:
+            variable = self.current_variable_units()
+        else:
+            monthly = np.array([to_units(price, PRICE_SCALE) for price in variable_prices], dtype=np.int64)
+            variable = monthly[self.months - 1]
+        standing = (
+            self.standing_cents if standing_charge is None else np.full(len(self), to_units(standing_charge, CENTS_SCALE))
+        )
+        return amount_cents(self.consumption, np.where(self.variable, variable, fixed), standing)
+
+
+def load_base(period_start, period_end) -> BillingBase:
+    """Invoices whose period ends in [period_start, period_end], priced with the customer's active contract."""
+    contracts = {}
+    for user_id, tariff_type, standing, fixed in (
+        # Bi-hourly invoices cannot be re-priced from their total consumption alone.
+        Contract.objects.filter(
+            status=Contract.STATUS_ACTIVE, tariff_type__in=(Contract.TARIFF_FIXED, Contract.TARIFF_VARIABLE)
+        )
+        .order_by("pk")
+        .values_list("user_id", "tariff_type", "standing_charge_eur", "fixed_unit_price_eur_kwh")
+        .iterator(chunk_size=10000)
+    ):
+        contracts.setdefault(
+            user_id, (tariff_type == Contract.TARIFF_VARIABLE, to_units(standing, CENTS_SCALE), to_units(fixed, PRICE_SCALE))
+        )
+
+    columns = ([], [], [], [], [], [], [])
+    for user_id, end, consumption, regularization in (
+        Invoice.objects.filter(period_end__gte=period_start, period_end__lte=period_end)
+        .values_list("user_id", "period_end", "consumption_kwh", "regularization_kwh")
+        .iterator(chunk_size=10000)
+    ):
+        terms = contracts.get(user_id)
+        if terms is None:
+            continue
+        # Net billed kWh: a regularization credits back estimated kWh of earlier invoices.
+        net = consumption + regularization
+        for column, value in zip(columns, (user_id, end.toordinal(), end.month, net, *terms)):
+            column.append(value)
+    dtypes = (np.int64, np.int64, np.int64, np.int64, np.bool_, np.int64, np.int64)
+    return BillingBase(*(np.array(column, dtype=dtype) for column, dtype in zip(columns, dtypes)))
+
+
+def simulate(base: BillingBase, fixed_price=None, standing_charge=None, variable_prices=None) -> dict:
+    """Revenue and per-customer bill change of a candidate tariff against the current terms."""
+    current = base.amounts()
+    candidate = base.amounts(fixed_price, standing_charge, variable_prices)
+    customers, position = np.unique(base.user_ids, return_inverse=True)
+    # Cents stay far below 2**53: float sums are exact.
+    current_by_customer = np.bincount(position, weights=current, minlength=len(customers)).astype(np.int64)
+    candidate_by_customer = np.bincount(position, weights=candidate, minlength=len(customers)).astype(np.int64)
+    change = candidate_by_customer - current_by_customer
+    change_pct = np.divide(
+        change * 100.0, current_by_customer, out=np.zeros(len(change)), where=current_by_customer != 0
+    )
+    summary = {
+        "invoices": len(base),
+        "customers": len(customers),
+        "current_revenue": to_eur(current.sum()),
+        "candidate_revenue": to_eur(candidate.sum()),
+        "revenue_change": to_eur(candidate.sum() - current.sum()),
+        "increased": int((change > 0).sum()),
+        "decreased": int((change < 0).sum()),
+        "unchanged": int((change == 0).sum()),
+        "percentiles": [],
+    }
+    if len(customers):
+        cents = np.percentile(change, PERCENTILES, method="nearest")
+        percents = np.percentile(change_pct, PERCENTILES)
+        summary["percentiles"] = [
+            {"percentile": p, "change": to_eur(value), "change_pct": round(float(pct), 1)}
+            for p, value, pct in zip(PERCENTILES, cents, percents)
+        ]
+    return summary
@@ -0,0 +1,134 @@
+"""Media storage storing each distinct content once (content-addressed, hard-linked names)."""
+import hashlib
+import os
+import re
+import tempfile
+import uuid
+from pathlib import Path
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+BLOB_DIR = "blobs"
+HASH_CHUNK_SIZE = 64 * 1024
+# Extended attribute holding the blob digest: set on the inode, so every hard-linked name shares it.
+DIGEST_XATTR = "user.electruc.sha256"
+
+
+def file_sha256(path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def tag_digest(path, digest):
+    """Record the content digest on the file's inode (no-op where extended attributes are unsupported)."""
+    try:
+        os.setxattr(path, DIGEST_XATTR, digest.encode("ascii"))
+    except (AttributeError, OSError):
+        pass
+
+
+def stored_digest(path) -> str:
+    """Digest of a stored name: read from its inode, hashed only for untagged files."""
+    try:
+        return os.getxattr(path, DIGEST_XATTR).decode("ascii")
+    except FileNotFoundError:
+        raise
+    except (AttributeError, OSError):
+        return file_sha256(path)
+
+
+class DedupFileSystemStorage(FileSystemStorage):
+    """FileSystemStorage where every saved name is a hard link to blobs/<aa>/<sha256>.
+
+    Names keep their original filename (downloads, X-Accel-Redirect and storage.path() are
+    unchanged) while identical uploads share one copy on disk. The blob's link count is its
+    reference count: deleting the last name also removes the blob.
+    """
+
+    def blob_path(self, digest) -> Path:
+        return Path(self.path(f"{BLOB_DIR}/{digest[:2]}/{digest}"))
+
+    def _save(self, name, content):
+        blob_root = Path(self.path(BLOB_DIR))
+        blob_root.mkdir(parents=True, exist_ok=True)
+        # Hash while streaming to a temporary file next to the blobs (same filesystem).
+        digest = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=blob_root, prefix=".incoming-")
+        try:
+            with os.fdopen(fd, "wb") as tmp_file:
+                if hasattr(content, "seek"):
+                    content.seek(0)
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    tmp_file.write(chunk)
+            if self.file_permissions_mode is not None:
+                os.chmod(tmp_path, self.file_permissions_mode)
+            tag_digest(tmp_path, digest.hexdigest())
+            return self._link(name, tmp_path, self.blob_path(digest.hexdigest()))
+        finally:
+            os.unlink(tmp_path)
+
+    def _link(self, name, tmp_path, blob):
+        blob.parent.mkdir(parents=True, exist_ok=True)
+        while True:
+            try:
+                os.link(tmp_path, blob)
+            except FileExistsError:
+                pass  # Same content already stored.
+            full_path = Path(self.path(name))
+            full_path.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                os.link(blob, full_path)
+            except FileExistsError:
+                name = self.get_available_name(name)
+                continue
+            except FileNotFoundError:
+                continue  # Blob collected by a concurrent delete: store it again from tmp_path.
+            return str(name).replace("\\", "/")
+
+    def delete(self, name):
+        path = Path(self.path(name))
+        try:
+            digest = stored_digest(path)
+        except FileNotFoundError:
+            return
+        super().delete(name)
+        self.release_blob(digest)
+
+    def release_blob(self, digest):
+        """Remove the blob once no name links to it any more."""
+        blob = self.blob_path(digest)
+        try:
+            if blob.stat().st_nlink == 1:
+                blob.unlink()
+        except FileNotFoundError:
+            pass
+
+
+@deconstructible
+class ShardedUploadTo:
+    """upload_to placing files under <prefix>/<aa>/<bb>/ (65 536 small directories per prefix)."""
+
+    def __init__(self, prefix):
+        self.prefix = prefix.strip("/")
+
+    def __call__(self, instance, filename):
+        return self.path_for(filename, uuid.uuid4().hex)
+
+    def __eq__(self, other):
+        return isinstance(other, ShardedUploadTo) and other.prefix == self.prefix
+
+    def path_for(self, filename, seed):
+        digest = hashlib.sha1(f"{seed}:{filename}".encode()).hexdigest()
+        return f"{self.prefix}/{digest[:2]}/{digest[2:4]}/{os.path.basename(filename)}"
+
+    def is_sharded(self, name) -> bool:
+        return bool(re.match(rf"{re.escape(self.prefix)}/[0-9a-f]{{2}}/[0-9a-f]{{2}}/[^/]+$", name))
+
+    def sharded_name(self, name) -> str:
+        """Deterministic sharded location for an existing flat name (re-runs give the same path)."""
+        return self.path_for(os.path.basename(name), name)
@@ -0,0 +1,121 @@
+"""Per-process, immutable index of tariff prices: O(log n) lookups by date with bisect."""
+import time
+from bisect import bisect_right
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.db.models import Count, Max
+
+VERSION_KEY = "tariffs:version"
+
+# Seasonal variable prices used for dates before the first TariffPrice (and with an empty table).
+DEFAULT_MONTHLY_PRICES = (
+    Decimal("0.3450"),
+    Decimal("0.3380"),
+    Decimal("0.3220"),
+    Decimal("0.2980"),
+    Decimal("0.2790"),
+    Decimal("0.2650"),
+    Decimal("0.2580"),
+    Decimal("0.2620"),
+    Decimal("0.2770"),
+    Decimal("0.3010"),
+    Decimal("0.3280"),
+    Decimal("0.3420"),
+)
+
+
+class TariffIndex:
+    """Start dates and prices per tariff code, as parallel sorted tuples."""
+
+    __slots__ = ("_tariffs", "version")
+
+    def __init__(self, rows, version=None):
+        tariffs = {}
+        for code, valid_from, price in rows:
+            starts, prices = tariffs.setdefault(code, ([], []))
+            starts.append(valid_from)
+            prices.append(price)
+        self._tariffs = {code: (tuple(starts), tuple(prices)) for code, (starts, prices) in tariffs.items()}
+        self.version = version
+
+    def prices(self, code):
+        """(start dates, prices) of one tariff, sorted by start date."""
+        return self._tariffs.get(code, ((), ()))
+
+    def unit_price(self, code, target_date) -> Decimal:
+        starts, prices = self._tariffs.get(code, ((), ()))
+        position = bisect_right(starts, target_date)
+        if position:
+            return prices[position - 1]
+        return DEFAULT_MONTHLY_PRICES[target_date.month - 1]
+
+
+_index = None
+_fresh_until = 0.0
+# Version of an index loaded inside a transaction: it may hold rows that are later rolled back,
+# so it never matches the shared version and is reloaded at the next check.
+UNCOMMITTED = object()
+
+
+def load_index(version=None) -> TariffIndex:
+    from .models import TariffPrice
+
+    rows = TariffPrice.objects.order_by("tariff__code", "valid_from").values_list(
+        "tariff__code", "valid_from", "unit_price_eur_kwh"
+    )
+    return TariffIndex(rows, version)
+
+
+def current_version():
+    """Version of the tariffs shared by all processes.
+
+    With a shared cache, the key bumped after each change. The per-process locmem cache would hide
+    that key from the other workers, so the tables are fingerprinted instead (row count, last change).
+    """
+    if not isinstance(caches["default"], LocMemCache):
+        return cache.get(VERSION_KEY)
+    from .models import Tariff, TariffPrice
+
+    return tuple(
+        tuple(model.objects.aggregate(count=Count("id"), changed=Max("updated_at")).values())
+        for model in (Tariff, TariffPrice)
+    )
+
+
+def _in_transaction():
+    return transaction.get_connection().in_atomic_block
+
+
+def tariff_index() -> TariffIndex:
+    """Index of this process, reloaded when another process changed the tariffs.
+
+    The shared version (and the setting) are read at most every TARIFF_INDEX_CHECK_SECONDS,
+    so tight billing loops only pay a clock read, a dictionary lookup and a bisect per price.
+    """
+    global _index, _fresh_until
+    now = time.monotonic()
+    if _index is not None and now < _fresh_until:
+        return _index
+    version = current_version()
+    if _index is None or version != _index.version:
+        _index = load_index(UNCOMMITTED if _in_transaction() else version)
+    _fresh_until = now + settings.TARIFF_INDEX_CHECK_SECONDS
+    return _index
+
+
+def invalidate_tariffs(**kwargs):
+    """Signal handler: drop this process' index and tell the other processes to reload theirs."""
+    global _index
+    _index = None
+    # After commit, so no process reloads the old rows under the new version.
+    transaction.on_commit(_publish_change)
+
+
+def _publish_change():
+    global _index
+    _index = None
+    cache.set(VERSION_KEY, time.time_ns(), timeout=None)
@@ -0,0 +1,12 @@
+from django import template
+from django.urls import reverse
+
+from portal.downloads import sign_download
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def signed_download_url(context, field_file):
+    """Short-lived signed URL of a stored document of the logged-in customer."""
+    return reverse("signed_download", args=[sign_download(field_file.name, context["request"].user.pk)])
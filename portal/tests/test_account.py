@@ -0,0 +1,117 @@
+import pickle
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from portal import admin as portal_admin
+from portal.account import ACCOUNT_CACHE_NAME, get_account
+from portal.models import Contract, CustomerProfile, MeterPoint
+from portal.user_cache import user_cache_key
+
+
+class AccountBundleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username="alice", password="pass1234")
+        self.meter_point = MeterPoint.objects.create(
+            ean="541448820000000001",
+            address_line1="Rue de Test 1",
+            postal_code="1000",
+            city="Bruxelles",
+            holder_firstname="Alice",
+            holder_lastname="Test",
+        )
+        self.profile = CustomerProfile.objects.create(
+            user=self.user,
+            customer_ref="CLI-ACC-1",
+            ean=self.meter_point.ean,
+            supply_address_street="Rue de Test",
+            supply_address_number="1",
+            supply_address_postal_code="1000",
+            supply_address_city="Bruxelles",
+        )
+        for reference, start in (("CTR-OLD", date(2024, 1, 1)), ("CTR-NEW", date(2025, 1, 1))):
+            Contract.objects.create(
+                user=self.user,
+                meter_point=self.meter_point,
+                reference=reference,
+                start_date=start,
+                plan_name="Offre Fixe Securisee",
+                supply_address="Rue de Test 1, 1000 Bruxelles",
+            )
+
+    def test_profile_contract_and_meter_point_in_one_query(self):
+        with self.assertNumQueries(1):
+            account = get_account(self.user)
+            self.assertEqual(account.contract.reference, "CTR-NEW")
+            self.assertEqual(account.profile.customer_ref, "CLI-ACC-1")
+            self.assertEqual(account.meter_point.ean, self.meter_point.ean)
+
+    def test_without_contract(self):
+        Contract.objects.all().delete()
+        account = get_account(self.user)
+        self.assertIsNone(account.contract)
+        self.assertIsNone(account.meter_point)
+        self.assertEqual(account.profile, self.profile)
+
+    @override_settings(ACCOUNT_CACHE_SECONDS=60)
+    def test_cached_across_requests_and_invalidated_on_save(self):
+        get_account(self.user)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_account(self.user).profile.phone, "")
+
+        self.profile.phone = "0470000000"
+        self.profile.save()
+        self.assertEqual(get_account(self.user).profile.phone, "0470000000")
+
+        self.meter_point.city = "Namur"
+        self.meter_point.save()
+        self.assertEqual(get_account(self.user).meter_point.city, "Namur")
+
+    @override_settings(ACCOUNT_CACHE_SECONDS=60)
+    def test_cache_does_not_hold_the_user(self):
+        get_account(self.user)
+        cached = pickle.dumps(cache.get(user_cache_key(self.user.pk, ACCOUNT_CACHE_NAME)))
+        self.assertNotIn(self.user.password.encode(), cached)
+        with self.assertNumQueries(0):
+            account = get_account(self.user)
+            self.assertIs(account.contract.user, self.user)
+            self.assertIs(account.profile.user, self.user)
+
+    @override_settings(ACCOUNT_CACHE_SECONDS=60)
+    def test_meter_point_delete_and_bulk_import_invalidate(self):
+        get_account(self.user)
+        portal_admin._import_meter_point_batch(
+            [
+                MeterPoint(
+                    ean=self.meter_point.ean,
+                    address_line1="Rue de Test 1",
+                    postal_code="5000",
+                    city="Namur",
+                    holder_firstname="Alice",
+                    holder_lastname="Test",
+                )
+            ]
+        )
+        self.assertEqual(get_account(self.user).meter_point.city, "Namur")
+
+        self.meter_point.delete()
+        self.assertIsNone(get_account(self.user).meter_point)
+
+    def test_contract_page_reads_request_account(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("client_contract"))
+        self.assertContains(response, "CTR-NEW")
+        self.assertContains(response, self.meter_point.ean)
+
+    def test_profile_get_does_not_create_profile(self):
+        other = get_user_model().objects.create_user(username="bob", password="pass1234")
+        self.client.force_login(other)
+
+        response = self.client.get(reverse("client_profile"))
+
+        self.assertContains(response, f"CLI-{other.id:05d}")
+        self.assertFalse(CustomerProfile.objects.filter(user=other).exists())
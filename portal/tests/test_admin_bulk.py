@@ -0,0 +1,71 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from portal.admin import import_meter_points_from_reader, reset_online_accounts
+from portal.models import Invitation, MeterPoint, MeterPointHistory
+
+
+def _row(ean, city="Namur", firstname="Jean"):
+    return {
+        "meter_ean": ean,
+        "supply_address": "Rue de Test 1",
+        "supply_postcode": "5000",
+        "supply_city": city,
+        "firstname": firstname,
+        "lastname": "Martin",
+    }
+
+
+class MeterPointImportTests(TestCase):
+    def test_batched_import_counts_created_updated_and_errors(self):
+        MeterPoint.objects.create(
+            ean="541000000000000001",
+            address_line1="Ancienne adresse",
+            postal_code="1000",
+            city="Bruxelles",
+            holder_firstname="Old",
+            holder_lastname="Name",
+        )
+        rows = [
+            _row("541000000000000001", city="Liege"),
+            _row("541000000000000002"),
+            _row("541000000000000003"),
+            _row("541000000000000003", firstname="Marie"),
+            _row(""),
+            {"meter_ean": "", "supply_city": ""},
+        ]
+
+        created, updated, errors = import_meter_points_from_reader(rows, batch_size=2)
+
+        self.assertEqual((created, updated, errors), (2, 2, 1))
+        self.assertEqual(MeterPoint.objects.get(ean="541000000000000001").city, "Liege")
+        self.assertEqual(MeterPoint.objects.get(ean="541000000000000003").holder_firstname, "Marie")
+        self.assertEqual(MeterPointHistory.objects.count(), 3 * 5)
+
+    def test_reimport_keeps_history_unique(self):
+        import_meter_points_from_reader([_row("541000000000000010")])
+        import_meter_points_from_reader([_row("541000000000000010")])
+        self.assertEqual(MeterPointHistory.objects.filter(meter_point__ean="541000000000000010").count(), 5)
+
+
+class ResetOnlineAccountsTests(TestCase):
+    def test_reset_deletes_customers_in_batches_and_keeps_staff(self):
+        call_command("seed_load", customers=3, months=1, stdout=StringIO())
+        staff = get_user_model().objects.create_user(username="formateur", password="x", is_staff=True)
+        Invitation.objects.filter(used_by__isnull=False).first().meter_point.invitations.create(
+            secret_code_hash="x",
+            expires_at=timezone.now() + timedelta(days=1),
+            used_by=staff,
+        )
+
+        deleted_users, reset_invitations = reset_online_accounts()
+
+        self.assertEqual(deleted_users, 3)
+        self.assertEqual(list(get_user_model().objects.values_list("username", flat=True)), ["formateur"])
+        self.assertEqual(reset_invitations, 4)
+        self.assertFalse(Invitation.objects.filter(used_by__isnull=False).exists())
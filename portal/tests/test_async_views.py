@@ -0,0 +1,110 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from portal.admin import ensure_meter_point_history
+from portal.models import Contract, Invitation, Invoice, MeterPoint, MeterReading
+
+
+@override_settings(
+    ROOT_URLCONF="portal.tests.urls_async",
+    EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend",
+)
+class AsyncClientViewsTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="alice", password="pass1234")
+        self.other = get_user_model().objects.create_user(username="bob", password="pass1234")
+        Contract.objects.create(
+            user=self.user,
+            reference="CTR-ASYNC-1",
+            start_date=date(2025, 1, 1),
+            plan_name="Offre Fixe Securisee",
+            supply_address="Rue de Test 1, 1000 Bruxelles",
+        )
+        self.invoice = Invoice.objects.create(
+            user=self.user,
+            reference="FAC-ASYNC-1",
+            period_start=date(2025, 1, 1),
+            period_end=date(2025, 1, 31),
+            issue_date=date(2025, 2, 3),
+            amount_eur=Decimal("85.50"),
+        )
+        MeterReading.objects.create(
+            user=self.user,
+            reading_date=date(2025, 1, 31),
+            value_kwh=1200,
+            status=MeterReading.STATUS_VALIDATED,
+        )
+
+    def test_pages_render(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("client_dashboard"))
+        self.assertContains(response, "Tableau de bord")
+        self.assertEqual(response.context["invoices_count"], 1)
+        self.assertContains(self.client.get(reverse("client_invoices")), "FAC-ASYNC-1")
+        self.assertContains(self.client.get(reverse("client_contract")), "CTR-ASYNC-1")
+        self.assertContains(self.client.get(reverse("client_readings")), "1200")
+
+    def test_login_required(self):
+        response = self.client.get(reverse("client_dashboard"))
+        self.assertEqual(response.status_code, 302)
+
+    def test_pdfs_rendered_in_pool(self):
+        self.client.force_login(self.user)
+        for url in (
+            reverse("invoice_pdf_download", args=[self.invoice.id]),
+            reverse("contract_pdf_download"),
+            reverse("cgv_download"),
+            reverse("direct_debit_template_download"),
+        ):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+            self.assertTrue(response.content.startswith(b"%PDF"), url)
+
+    def test_other_users_invoice_is_404(self):
+        self.client.force_login(self.other)
+        response = self.client.get(reverse("invoice_pdf_download", args=[self.invoice.id]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_reading_submission(self):
+        self.client.force_login(self.user)
+        response = self.client.post(
+            reverse("client_readings"),
+            {"reading_date": date.today().isoformat(), "value_kwh": 1300},
+        )
+        self.assertContains(response, "Votre releve a ete envoye pour validation.")
+        self.assertTrue(MeterReading.objects.filter(user=self.user, value_kwh=1300).exists())
+
+    def test_registration_hashes_password_in_pool(self):
+        meter_point = MeterPoint.objects.create(
+            ean="541234567890129999",
+            address_line1="Rue de Test 1",
+            postal_code="1000",
+            city="Bruxelles",
+            holder_firstname="Jean",
+            holder_lastname="Martin",
+        )
+        ensure_meter_point_history(meter_point)
+        _, secret_code = Invitation.create_with_secret(meter_point, timezone.now() + timedelta(days=30))
+
+        response = self.client.post(
+            reverse("registration_start"),
+            {
+                "ean": meter_point.ean,
+                "secret_code": secret_code,
+                "email": "jean.async@example.com",
+                "password1": "SecuritePass123!",
+                "password2": "SecuritePass123!",
+            },
+        )
+
+        self.assertRedirects(response, reverse("registration_sent"))
+        user = get_user_model().objects.get(username="jean.async@example.com")
+        self.assertTrue(user.check_password("SecuritePass123!"))
+        self.assertFalse(user.is_active)
+        self.assertEqual(len(mail.outbox), 1)
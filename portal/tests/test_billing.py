@@ -0,0 +1,103 @@
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from portal import billing
+from portal.models import Contract, Invoice, MeterReading
+
+
+class BillingRunTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.users = [User.objects.create_user(username=f"client{index}", password="pass1234") for index in range(4)]
+        for index, user in enumerate(self.users):
+            Contract.objects.create(
+                user=user,
+                reference=f"CTR-RUN-{index}",
+                start_date=date(2024, 1, 1),
+                plan_name="Offre Fixe Securisee",
+                supply_address="Rue de Test 1, 1000 Bruxelles",
+                status=Contract.STATUS_CLOSED if index == 3 else Contract.STATUS_ACTIVE,
+            )
+        for user, values in zip(self.users, [(1000, 1250), (5000, 5400), (800, None), (100, 300)]):
+            self.reading(user, date(2025, 2, 28), values[0])
+            if values[1] is not None:
+                self.reading(user, date(2025, 3, 31), values[1])
+        # Submitted readings are not billed.
+        self.reading(self.users[0], date(2025, 3, 30), 9999, status=MeterReading.STATUS_SUBMITTED)
+
+    def reading(self, user, reading_date, value, status=MeterReading.STATUS_VALIDATED):
+        MeterReading.objects.create(user=user, reading_date=reading_date, value_kwh=value, status=status)
+
+    def test_creates_invoices_from_reading_deltas(self):
+        out = StringIO()
+        call_command("billing_run", period="2025-03", chunk_size=1, stdout=out)
+
+        invoices = {invoice.user_id: invoice for invoice in Invoice.objects.all()}
+        self.assertEqual(set(invoices), {self.users[0].id, self.users[1].id})
+        invoice = invoices[self.users[0].id]
+        self.assertEqual(invoice.reference, "FAC-202503-CTR-RUN-0")
+        self.assertEqual(invoice.consumption_kwh, 250)
+        self.assertEqual((invoice.period_start, invoice.period_end), (date(2025, 3, 1), date(2025, 3, 31)))
+        # 12.00 standing charge + 250 kWh * 0.2850
+        self.assertEqual(invoice.amount_eur, Decimal("83.25"))
+        self.assertEqual(invoices[self.users[1].id].consumption_kwh, 400)
+        self.assertIn("3 contrats, 2 factures creees, 0 deja facturees, 1 sans releve", out.getvalue())
+
+    def test_rerun_is_idempotent(self):
+        call_command("billing_run", period="2025-03", stdout=StringIO())
+        out = StringIO()
+        call_command("billing_run", period="2025-03", stdout=out)
+        self.assertEqual(Invoice.objects.count(), 2)
+        self.assertIn("0 factures creees, 2 deja facturees", out.getvalue())
+
+    def test_concurrent_runs_bill_a_customer_once(self):
+        # Second contract of the same customer, in another worker's pk range.
+        Contract.objects.create(
+            user=self.users[0],
+            reference="CTR-RUN-0B",
+            start_date=date(2024, 6, 1),
+            plan_name="Offre Fixe Securisee",
+            supply_address="Rue de Test 2, 1000 Bruxelles",
+        )
+        first, second = billing.billable_contracts(*billing.parse_period("2025-03")).filter(user=self.users[0])
+        period = billing.parse_period("2025-03")
+        billing.bill_chunk([first], *period)
+        # Both workers checked before either inserted.
+        with mock.patch.object(billing, "already_billed", return_value=set()):
+            totals = billing.bill_chunk([second], *period)
+        self.assertEqual(totals, {"created": 0, "skipped": 1, "missing": 0})
+        self.assertEqual(Invoice.objects.filter(user=self.users[0]).count(), 1)
+
+    def test_invalid_period(self):
+        with self.assertRaises(CommandError):
+            call_command("billing_run", period="2025-13", stdout=StringIO())
+
+    def test_parse_period(self):
+        self.assertEqual(billing.parse_period("2024-02"), (date(2024, 2, 1), date(2024, 2, 29)))
+
+    def test_workers_ignored_on_sqlite(self):
+        out = StringIO()
+        with mock.patch("portal.management.commands.billing_run.connection") as connection:
+            connection.vendor = "sqlite"
+            call_command("billing_run", period="2025-03", workers=4, stdout=out)
+        self.assertIn("--workers ignore", out.getvalue())
+        self.assertEqual(Invoice.objects.count(), 2)
+
+    def test_pk_ranges_cover_all_contracts(self):
+        from portal.management.commands.billing_run import Command
+
+        period = billing.parse_period("2025-03")
+        bounds = Command()._pk_bounds(*period, workers=1)
+        self.assertEqual(bounds, [None, None])
+        pks = list(billing.billable_contracts(*period).order_by("pk").values_list("pk", flat=True))
+        totals = billing.run_billing(*period, pk_to=pks[1])
+        totals_rest = billing.run_billing(*period, pk_from=pks[1])
+        self.assertEqual(totals["contracts"] + totals_rest["contracts"], 3)
+        self.assertEqual(totals["created"] + totals_rest["created"], 2)
@@ -1,11 +1,16 @@
+import shutil
+import tempfile
+from unittest import mock
 from decimal import Decimal
 from datetime import date
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.files.base import ContentFile
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
-from portal.models import Invoice
+from portal.downloads import parse_range_header, sign_download
+from portal.models import Attachment, Domiciliation, Invoice, SupportRequest
 
 
 class InvoiceDownloadTests(TestCase):
@@ -37,3 +42,134 @@ class InvoiceDownloadTests(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response["Content-Type"], "application/pdf")
         self.assertTrue(len(response.content) > 0)
+
+
+class StoredFilesMixin:
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media_override = override_settings(MEDIA_ROOT=media_root)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+
+        User = get_user_model()
+        self.user = User.objects.create_user(username="alice", password="pass1234")
+        self.other = User.objects.create_user(username="bob", password="pass1234")
+        support_request = SupportRequest.objects.create(user=self.user, subject="Question", message="Bonjour")
+        self.attachment = Attachment(support_request=support_request)
+        self.attachment.file.save("releve.pdf", ContentFile(b"%PDF-1.4 attachment"))
+        self.domiciliation = Domiciliation(user=self.user)
+        self.domiciliation.document.save("mandat.pdf", ContentFile(b"%PDF-1.4 mandate"))
+
+
+class StoredFileDownloadTests(StoredFilesMixin, TestCase):
+    def test_streamed_by_django_by_default(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("attachment_download", args=[self.attachment.id]))
+        self.assertEqual(b"".join(response.streaming_content), b"%PDF-1.4 attachment")
+        self.assertNotIn("X-Accel-Redirect", response)
+
+    @override_settings(DOWNLOAD_OFFLOAD="x-accel")
+    def test_x_accel_redirect_after_ownership_check(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("domiciliation_document_download", args=[self.domiciliation.id]))
+
+        self.assertEqual(response["X-Accel-Redirect"], f"/protected-media/{self.domiciliation.document.name}")
+        self.assertEqual(response["Content-Type"], "application/pdf")
+        self.assertIn('attachment; filename="', response["Content-Disposition"])
+        self.assertEqual(response.content, b"")
+
+        self.client.force_login(self.other)
+        response = self.client.get(reverse("domiciliation_document_download", args=[self.domiciliation.id]))
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn("X-Accel-Redirect", response)
+
+    @override_settings(DOWNLOAD_OFFLOAD="x-sendfile")
+    def test_x_sendfile_uses_absolute_path(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("attachment_download", args=[self.attachment.id]))
+        self.assertEqual(response["X-Sendfile"], self.attachment.file.path)
+
+
+class SignedDownloadTests(StoredFilesMixin, TestCase):
+    def test_client_pages_link_signed_urls_served_without_session_or_db(self):
+        self.client.force_login(self.user)
+        page = self.client.get(reverse("client_requests")).content.decode()
+        url = page.split('href="/documents/')[1].split('"')[0]
+
+        anonymous = Client()
+        with self.assertNumQueries(0):
+            response = anonymous.get(f"/documents/{url}")
+        self.assertEqual(b"".join(response.streaming_content), b"%PDF-1.4 attachment")
+        self.assertIn("max-age=", response["Cache-Control"])
+        self.assertNotIn("sessionid", response.cookies)
+
+    def test_tampered_and_expired_tokens_are_rejected(self):
+        token = sign_download(self.attachment.file.name, self.user.pk)
+        payload, mac = token.split(".")
+        forged = sign_download(self.domiciliation.document.name, self.user.pk).split(".")[0] + "." + mac
+        self.assertEqual(self.client.get(reverse("signed_download", args=[forged])).status_code, 404)
+        self.assertEqual(self.client.get(reverse("signed_download", args=["garbage"])).status_code, 404)
+
+        expired = sign_download(self.attachment.file.name, self.user.pk, expires_at=1)
+        self.assertEqual(self.client.get(reverse("signed_download", args=[expired])).status_code, 410)
+
+    def test_url_is_stable_within_a_window(self):
+        name = self.attachment.file.name
+        with mock.patch("portal.downloads.time.time", return_value=1_000_010):
+            first = sign_download(name, self.user.pk)
+        with mock.patch("portal.downloads.time.time", return_value=1_000_190):
+            self.assertEqual(sign_download(name, self.user.pk), first)
+
+
+class RangeDownloadTests(StoredFilesMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+        self.url = reverse("attachment_download", args=[self.attachment.id])
+        self.body = b"%PDF-1.4 attachment"
+
+    def test_full_download_advertises_ranges_and_validators(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertTrue(response["ETag"].startswith('"'))
+        self.assertIn("Last-Modified", response)
+
+    def test_single_range(self):
+        response = self.client.get(self.url, HTTP_RANGE="bytes=9-")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], f"bytes 9-{len(self.body) - 1}/{len(self.body)}")
+        self.assertEqual(b"".join(response.streaming_content), self.body[9:])
+
+        response = self.client.get(self.url, HTTP_RANGE="bytes=-4")
+        self.assertEqual(b"".join(response.streaming_content), self.body[-4:])
+
+    def test_multi_range(self):
+        response = self.client.get(self.url, HTTP_RANGE="bytes=0-3,9-18")
+        content = b"".join(response.streaming_content)
+
+        self.assertEqual(response.status_code, 206)
+        self.assertTrue(response["Content-Type"].startswith("multipart/byteranges; boundary="))
+        self.assertEqual(int(response["Content-Length"]), len(content))
+        self.assertIn(b"Content-Range: bytes 0-3/19\r\n\r\n%PDF\r\n", content)
+        self.assertIn(b"Content-Range: bytes 9-18/19\r\n\r\nattachment\r\n", content)
+
+    def test_unsatisfiable_and_malformed_ranges(self):
+        response = self.client.get(self.url, HTTP_RANGE="bytes=100-200")
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], "bytes */19")
+
+        self.assertEqual(self.client.get(self.url, HTTP_RANGE="bytes=5-2").status_code, 200)
+        self.assertEqual(self.client.get(self.url, HTTP_RANGE="items=0-1").status_code, 200)
+
+    def test_non_ascii_digits_are_ignored(self):
+        for header in ("bytes=\u00b2-5", "bytes=0-\u00b9", "bytes=-\u00b3", "bytes=\u0663-5"):
+            self.assertIsNone(parse_range_header(header, 19), header)
+            self.assertEqual(self.client.get(self.url, HTTP_RANGE=header).status_code, 200, header)
+
+    def test_if_range_validates_etag(self):
+        etag = self.client.get(self.url)["ETag"]
+        self.assertEqual(self.client.get(self.url, HTTP_RANGE="bytes=0-3", HTTP_IF_RANGE=etag).status_code, 206)
+        self.assertEqual(self.client.get(self.url, HTTP_RANGE="bytes=0-3", HTTP_IF_RANGE='"stale"').status_code, 200)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
@@ -0,0 +1,124 @@
+import calendar
+import unittest
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from portal import estimation
+from portal.pdf import build_invoice_pdf
+from portal.models import Contract, Invoice, MeterPoint, MeterPointHistory, MeterReading
+
+
+def month_end(year, month):
+    return date(year, month, calendar.monthrange(year, month)[1])
+
+
+@unittest.skipIf(estimation.np is None, "NumPy is not installed")
+class EstimationTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.weights = estimation.SeasonalWeights(date(2023, 1, 1), date(2025, 12, 31))
+        self.users = []
+        for index in range(4):
+            user = User.objects.create(username=f"client{index}")
+            meter_point = MeterPoint.objects.create(
+                ean=f"54144800000000005{index}",
+                address_line1="Rue de Test 1",
+                postal_code="1000",
+                city="Bruxelles",
+                holder_firstname="Jean",
+                holder_lastname="Martin",
+            )
+            Contract.objects.create(
+                user=user,
+                meter_point=meter_point,
+                reference=f"CTR-EST-{index}",
+                start_date=date(2024, 1, 1),
+                plan_name="Offre Fixe Securisee",
+                supply_address="Rue de Test 1, 1000 Bruxelles",
+            )
+            self.users.append(user)
+        # client0: monthly readings at exactly 10 kWh per profile day; client1: already read in October.
+        for user in self.users[:2]:
+            for month in range(1, 10):
+                end = month_end(2025, month)
+                self.reading(user, end, 1000 + self.profile_kwh(10, date(2024, 12, 31), end))
+        self.reading(self.users[1], date(2025, 10, 20), 5000)
+        # client2: a single index, nothing to fit. client3: a single index plus the meter point history.
+        self.reading(self.users[2], date(2025, 9, 30), 700)
+        self.reading(self.users[3], date(2025, 9, 30), 2000)
+        meter_point = Contract.objects.get(user=self.users[3]).meter_point
+        for month in range(1, 13):
+            start, end = date(2024, month, 1), month_end(2024, month)
+            MeterPointHistory.objects.create(
+                meter_point=meter_point,
+                period_start=start,
+                period_end=end,
+                reading_date=end,
+                consumption_kwh=self.profile_kwh(6, start, end + timedelta(days=1)),
+                amount_eur="50.00",
+            )
+
+    def profile_kwh(self, level, start, end):
+        return round(level * float(self.weights.between(start.toordinal(), end.toordinal())))
+
+    def reading(self, user, reading_date, value):
+        MeterReading.objects.create(
+            user=user, reading_date=reading_date, value_kwh=value, status=MeterReading.STATUS_VALIDATED
+        )
+
+    def test_estimates_closing_index_from_seasonal_fit(self):
+        totals = estimation.run_estimation(date(2025, 10, 1), date(2025, 10, 31), chunk_size=3)
+        self.assertEqual(totals, {"contracts": 4, "estimated": 2, "skipped": 1, "missing": 1})
+
+        estimated = {reading.user_id: reading for reading in MeterReading.objects.filter(is_estimated=True)}
+        self.assertEqual(set(estimated), {self.users[0].id, self.users[3].id})
+        reading = estimated[self.users[0].id]
+        self.assertEqual((reading.reading_date, reading.status), (date(2025, 10, 31), MeterReading.STATUS_VALIDATED))
+        last = MeterReading.objects.get(user=self.users[0], reading_date=date(2025, 9, 30)).value_kwh
+        expected = last + self.profile_kwh(10, date(2025, 9, 30), date(2025, 10, 31))
+        self.assertAlmostEqual(reading.value_kwh, expected, delta=1)
+        expected = 2000 + self.profile_kwh(6, date(2025, 9, 30), date(2025, 10, 31))
+        self.assertAlmostEqual(estimated[self.users[3].id].value_kwh, expected, delta=1)
+
+    def test_billing_run_estimates_first(self):
+        out = StringIO()
+        call_command("billing_run", period="2025-10", estimate=True, stdout=out)
+        self.assertIn("2 index estimes", out.getvalue())
+        invoiced = set(Invoice.objects.values_list("user_id", flat=True))
+        self.assertEqual(invoiced, {self.users[0].id, self.users[1].id, self.users[3].id})
+        # Estimated readings count as an index: a second run estimates nothing more.
+        self.assertEqual(estimation.run_estimation(date(2025, 10, 1), date(2025, 10, 31))["estimated"], 0)
+
+    def test_customer_can_correct_an_estimate_downwards(self):
+        estimation.run_estimation(date(2025, 10, 1), date(2025, 10, 31))
+        user = self.users[3]
+        user.set_password("pass1234")
+        user.save()
+        self.client.login(username=user.username, password="pass1234")
+        response = self.client.post(reverse("client_readings"), {"reading_date": "2025-11-02", "value_kwh": 2001})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(MeterReading.objects.filter(user=user, value_kwh=2001).exists())
+
+    def test_lower_real_reading_after_estimate_is_regularized(self):
+        call_command("billing_run", period="2025-10", estimate=True, stdout=StringIO())
+        user = self.users[3]
+        estimate = MeterReading.objects.get(user=user, is_estimated=True).value_kwh
+        self.assertGreater(estimate, 2100)
+        # The real index at the end of November is below the October estimate.
+        self.reading(user, date(2025, 11, 30), 2050)
+
+        call_command("billing_run", period="2025-11", estimate=True, stdout=StringIO())
+        invoice = Invoice.objects.get(user=user, period_start=date(2025, 11, 1))
+        self.assertEqual(invoice.consumption_kwh, 50)
+        self.assertEqual(invoice.regularization_kwh, 2000 - estimate)
+        # 12.00 standing charge + (50 - over-estimate) kWh x 0.2850: billed back in full.
+        net = (Decimal(50 + 2000 - estimate) * Decimal("0.2850")).quantize(Decimal("0.01"))
+        self.assertEqual(invoice.amount_eur, Decimal("12.00") + net)
+        self.assertFalse(MeterReading.objects.filter(user=user, reading_date=date(2025, 11, 30), is_estimated=True))
+        self.assertTrue(build_invoice_pdf(invoice, user, None).startswith(b"%PDF"))
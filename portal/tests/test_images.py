@@ -0,0 +1,95 @@
+import io
+import shutil
+import tempfile
+import unittest
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from portal import images
+from portal.models import Attachment, SupportRequest
+
+
+def png_bytes(size=(1600, 1200)):
+    image = images.Image.new("RGBA", size, (30, 120, 200, 255))
+    output = io.BytesIO()
+    image.save(output, "PNG", compress_level=0)
+    return output.getvalue()
+
+
+@unittest.skipIf(images.Image is None, "Pillow is not installed")
+class AttachmentDerivativesTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media_override = override_settings(MEDIA_ROOT=media_root)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+
+        User = get_user_model()
+        self.user = User.objects.create_user(username="alice", password="pass1234")
+        self.other = User.objects.create_user(username="bob", password="pass1234")
+        self.staff = User.objects.create_user(username="admin", password="pass1234", is_staff=True)
+        support_request = SupportRequest.objects.create(user=self.user, subject="Compteur", message="Photo")
+        self.original = png_bytes()
+        self.image = Attachment(support_request=support_request)
+        self.image.file.save("compteur.png", ContentFile(self.original))
+        self.document = Attachment(support_request=support_request)
+        self.document.file.save("releve.pdf", ContentFile(b"%PDF-1.4 document"))
+
+    def test_without_pillow_images_stay_pending(self):
+        with mock.patch.object(images, "Image", None):
+            with self.assertRaises(CommandError):
+                call_command("process_attachments", stdout=StringIO())
+            self.assertEqual(images.build_derivatives(self.image), Attachment.DERIVATIVES_PENDING)
+        self.image.refresh_from_db()
+        self.assertEqual(self.image.derivatives_status, Attachment.DERIVATIVES_PENDING)
+
+    def test_worker_builds_preview_and_lossless_png(self):
+        call_command("process_attachments", stdout=StringIO())
+        self.image.refresh_from_db()
+        self.document.refresh_from_db()
+
+        self.assertEqual(self.image.derivatives_status, Attachment.DERIVATIVES_READY)
+        self.assertEqual(self.document.derivatives_status, Attachment.DERIVATIVES_NONE)
+        self.assertTrue(self.image.preview.name.endswith("compteur.preview.jpg"))
+        with self.image.preview.open("rb") as handle, images.Image.open(handle) as preview:
+            self.assertEqual(preview.format, "JPEG")
+            self.assertLessEqual(max(preview.size), max(images.PREVIEW_SIZE))
+        with self.image.optimized.open("rb") as handle:
+            optimized = handle.read()
+        self.assertLess(len(optimized), len(self.original))
+        with images.Image.open(io.BytesIO(optimized)) as lossless, images.Image.open(io.BytesIO(self.original)) as source:
+            self.assertEqual(lossless.tobytes(), source.tobytes())
+        with self.image.file.open("rb") as handle:
+            self.assertEqual(handle.read(), self.original)
+
+    def test_unreadable_image_is_marked_failed(self):
+        broken = Attachment(support_request=self.image.support_request)
+        broken.file.save("casse.jpg", ContentFile(b"\xff\xd8\xff not a jpeg"))
+        with self.assertLogs("portal.images", "WARNING"):
+            call_command("process_attachments", stdout=StringIO())
+        broken.refresh_from_db()
+        self.assertEqual(broken.derivatives_status, Attachment.DERIVATIVES_FAILED)
+        self.assertFalse(broken.preview)
+
+    def test_preview_endpoint_access(self):
+        url = reverse("attachment_preview", args=[self.image.id])
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+        call_command("process_attachments", stdout=StringIO())
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertLess(int(response["Content-Length"]), len(self.original) // 10)
+
+        self.client.force_login(self.staff)
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.client.force_login(self.other)
+        self.assertEqual(self.client.get(url).status_code, 404)
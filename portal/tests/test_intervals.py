@@ -0,0 +1,142 @@
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import date, datetime, timezone as dt_timezone
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from portal import intervals
+from portal.models import MeterPoint
+
+np = intervals.np
+QUARTER = 15 * 60
+
+
+def epoch(*args):
+    return int(datetime(*args, tzinfo=dt_timezone.utc).timestamp())
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class IntervalStoreTests(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        root_override = override_settings(INTERVAL_DATA_ROOT=Path(self.root))
+        root_override.enable()
+        self.addCleanup(root_override.disable)
+        self.meter_point = MeterPoint.objects.create(
+            ean="541448000000000047",
+            address_line1="Rue de Test 1",
+            postal_code="1000",
+            city="Bruxelles",
+            holder_firstname="Jean",
+            holder_lastname="Martin",
+        )
+        # Two days around the January/February boundary, one value per quarter hour.
+        self.timestamps = np.arange(epoch(2026, 1, 31), epoch(2026, 2, 2), QUARTER, dtype=np.int64)
+        self.kwh = np.arange(len(self.timestamps), dtype=np.float64) / 100
+
+    def test_append_partitions_by_month(self):
+        store = self.meter_point.intervals
+        written = store.append(self.timestamps, self.kwh)
+        self.assertEqual(sorted(written), ["2026-01", "2026-02"])
+        self.assertEqual(store.months(), ["2026-01", "2026-02"])
+        timestamps, kwh = store.read()
+        np.testing.assert_array_equal(timestamps, self.timestamps)
+        np.testing.assert_array_equal(kwh, self.kwh)
+
+    def test_range_read_in_one_month_is_a_view(self):
+        store = self.meter_point.intervals
+        store.append(self.timestamps, self.kwh)
+        timestamps, kwh = store.read(epoch(2026, 2, 1, 6), epoch(2026, 2, 1, 7))
+        self.assertEqual(len(timestamps), 4)
+        self.assertIsInstance(kwh.base, np.memmap)
+        self.assertEqual(timestamps[0], epoch(2026, 2, 1, 6))
+        # Dates are local (Europe/Brussels) midnights: 1 February = 31 January 23:00 UTC .. 1 February 23:00 UTC.
+        local_day = (self.timestamps >= epoch(2026, 1, 31, 23)) & (self.timestamps < epoch(2026, 2, 1, 23))
+        self.assertAlmostEqual(store.total_kwh(date(2026, 2, 1), date(2026, 2, 2)), self.kwh[local_day].sum())
+
+    def test_append_is_idempotent_and_ordered(self):
+        store = self.meter_point.intervals
+        store.append(self.timestamps[:100], self.kwh[:100])
+        written = store.append(self.timestamps, self.kwh)
+        self.assertEqual(sum(len(ts) for ts, _ in written.values()), len(self.timestamps) - 100)
+        self.assertEqual(store.append(self.timestamps, self.kwh), {})
+        self.assertEqual(len(store.read()[0]), len(self.timestamps))
+        with self.assertRaises(ValueError):
+            store.append(self.timestamps[::-1], self.kwh)
+
+    def test_torn_append_is_repaired(self):
+        store = self.meter_point.intervals
+        store.append(self.timestamps[:10], self.kwh[:10])
+        with open(store.directory / "2026-01.ts", "ab") as handle:
+            handle.write(b"\x00" * 12)  # crash in the middle of the next append
+        self.assertEqual(len(store.read()[0]), 10)
+        store.append(self.timestamps[10:20], self.kwh[10:20])
+        np.testing.assert_array_equal(store.read()[0], self.timestamps[:20])
+
+    def test_backfilled_gap_is_merged_in_order(self):
+        store = self.meter_point.intervals
+        gap = (self.timestamps >= epoch(2026, 1, 31, 6)) & (self.timestamps < epoch(2026, 1, 31, 12))
+        store.append(self.timestamps[~gap], self.kwh[~gap])
+        self.assertFalse(store.covers(epoch(2026, 1, 31), epoch(2026, 2, 2)))
+
+        written = store.append(self.timestamps, self.kwh)
+        self.assertEqual(sum(len(ts) for ts, _ in written.values()), int(gap.sum()))
+        timestamps, kwh = store.read()
+        np.testing.assert_array_equal(timestamps, self.timestamps)
+        np.testing.assert_array_equal(kwh, self.kwh)
+        self.assertTrue(store.covers(epoch(2026, 1, 31), epoch(2026, 2, 2)))
+        # Rollups include the late intervals exactly once.
+        hours = store.rollups.hourly(epoch(2026, 1, 31), epoch(2026, 2, 2))[1]
+        np.testing.assert_allclose(hours, self.kwh.reshape(-1, 4).sum(axis=1))
+        self.assertFalse(list(store.directory.glob("*.merge")))
+
+    def test_interrupted_merge_is_completed_or_discarded(self):
+        store = self.meter_point.intervals
+        january = self.timestamps < epoch(2026, 2, 1)
+        store.append(self.timestamps[::2], self.kwh[::2])
+        february = store.read(epoch(2026, 2, 1))[0].copy()
+        renamed = []
+        real_replace = os.replace
+
+        def crash_after_timestamps(source, target):
+            if renamed:
+                raise OSError("crash")
+            renamed.append(source)
+            real_replace(source, target)
+
+        # Crash between the two renames: the timestamps are committed, readers see the merged month.
+        with mock.patch("portal.intervals.os.replace", side_effect=crash_after_timestamps):
+            with self.assertRaises(OSError):
+                store.append(self.timestamps[1::2][january[1::2]], self.kwh[1::2][january[1::2]])
+        np.testing.assert_array_equal(store.read(None, epoch(2026, 2, 1))[1], self.kwh[january])
+        store.append(self.timestamps[:1], self.kwh[:1])  # the next append completes it
+        self.assertFalse(list(store.directory.glob("*.merge")))
+        np.testing.assert_array_equal(store.read(None, epoch(2026, 2, 1))[0], self.timestamps[january])
+
+        # Crash before any rename: the merge is ignored, then discarded.
+        (store.directory / "2026-02.ts.merge").write_bytes(b"\x00" * 8)
+        (store.directory / "2026-02.kwh.merge").write_bytes(b"\x00" * 8)
+        np.testing.assert_array_equal(store.read(epoch(2026, 2, 1))[0], february)
+        store.append(february[-1:], np.zeros(1))
+        self.assertFalse(list(store.directory.glob("*.merge")))
+        np.testing.assert_array_equal(store.read(epoch(2026, 2, 1))[0], february)
+
+    def test_ingest_command(self):
+        csv_path = Path(self.root, "load.csv")
+        lines = ["ean;timestamp;kwh"]
+        lines += [f"{self.meter_point.ean};2026-03-01T00:{minute:02d}:00+01:00;0.25" for minute in (0, 15, 30, 45)]
+        lines += ["549000000000000001;2026-03-01T00:00:00+01:00;1.0"]
+        csv_path.write_text("\n".join(lines) + "\n")
+        out = StringIO()
+        call_command("ingest_intervals", str(csv_path), stdout=out)
+        self.assertIn("5 lignes lues, 4 intervalles ajoutes, 1 EAN inconnus", out.getvalue())
+        timestamps, kwh = self.meter_point.intervals.read()
+        self.assertEqual(timestamps[0], epoch(2026, 2, 28, 23))
+        self.assertEqual(self.meter_point.intervals.months(), ["2026-02"])
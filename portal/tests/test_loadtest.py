@@ -0,0 +1,56 @@
+import http.client
+import json
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import LiveServerTestCase, SimpleTestCase
+
+from portal.management.commands.loadtest import CustomerJourney, percentile, summarize
+from portal.management.commands.seed_load import load_username
+from portal.models import MeterReading
+
+
+class PercentileTests(SimpleTestCase):
+    def test_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 95), 95)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertIsNone(percentile([], 50))
+
+    def test_summarize_counts_errors(self):
+        totals, routes = summarize({"client_dashboard": [(0.010, True), (0.030, False)]}, duration=2.0)
+        self.assertEqual(totals["requests"], 2)
+        self.assertEqual(totals["errors"], 1)
+        self.assertEqual(routes["client_dashboard"]["p50_ms"], 10.0)
+        self.assertEqual(routes["client_dashboard"]["throughput_rps"], 1.0)
+
+    def test_failed_request_is_counted_not_raised(self):
+        recorded = []
+        journey = CustomerJourney("http://testserver", "alice", "pass1234", record=lambda *sample: recorded.append(sample))
+        with mock.patch.object(journey.opener, "open", side_effect=http.client.IncompleteRead(b"")):
+            self.assertEqual(journey.request("client_dashboard", "/espace-client/"), (None, ""))
+        self.assertEqual([(route, ok) for route, _, ok in recorded], [("client_dashboard", False)])
+
+
+class LoadtestCommandTests(LiveServerTestCase):
+    def test_journey_reports_every_route(self):
+        call_command("seed_load", customers=1, months=2, stdout=StringIO())
+        out = StringIO()
+        call_command("loadtest", url=self.live_server_url, users=1, iterations=1, warmup=0, stdout=out)
+
+        report = json.loads(out.getvalue())
+        self.assertEqual(report["total"]["errors"], 0)
+        for route in ("login_submit", "client_dashboard", "client_invoices", "invoice_pdf_download", "client_readings_submit"):
+            self.assertEqual(report["routes"][route]["count"], 1, route)
+        self.assertEqual(MeterReading.objects.filter(status=MeterReading.STATUS_SUBMITTED).count(), 1)
+
+    def test_refused_login_is_counted_as_an_error(self):
+        call_command("seed_load", customers=1, months=1, stdout=StringIO())
+        recorded = []
+        journey = CustomerJourney(
+            self.live_server_url, load_username(1), "wrong", record=lambda *sample: recorded.append(sample)
+        )
+        journey.run(0)
+        self.assertEqual([(route, ok) for route, _, ok in recorded], [("login_form", True), ("login_submit", False)])
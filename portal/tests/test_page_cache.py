@@ -0,0 +1,62 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+
+from portal import page_cache
+
+TOKEN_RE = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+
+
+class AnonymousPageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_second_anonymous_get_is_served_from_cache(self):
+        first = self.client.get("/")
+        second = self.client.get("/")
+
+        self.assertEqual(first["X-Page-Cache"], "miss")
+        self.assertEqual(second["X-Page-Cache"], "hit")
+        self.assertEqual(first.content, second.content)
+
+    def test_query_string_and_authenticated_users_bypass_cache(self):
+        self.client.get("/aide/")
+        self.assertNotIn("X-Page-Cache", self.client.get("/aide/?x=1"))
+
+        user = get_user_model().objects.create_user(username="client@example.com", password="x")
+        self.client.force_login(user)
+        response = self.client.get("/aide/")
+        self.assertNotIn("X-Page-Cache", response)
+        self.assertContains(response, "Se déconnecter")
+
+    def test_pending_messages_bypass_cache(self):
+        self.client.get("/contact/")
+        response = self.client.post("/contact/", {"nom": "A", "email": "a@example.com", "message": "Bonjour"}, follow=False)
+        self.assertContains(response, "Votre message a bien ete recu.")
+
+    def test_cached_contact_page_gets_a_fresh_valid_csrf_token(self):
+        Client(enforce_csrf_checks=True).get("/contact/")
+        client = Client(enforce_csrf_checks=True)
+        response = client.get("/contact/")
+
+        self.assertEqual(response["X-Page-Cache"], "hit")
+        self.assertNotIn(page_cache.CSRF_PLACEHOLDER, response.content)
+        token = TOKEN_RE.search(response.content.decode()).group(1)
+        posted = client.post("/contact/", {"csrfmiddlewaretoken": token, "nom": "A", "email": "a@example.com", "message": "Bonjour"})
+        self.assertEqual(posted.status_code, 200)
+
+    def test_key_changes_with_template_version(self):
+        request = self.client.get("/").wsgi_request
+        with override_settings(PAGE_CACHE_VERSION="release-1"):
+            page_cache.template_version.cache_clear()
+            key_1 = page_cache.page_cache_key(request)
+        with override_settings(PAGE_CACHE_VERSION="release-2"):
+            page_cache.template_version.cache_clear()
+            key_2 = page_cache.page_cache_key(request)
+        page_cache.template_version.cache_clear()
+
+        self.assertNotEqual(key_1, key_2)
+        self.assertIn(":fr-be:/", key_1)
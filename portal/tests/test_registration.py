@@ -1,14 +1,16 @@
 ﻿from datetime import timedelta
+from io import StringIO
 import re
 
 from django.contrib.auth import get_user_model
 from django.core import mail
+from django.core.management import call_command
 from django.test import TestCase, override_settings
 from django.urls import reverse
 from django.utils import timezone
 
 from portal.admin import ensure_meter_point_history
-from portal.models import Invitation, Invoice, MeterPoint, MeterReading
+from portal.models import Contract, Invitation, Invoice, MeterPoint, MeterPointHistory, MeterReading
 
 
 @override_settings(EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend", SITE_URL="http://testserver")
@@ -168,3 +170,32 @@ class RegistrationFlowTests(TestCase):
         )
         self.assertRedirects(response, reverse("registration_sent"))
         self.assertEqual(User.objects.filter(username="old.pending@example.com").count(), 1)
+
+    def test_history_keeps_a_month_already_billed_by_billing_run(self):
+        data = {
+            "ean": self.meter_point.ean,
+            "secret_code": self.secret_code,
+            "email": "deja.facture@example.com",
+            "password1": "SecuritePass123!",
+            "password2": "SecuritePass123!",
+        }
+        self.client.post(reverse("registration_start"), data)
+        user = get_user_model().objects.get(username="deja.facture@example.com")
+        last = MeterPointHistory.objects.filter(meter_point=self.meter_point).latest("period_start")
+        # The last history month is billed by billing_run instead, under its own reference.
+        Invoice.objects.filter(user=user, period_start=last.period_start).delete()
+        MeterReading.objects.filter(user=user).delete()
+        for reading_date, value in ((last.period_start - timedelta(days=1), 1000), (last.period_end, 1200)):
+            MeterReading.objects.create(
+                user=user, reading_date=reading_date, value_kwh=value, status=MeterReading.STATUS_VALIDATED
+            )
+        Contract.objects.filter(user=user).update(start_date=last.period_start)
+        call_command("billing_run", period=f"{last.period_start:%Y-%m}", stdout=StringIO())
+        billed = Invoice.objects.get(user=user, period_start=last.period_start)
+        self.assertFalse(billed.reference.startswith("FAC-SELF-"))
+
+        # Registering again materializes the history without clashing with that invoice.
+        response = self.client.post(reverse("registration_start"), data)
+        self.assertRedirects(response, reverse("registration_sent"))
+        self.assertEqual(Invoice.objects.filter(user=user).count(), 5)
+        self.assertEqual(Invoice.objects.get(user=user, period_start=last.period_start).reference, billed.reference)
@@ -0,0 +1,102 @@
+import random
+import shutil
+import tempfile
+import unittest
+from datetime import date, datetime, timezone as dt_timezone
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from portal import intervals
+from portal.models import Contract, MeterPoint
+
+np = intervals.np
+QUARTER = 15 * 60
+
+
+def epoch(*args):
+    return int(datetime(*args, tzinfo=dt_timezone.utc).timestamp())
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class RollupTests(TestCase):
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        root_override = override_settings(INTERVAL_DATA_ROOT=Path(root))
+        root_override.enable()
+        self.addCleanup(root_override.disable)
+        self.meter_point = MeterPoint.objects.create(
+            ean="541448000000000054",
+            address_line1="Rue de Test 1",
+            postal_code="1000",
+            city="Bruxelles",
+            holder_firstname="Jean",
+            holder_lastname="Martin",
+        )
+        # 2025-01-01 .. 2026-04-01 UTC, two DST changes included; appended in two chunks.
+        self.timestamps = np.arange(epoch(2025, 1, 1), epoch(2026, 4, 1), QUARTER, dtype=np.int64)
+        self.kwh = np.random.default_rng(48).random(len(self.timestamps))
+        half = len(self.timestamps) // 2
+        self.store = self.meter_point.intervals
+        self.store.append(self.timestamps[:half], self.kwh[:half])
+        self.store.append(self.timestamps[half:], self.kwh[half:])
+
+    def raw_total(self, start, end):
+        return self.kwh[(self.timestamps >= start) & (self.timestamps < end)].sum()
+
+    def test_total_matches_raw_intervals(self):
+        rng = random.Random(48)
+        for _ in range(200):
+            start = rng.randint(epoch(2024, 12, 25), epoch(2026, 4, 5))
+            end = start + rng.choice([900, 5000, 2 * 86400, 45 * 86400, 300 * 86400])
+            self.assertAlmostEqual(self.store.rollups.total(start, end), self.raw_total(start, end), places=6)
+
+    def test_local_days_follow_daylight_saving(self):
+        days, values = self.store.rollups.daily(date(2025, 3, 29), date(2025, 4, 1))
+        self.assertEqual(days, [date(2025, 3, 29), date(2025, 3, 30), date(2025, 3, 31)])
+        # 30 March 2025 (summer time starts) is 23 hours long: 22:00 UTC on the 29th .. 22:00 UTC on the 30th.
+        self.assertAlmostEqual(values[1], self.raw_total(epoch(2025, 3, 29, 23), epoch(2025, 3, 30, 22)))
+        months, values = self.store.rollups.monthly(date(2025, 1, 1), date(2026, 1, 1))
+        self.assertEqual(len(months), 12)
+        self.assertAlmostEqual(values.sum(), self.raw_total(epoch(2024, 12, 31, 23), epoch(2025, 12, 31, 23)))
+
+    def test_series_resolution(self):
+        self.assertEqual(self.store.rollups.series(date(2025, 6, 1), date(2025, 6, 2))[0], "hour")
+        self.assertEqual(self.store.rollups.series(date(2025, 6, 1), date(2025, 7, 1))[0], "day")
+        resolution, labels, values = self.store.rollups.series(date(2025, 1, 1), date(2026, 1, 1))
+        self.assertEqual((resolution, len(labels), len(values)), ("month", 12, 12))
+
+    def test_rebuild_gives_same_rollups(self):
+        before = self.store.rollups.monthly(date(2025, 1, 1), date(2026, 4, 1))[1]
+        call_command("rebuild_rollups", stdout=StringIO())
+        np.testing.assert_allclose(self.store.rollups.monthly(date(2025, 1, 1), date(2026, 4, 1))[1], before)
+
+    def test_client_pages_use_rollups(self):
+        user = get_user_model().objects.create_user(username="jean", password="pass1234")
+        Contract.objects.create(
+            user=user,
+            meter_point=self.meter_point,
+            reference="CTR-ROLLUP-1",
+            start_date=date(2025, 1, 1),
+            plan_name="Offre Fixe Securisee",
+            supply_address="Rue de Test 1, 1000 Bruxelles",
+        )
+        self.client.force_login(user)
+        with mock.patch("django.utils.timezone.localdate", return_value=date(2026, 3, 15)):
+            dashboard = self.client.get(reverse("client_dashboard"))
+            page = self.client.get(reverse("client_consumption"))
+        self.assertTrue(dashboard.context["chart_from_meter"])
+        self.assertIn("Mar 2026", dashboard.context["chart_labels_json"])
+        self.assertContains(page, "Douze derniers mois")
+        self.assertContains(page, "months-chart")
+
+    def test_consumption_page_without_interval_data(self):
+        user = get_user_model().objects.create_user(username="marie", password="pass1234")
+        self.client.force_login(user)
+        self.assertContains(self.client.get(reverse("client_consumption")), "Aucune donnée de compteur communicant")
@@ -0,0 +1,64 @@
+from unittest import mock
+
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase
+
+from portal.models import Invoice
+from portal.routers import (
+    PIN_COOKIE_NAME,
+    PrimaryReplicaRouter,
+    ReplicaRoutingMiddleware,
+    read_from_replica,
+)
+
+
+@mock.patch("portal.routers.replica_configured", return_value=True)
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+        self.factory = RequestFactory()
+        self.seen = []
+
+    def _run(self, view, request):
+        def get_response(req):
+            middleware.process_view(req, view, (), {})
+            return view(req)
+
+        middleware = ReplicaRoutingMiddleware(get_response)
+        return middleware(request)
+
+    def _reading_view(self, write=False):
+        def view(request):
+            self.seen.append(self.router.db_for_read(Invoice))
+            if write:
+                self.router.db_for_write(Invoice)
+                self.seen.append(self.router.db_for_read(Invoice))
+            return HttpResponse("ok")
+
+        return view
+
+    def test_marked_view_reads_from_replica(self, _):
+        response = self._run(read_from_replica(self._reading_view()), self.factory.get("/"))
+        self.assertEqual(self.seen, ["replica"])
+        self.assertNotIn(PIN_COOKIE_NAME, response.cookies)
+        self.assertIsNone(self.router.db_for_read(Invoice))
+
+    def test_unmarked_view_uses_primary(self, _):
+        self._run(self._reading_view(), self.factory.get("/"))
+        self.assertEqual(self.seen, [None])
+
+    def test_write_switches_to_primary_and_pins_browser(self, _):
+        response = self._run(read_from_replica(self._reading_view(write=True)), self.factory.get("/"))
+        self.assertEqual(self.seen, ["replica", None])
+        self.assertIn(PIN_COOKIE_NAME, response.cookies)
+
+    def test_post_pins_browser(self, _):
+        response = self._run(read_from_replica(self._reading_view()), self.factory.post("/"))
+        self.assertEqual(self.seen, [None])
+        self.assertIn(PIN_COOKIE_NAME, response.cookies)
+
+    def test_pinned_browser_reads_from_primary(self, _):
+        request = self.factory.get("/")
+        request.COOKIES[PIN_COOKIE_NAME] = "1"
+        self._run(read_from_replica(self._reading_view()), request)
+        self.assertEqual(self.seen, [None])
@@ -0,0 +1,30 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from portal.models import Contract, CustomerProfile, Invitation, Invoice, MeterPoint, MeterReading
+
+
+class SeedLoadCommandTests(TestCase):
+    def test_creates_requested_volume(self):
+        call_command("seed_load", customers=5, months=3, batch_size=2, stdout=StringIO())
+
+        users = get_user_model().objects.filter(username__startswith="load.")
+        self.assertEqual(users.count(), 5)
+        self.assertEqual(MeterPoint.objects.count(), 5)
+        self.assertEqual(Invitation.objects.filter(used_by__in=users).count(), 5)
+        self.assertEqual(Contract.objects.filter(user__in=users).count(), 5)
+        self.assertEqual(CustomerProfile.objects.filter(user__in=users).count(), 5)
+        self.assertEqual(Invoice.objects.filter(user__in=users).count(), 15)
+        self.assertEqual(MeterReading.objects.filter(user__in=users).count(), 15)
+        self.assertTrue(self.client.login(username="load.0000001@example.com", password="demo1234"))
+
+    def test_same_seed_produces_same_data(self):
+        call_command("seed_load", customers=3, months=2, stdout=StringIO())
+        first = list(Invoice.objects.order_by("reference").values_list("reference", "consumption_kwh", "amount_eur"))
+
+        call_command("seed_load", customers=3, months=2, batch_size=1, clear=True, stdout=StringIO())
+        second = list(Invoice.objects.order_by("reference").values_list("reference", "consumption_kwh", "amount_eur"))
+        self.assertEqual(first, second)
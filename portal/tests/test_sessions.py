@@ -0,0 +1,72 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+
+class SessionPurgeTests(TestCase):
+    def _session(self, key, expires_in_days):
+        Session.objects.create(
+            session_key=key,
+            session_data="e30:",
+            expire_date=timezone.now() + timedelta(days=expires_in_days),
+        )
+
+    def test_purge_deletes_only_expired_sessions_in_batches(self):
+        for index in range(5):
+            self._session(f"expired{index}", -1)
+        self._session("valid", 1)
+        out = StringIO()
+
+        call_command("purge_sessions", batch_size=2, pause=0, stdout=out)
+
+        self.assertEqual(list(Session.objects.values_list("session_key", flat=True)), ["valid"])
+        self.assertIn("5 sessions expirees supprimees", out.getvalue())
+
+    def test_interval_loop_closes_the_connection_before_sleeping(self):
+        events = []
+
+        def sleep(seconds):
+            events.append("sleep")
+            if len(events) > 2:
+                raise KeyboardInterrupt
+
+        with mock.patch.object(connection, "close", side_effect=lambda: events.append("close")), mock.patch(
+            "portal.management.commands.purge_sessions.time.sleep", side_effect=sleep
+        ):
+            with self.assertRaises(KeyboardInterrupt):
+                call_command("purge_sessions", interval=60, pause=0, stdout=StringIO())
+        self.assertEqual(events, ["close", "sleep", "close", "sleep"])
+
+    @override_settings(SESSION_ENGINE="django.contrib.sessions.backends.signed_cookies")
+    def test_signed_cookies_have_nothing_to_purge(self):
+        out = StringIO()
+        call_command("purge_sessions", stdout=out)
+        self.assertIn("rien a purger", out.getvalue())
+
+
+class SessionEngineTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="alice", password="pass1234")
+
+    def _login_and_browse(self):
+        response = self.client.post(reverse("login"), {"username": "alice", "password": "pass1234"})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.client.get(reverse("client_dashboard")).status_code, 200)
+
+    @override_settings(SESSION_ENGINE="django.contrib.sessions.backends.signed_cookies")
+    def test_signed_cookie_sessions_never_touch_the_session_table(self):
+        self._login_and_browse()
+        self.assertFalse(Session.objects.exists())
+
+    @override_settings(SESSION_ENGINE="django.contrib.sessions.backends.cached_db")
+    def test_cached_db_sessions_still_persisted(self):
+        self._login_and_browse()
+        self.assertEqual(Session.objects.count(), 1)
@@ -0,0 +1,113 @@
+import random
+import unittest
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from portal import simulator, tariffs
+from portal.models import Contract, Invoice, Tariff, TariffPrice
+
+
+@unittest.skipIf(simulator.np is None, "NumPy is not installed")
+class TariffSimulatorTests(TestCase):
+    def setUp(self):
+        self.addCleanup(tariffs.invalidate_tariffs)
+        TariffPrice.objects.create(
+            tariff=Tariff.objects.get(code=Contract.TARIFF_VARIABLE),
+            valid_from=date(2025, 6, 1),
+            unit_price_eur_kwh=Decimal("0.2915"),
+        )
+        rng = random.Random(46)
+        User = get_user_model()
+        self.contracts = []
+        for index in range(20):
+            user = User.objects.create(username=f"client{index}")
+            contract = Contract.objects.create(
+                user=user,
+                reference=f"CTR-SIM-{index}",
+                start_date=date(2024, 1, 1),
+                plan_name="Offre",
+                supply_address="Rue de Test 1, 1000 Bruxelles",
+                tariff_type=Contract.TARIFF_VARIABLE if index % 2 else Contract.TARIFF_FIXED,
+                standing_charge_eur=Decimal(f"{rng.randint(800, 1500)}") / 100,
+                fixed_unit_price_eur_kwh=Decimal(f"{rng.randint(2500, 3200)}") / 10000,
+            )
+            self.contracts.append(contract)
+            for month in range(1, 13):
+                period_end = date(2025, month, 28)
+                consumption = rng.randint(0, 900)
+                total, unit_price, standing = contract.estimate_invoice_amount(consumption, period_end)
+                Invoice.objects.create(
+                    user=user,
+                    reference=f"FAC-SIM-{index}-{month}",
+                    period_start=date(2025, month, 1),
+                    period_end=period_end,
+                    issue_date=period_end,
+                    consumption_kwh=consumption,
+                    unit_price_eur_kwh=unit_price,
+                    standing_charge_eur=standing,
+                    amount_eur=total,
+                )
+
+    def base(self):
+        return simulator.load_base(date(2025, 1, 1), date(2025, 12, 31))
+
+    def test_current_terms_match_decimal_pricing(self):
+        base = self.base()
+        self.assertEqual(len(base), 240)
+        self.assertEqual(simulator.to_eur(base.amounts().sum()), sum(Invoice.objects.values_list("amount_eur", flat=True)))
+
+    def test_candidate_matches_decimal_pricing(self):
+        candidate = {"fixed_price": Decimal("0.3105"), "standing_charge": Decimal("13.37")}
+        expected = Decimal("0")
+        for contract in self.contracts:
+            contract.fixed_unit_price_eur_kwh = candidate["fixed_price"]
+            contract.standing_charge_eur = candidate["standing_charge"]
+            for invoice in Invoice.objects.filter(user=contract.user):
+                expected += contract.estimate_invoice_amount(invoice.consumption_kwh, invoice.period_end)[0]
+        result = simulator.simulate(self.base(), **candidate)
+        self.assertEqual(result["candidate_revenue"], expected)
+        self.assertEqual(result["customers"], 20)
+        self.assertEqual(result["increased"] + result["decreased"] + result["unchanged"], 20)
+
+    def test_half_cent_rounds_up(self):
+        # 5 kWh * 0.2850 = 1.425 EUR -> 1.43 EUR, like ROUND_HALF_UP in estimate_invoice_amount.
+        np = simulator.np
+        self.assertEqual(simulator.amount_cents(np.array([5]), np.array([2850]), np.array([0]))[0], 143)
+        # Negative net kWh (regularization) round away from zero too: -1.425 -> -1.43, -2.415 -> -2.42.
+        self.assertEqual(simulator.amount_cents(np.array([-5, -7]), np.array([2850, 3450]), np.array([0, 0])).tolist(), [-143, -242])
+
+    def test_regularized_invoice_matches_decimal_pricing(self):
+        contract = self.contracts[0]
+        contract.fixed_unit_price_eur_kwh = Decimal("0.2850")
+        contract.save()
+        invoices = list(Invoice.objects.filter(user=contract.user).order_by("period_start"))
+        # Net -5 kWh: 10 kWh measured, 15 kWh over-estimated earlier.
+        invoices[0].consumption_kwh, invoices[0].regularization_kwh = 10, -15
+        for invoice in invoices:
+            net = invoice.consumption_kwh + invoice.regularization_kwh
+            invoice.amount_eur = contract.estimate_invoice_amount(net, invoice.period_end)[0]
+            invoice.save()
+        base = self.base()
+        self.assertEqual(simulator.to_eur(base.amounts().sum()), sum(Invoice.objects.values_list("amount_eur", flat=True)))
+
+    def test_command_and_admin_page(self):
+        out = StringIO()
+        call_command("simulate_tariffs", period_from="2025-01", period_to="2025-12", fixed_price=Decimal("0.30"), stdout=out)
+        self.assertIn("240 factures, 20 clients", out.getvalue())
+
+        admin = get_user_model().objects.create_superuser(username="admin", password="pass1234")
+        self.client.force_login(admin)
+        url = reverse("admin:portal_tariff_simulate")
+        self.assertEqual(self.client.get(url).status_code, 200)
+        response = self.client.post(
+            url, {"period_from": "2025-01", "period_to": "2025-12", "variable_prices": ",".join(["0.30"] * 12)}
+        )
+        self.assertContains(response, "240 factures, 20 clients")
+        response = self.client.post(url, {"period_from": "2025-13", "period_to": "2025-12", "variable_prices": "0.3"})
+        self.assertContains(response, "12 prix positifs")
@@ -0,0 +1,45 @@
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+from django.db import connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import TestCase, TransactionTestCase, override_settings
+
+
+class SQLiteProfileTests(TestCase):
+    def _open(self, tmp_dir):
+        wrapper = DatabaseWrapper({**connection.settings_dict, "NAME": str(Path(tmp_dir) / "profile.sqlite3")})
+        wrapper.ensure_connection()
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def _pragma(self, wrapper, name):
+        with wrapper.cursor() as cursor:
+            cursor.execute(f"PRAGMA {name}")
+            return cursor.fetchone()[0]
+
+    @override_settings(SQLITE_PRODUCTION_PROFILE=True)
+    def test_profile_pragmas_applied_on_connect(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            wrapper = self._open(tmp_dir)
+            self.assertEqual(self._pragma(wrapper, "journal_mode"), "wal")
+            self.assertEqual(self._pragma(wrapper, "synchronous"), 1)
+            self.assertEqual(self._pragma(wrapper, "busy_timeout"), 5000)
+            self.assertEqual(self._pragma(wrapper, "temp_store"), 2)
+            wrapper.close()
+
+    @override_settings(SQLITE_PRODUCTION_PROFILE=False)
+    def test_defaults_untouched_without_profile(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            wrapper = self._open(tmp_dir)
+            self.assertEqual(self._pragma(wrapper, "journal_mode"), "delete")
+            wrapper.close()
+
+
+class SQLiteMaintenanceTests(TransactionTestCase):
+    def test_maintenance_command_runs(self):
+        out = StringIO()
+        call_command("sqlite_maintenance", stdout=out)
+        self.assertIn("optimize OK", out.getvalue())
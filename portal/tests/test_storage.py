@@ -0,0 +1,119 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from portal.models import Attachment, SupportRequest
+from portal import storage
+from portal.storage import DedupFileSystemStorage
+
+
+class DedupStorageTests(SimpleTestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        self.storage = DedupFileSystemStorage(location=self.root)
+
+    def blobs(self):
+        return [path for path in Path(self.root, "blobs").glob("*/*") if not path.name.startswith(".")]
+
+    def test_identical_content_is_stored_once(self):
+        first = self.storage.save("invoices/a.pdf", ContentFile(b"%PDF-1.4 same"))
+        second = self.storage.save("support_attachments/b.pdf", ContentFile(b"%PDF-1.4 same"))
+        self.storage.save("invoices/c.pdf", ContentFile(b"%PDF-1.4 other"))
+
+        self.assertTrue(os.path.samefile(self.storage.path(first), self.storage.path(second)))
+        self.assertEqual(len(self.blobs()), 2)
+        with self.storage.open(second) as handle:
+            self.assertEqual(handle.read(), b"%PDF-1.4 same")
+
+    def test_name_collision_keeps_both_files(self):
+        first = self.storage.save("invoices/a.pdf", ContentFile(b"one"))
+        second = self.storage.save("invoices/a.pdf", ContentFile(b"two"))
+        self.assertNotEqual(first, second)
+        self.assertTrue(second.startswith("invoices/a_"))
+
+    def test_blob_removed_with_last_reference(self):
+        first = self.storage.save("a.pdf", ContentFile(b"shared"))
+        second = self.storage.save("b.pdf", ContentFile(b"shared"))
+        self.storage.delete(first)
+        self.assertEqual(len(self.blobs()), 1)
+        self.storage.delete(second)
+        self.assertEqual(self.blobs(), [])
+        self.assertFalse(self.storage.exists(second))
+
+    def test_delete_finds_the_blob_without_reading_the_file(self):
+        first = self.storage.save("a.pdf", ContentFile(b"tagged"))
+        second = self.storage.save("b.pdf", ContentFile(b"untagged"))
+        if not hasattr(os, "getxattr"):
+            self.skipTest("No extended attributes on this platform")
+        with mock.patch("portal.storage.file_sha256", side_effect=AssertionError("file re-hashed")):
+            self.storage.delete(first)
+        self.assertEqual(len(self.blobs()), 1)
+        # Files linked before digests were recorded on the inode are still hashed.
+        os.removexattr(self.storage.path(second), storage.DIGEST_XATTR)
+        self.storage.delete(second)
+        self.assertEqual(self.blobs(), [])
+
+    def test_dedup_media_links_existing_files(self):
+        for name in ("invoices/a.pdf", "domiciliation/b.pdf"):
+            path = Path(self.root, name)
+            path.parent.mkdir(parents=True)
+            path.write_bytes(b"duplicated document")
+
+        out = StringIO()
+        with self.settings(MEDIA_ROOT=self.root), self.settings(
+            STORAGES={
+                "default": {"BACKEND": "portal.storage.DedupFileSystemStorage"},
+                "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+            }
+        ):
+            call_command("dedup_media", stdout=out)
+
+        self.assertIn("2 fichiers, 2 relies", out.getvalue())
+        self.assertTrue(os.path.samefile(Path(self.root, "invoices/a.pdf"), Path(self.root, "domiciliation/b.pdf")))
+        self.assertEqual(len(self.blobs()), 1)
+
+
+class ShardedUploadTests(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        media_override = override_settings(MEDIA_ROOT=self.root)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+        user = get_user_model().objects.create_user(username="alice", password="pass1234")
+        self.support_request = SupportRequest.objects.create(user=user, subject="Question", message="Bonjour")
+
+    def test_new_uploads_are_sharded(self):
+        attachment = Attachment(support_request=self.support_request)
+        attachment.file.save("releve.pdf", ContentFile(b"%PDF-1.4"))
+        self.assertRegex(attachment.file.name, r"^support_attachments/[0-9a-f]{2}/[0-9a-f]{2}/releve\.pdf$")
+        self.assertTrue(Attachment._meta.get_field("file").upload_to.is_sharded(attachment.file.name))
+
+    def test_shard_media_moves_flat_files(self):
+        names = ["support_attachments/releve.pdf", "support_attachments/scan.png"]
+        for name in names:
+            path = Path(self.root, name)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(name.encode())
+            Attachment.objects.create(support_request=self.support_request, file=name)
+
+        call_command("shard_media", batch_size=1, stdout=StringIO())
+        out = StringIO()
+        call_command("shard_media", stdout=out)
+
+        upload_to = Attachment._meta.get_field("file").upload_to
+        for attachment, old_name in zip(Attachment.objects.order_by("pk"), names):
+            self.assertEqual(attachment.file.name, upload_to.sharded_name(old_name))
+            with attachment.file.open("rb") as handle:
+                self.assertEqual(handle.read(), old_name.encode())
+            self.assertFalse(Path(self.root, old_name).exists())
+        self.assertIn("portal.Attachment.file: 0 fichiers deplaces", out.getvalue())
@@ -0,0 +1,94 @@
+from datetime import date
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from portal import tariffs
+from portal.models import Contract, Tariff, TariffPrice
+
+
+class TariffIndexTests(TestCase):
+    def setUp(self):
+        self.addCleanup(tariffs.invalidate_tariffs)
+        tariffs.invalidate_tariffs()
+        self.tariff = Tariff.objects.get(code=Contract.TARIFF_VARIABLE)
+        user = get_user_model().objects.create_user(username="alice", password="pass1234")
+        self.contract = Contract.objects.create(
+            user=user,
+            reference="CTR-TARIF-1",
+            start_date=date(2025, 1, 1),
+            plan_name="Offre Variable Indexee",
+            tariff_type=Contract.TARIFF_VARIABLE,
+            supply_address="Rue de Test 1, 1000 Bruxelles",
+        )
+
+    def test_seasonal_default_without_prices(self):
+        self.assertEqual(self.contract.unit_price_for_date(date(2025, 1, 31)), Decimal("0.3450"))
+        self.assertEqual(self.contract.unit_price_for_date(date(2025, 7, 31)), Decimal("0.2580"))
+
+    def test_price_valid_until_next_start(self):
+        TariffPrice.objects.create(tariff=self.tariff, valid_from=date(2025, 3, 1), unit_price_eur_kwh=Decimal("0.3000"))
+        TariffPrice.objects.create(tariff=self.tariff, valid_from=date(2025, 6, 15), unit_price_eur_kwh=Decimal("0.2500"))
+
+        self.assertEqual(self.contract.unit_price_for_date(date(2025, 2, 28)), Decimal("0.3380"))
+        self.assertEqual(self.contract.unit_price_for_date(date(2025, 3, 1)), Decimal("0.3000"))
+        self.assertEqual(self.contract.unit_price_for_date(date(2025, 6, 14)), Decimal("0.3000"))
+        self.assertEqual(self.contract.unit_price_for_date(date(2026, 1, 1)), Decimal("0.2500"))
+        total, unit_price, standing_charge = self.contract.estimate_invoice_amount(100, date(2025, 4, 30))
+        self.assertEqual((total, unit_price, standing_charge), (Decimal("42.00"), Decimal("0.3000"), Decimal("12.00")))
+
+    def test_lookups_reuse_the_same_objects(self):
+        TariffPrice.objects.create(tariff=self.tariff, valid_from=date(2025, 1, 1), unit_price_eur_kwh=Decimal("0.3000"))
+        index = tariffs.tariff_index()
+        first = self.contract.unit_price_for_date(date(2025, 5, 1))
+        self.assertIs(self.contract.unit_price_for_date(date(2025, 8, 1)), first)
+        self.assertIs(tariffs.tariff_index(), index)
+        fixed = Contract(tariff_type=Contract.TARIFF_FIXED, fixed_unit_price_eur_kwh=Decimal("0.2850"))
+        self.assertIs(fixed.unit_price_for_date(date(2025, 5, 1)), fixed.fixed_unit_price_eur_kwh)
+
+    def test_change_invalidates_index(self):
+        price = TariffPrice.objects.create(
+            tariff=self.tariff, valid_from=date(2025, 1, 1), unit_price_eur_kwh=Decimal("0.3000")
+        )
+        self.assertEqual(self.contract.unit_price_for_date(date(2025, 5, 1)), Decimal("0.3000"))
+        price.unit_price_eur_kwh = Decimal("0.3100")
+        price.save()
+        self.assertEqual(self.contract.unit_price_for_date(date(2025, 5, 1)), Decimal("0.3100"))
+        price.delete()
+        self.assertEqual(self.contract.unit_price_for_date(date(2025, 5, 1)), Decimal("0.2790"))
+
+    @override_settings(TARIFF_INDEX_CHECK_SECONDS=0)
+    def test_other_process_change_is_picked_up(self):
+        index = tariffs.tariff_index()
+        with self.captureOnCommitCallbacks(execute=True):
+            TariffPrice.objects.create(tariff=self.tariff, valid_from=date(2025, 1, 1), unit_price_eur_kwh=Decimal("0.3000"))
+        # Simulate another worker: its local index is still the old one, only the shared version moved.
+        tariffs._index = index
+        self.assertIsNot(tariffs.tariff_index(), index)
+        self.assertIsNotNone(cache.get(tariffs.VERSION_KEY))
+
+    @override_settings(TARIFF_INDEX_CHECK_SECONDS=0)
+    def test_rolled_back_change_is_not_kept(self):
+        with transaction.atomic():
+            TariffPrice.objects.create(tariff=self.tariff, valid_from=date(2025, 1, 1), unit_price_eur_kwh=Decimal("0.3000"))
+            self.assertEqual(self.contract.unit_price_for_date(date(2025, 5, 1)), Decimal("0.3000"))
+            transaction.set_rollback(True)
+        self.assertEqual(self.contract.unit_price_for_date(date(2025, 5, 1)), Decimal("0.2790"))
+
+    @override_settings(TARIFF_INDEX_CHECK_SECONDS=0)
+    def test_locmem_cache_falls_back_to_the_tables(self):
+        price = TariffPrice.objects.create(
+            tariff=self.tariff, valid_from=date(2025, 1, 1), unit_price_eur_kwh=Decimal("0.3000")
+        )
+        with mock.patch.object(tariffs, "_in_transaction", return_value=False):
+            self.assertEqual(self.contract.unit_price_for_date(date(2025, 5, 1)), Decimal("0.3000"))
+            # Another worker's change: no signal in this process and no shared version key.
+            TariffPrice.objects.filter(pk=price.pk).update(unit_price_eur_kwh=Decimal("0.3100"), updated_at=timezone.now())
+            self.assertEqual(self.contract.unit_price_for_date(date(2025, 5, 1)), Decimal("0.3100"))
+            TariffPrice.objects.filter(pk=price.pk).delete()
+            self.assertEqual(self.contract.unit_price_for_date(date(2025, 5, 1)), Decimal("0.2790"))
@@ -0,0 +1,184 @@
+import shutil
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from portal import tou
+from portal.models import Contract, Invoice, MeterPoint, MeterReading
+from portal.rollups import local_midnight
+
+np = tou.np
+QUARTER = 15 * 60
+
+
+def local_epoch(*args):
+    return int(timezone.make_aware(datetime(*args)).timestamp())
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class TouCalendarTests(TestCase):
+    def test_bihourly_bands_follow_local_time(self):
+        cases = [
+            ((2025, 3, 28, 6, 45), tou.OFFPEAK),  # Friday, before 7:00
+            ((2025, 3, 28, 7, 0), tou.PEAK),
+            ((2025, 3, 28, 21, 45), tou.PEAK),
+            ((2025, 3, 28, 22, 0), tou.OFFPEAK),
+            ((2025, 3, 29, 12, 0), tou.OFFPEAK),  # Saturday
+            ((2025, 3, 30, 12, 0), tou.OFFPEAK),  # Sunday, daylight saving starts
+            ((2025, 3, 31, 7, 0), tou.PEAK),  # Monday, now UTC+2
+            ((2025, 3, 31, 6, 59), tou.OFFPEAK),
+        ]
+        timestamps = [local_epoch(*moment) for moment, _ in cases]
+        self.assertEqual(tou.BIHOURLY.bands(timestamps).tolist(), [band for _, band in cases])
+
+    def test_holidays_are_priced_in_their_band(self):
+        calendar = tou.bihourly_calendar(holidays=[date(2025, 4, 21)])  # Easter Monday
+        self.assertEqual(calendar.bands([local_epoch(2025, 4, 21, 12, 0)]).tolist(), [tou.OFFPEAK])
+        self.assertEqual(calendar.bands([local_epoch(2025, 4, 22, 12, 0)]).tolist(), [tou.PEAK])
+
+    def test_matrix_split_matches_interval_by_interval(self):
+        timestamps = np.arange(local_epoch(2025, 10, 20), local_epoch(2025, 11, 3), QUARTER, dtype=np.int64)
+        kwh = np.random.default_rng(49).random((3, len(timestamps)))
+        expected = np.zeros((3, 2))
+        for position, epoch_second in enumerate(timestamps):
+            moment = timezone.localtime(datetime.fromtimestamp(int(epoch_second), timezone.get_current_timezone()))
+            peak = moment.weekday() < 5 and tou.PEAK_START_HOUR <= moment.hour < tou.PEAK_END_HOUR
+            expected[:, tou.PEAK if peak else tou.OFFPEAK] += kwh[:, position]
+        np.testing.assert_allclose(tou.BIHOURLY.split(timestamps, kwh), expected)
+        np.testing.assert_allclose(tou.BIHOURLY.split(timestamps, kwh[1]), expected[1])
+
+    def test_shared_calendar_is_consistent_across_threads(self):
+        spans = [(local_epoch(2025, month, 1), local_epoch(2025, month + 1, 1)) for month in range(1, 12)]
+        expected = [tou.bihourly_calendar().hour_bands(*span).tolist() for span in spans]
+
+        def bands(index):
+            return tou.BIHOURLY.hour_bands(*spans[index % len(spans)]).tolist()
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(bands, range(200)))
+        self.assertEqual(results, [expected[index % len(spans)] for index in range(200)])
+
+    def test_blended_price_is_computed_once_per_pair(self):
+        first = tou.blended_unit_price(Decimal("0.3150"), Decimal("0.2350"))
+        self.assertEqual(first, Decimal("0.2830"))
+        self.assertIs(tou.blended_unit_price(Decimal("0.3150"), Decimal("0.2350")), first)
+
+    def test_band_amounts_round_half_up(self):
+        kwh, cents = tou.band_amounts_cents([314.5, 0.4], [Decimal("0.3150"), Decimal("0.2350")])
+        self.assertEqual(kwh.tolist(), [315, 0])
+        self.assertEqual(cents.tolist(), [9923, 0])  # 99.225 EUR -> 99.23
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command("bench_time_of_use", meters=3, batch_size=2, year=2025, stdout=out)
+        self.assertIn("intervalles par compteur: 35040", out.getvalue())
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class BihourlyContractTests(TestCase):
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        root_override = override_settings(INTERVAL_DATA_ROOT=Path(root))
+        root_override.enable()
+        self.addCleanup(root_override.disable)
+        User = get_user_model()
+        self.meter_point = MeterPoint.objects.create(
+            ean="541448000000000049",
+            address_line1="Rue de Test 1",
+            postal_code="1000",
+            city="Bruxelles",
+            holder_firstname="Jean",
+            holder_lastname="Martin",
+        )
+        self.user = User.objects.create(username="bihoraire")
+        self.contract = Contract.objects.create(
+            user=self.user,
+            meter_point=self.meter_point,
+            reference="CTR-TOU-1",
+            start_date=date(2024, 1, 1),
+            plan_name="Offre Bihoraire",
+            supply_address="Rue de Test 1, 1000 Bruxelles",
+            tariff_type=Contract.TARIFF_BIHOURLY,
+        )
+
+    def store_march(self):
+        # 1 kWh per hour for the whole local month of March 2025 (743 hours, daylight saving on the 30th).
+        timestamps = np.arange(local_midnight(date(2025, 3, 1)), local_midnight(date(2025, 4, 1)), QUARTER)
+        self.meter_point.intervals.append(timestamps, np.full(len(timestamps), 0.25))
+
+    def test_time_of_use_bill_prices_each_band(self):
+        self.store_march()
+        bill = self.contract.time_of_use_bill(date(2025, 3, 1), date(2025, 3, 31))
+        # 21 weekdays x 15 peak hours; 315 x 0.3150 = 99.23, 428 x 0.2350 = 100.58
+        self.assertEqual(
+            bill.lines,
+            [
+                ("Heures pleines", 315, Decimal("0.3150"), Decimal("99.23")),
+                ("Heures creuses", 428, Decimal("0.2350"), Decimal("100.58")),
+            ],
+        )
+        self.assertEqual(bill.consumption_kwh, 743)
+        self.assertEqual(bill.total, Decimal("211.81"))
+
+    def test_billing_run_uses_interval_data(self):
+        self.store_march()
+        call_command("billing_run", period="2025-03", stdout=StringIO())
+        invoice = Invoice.objects.get(user=self.user)
+        self.assertEqual(invoice.consumption_kwh, 743)
+        self.assertEqual(invoice.amount_eur, Decimal("211.81"))
+        self.assertEqual(invoice.unit_price_eur_kwh, Decimal("0.2689"))
+
+    def test_lagging_interval_feed_is_not_billed_until_complete(self):
+        timestamps = np.arange(local_midnight(date(2025, 3, 1)), local_midnight(date(2025, 4, 1)), QUARTER)
+        kwh = np.full(len(timestamps), 0.25)
+        received = timestamps < local_midnight(date(2025, 3, 28))
+        self.meter_point.intervals.append(timestamps[received], kwh[received])
+        self.assertIsNone(self.contract.time_of_use_bill(date(2025, 3, 1), date(2025, 3, 31)))
+
+        out = StringIO()
+        call_command("billing_run", period="2025-03", stdout=out)
+        self.assertFalse(Invoice.objects.filter(user=self.user).exists())
+        self.assertIn("1 sans releve", out.getvalue())
+
+        # Once the feed catches up, the month is billed in full.
+        self.meter_point.intervals.append(timestamps[~received], kwh[~received])
+        call_command("billing_run", period="2025-03", stdout=StringIO())
+        self.assertEqual(Invoice.objects.get(user=self.user).consumption_kwh, 743)
+
+    def test_gap_month_is_not_priced_as_zero(self):
+        # April missing entirely between March and May.
+        for first, end in ((date(2025, 3, 1), date(2025, 4, 1)), (date(2025, 5, 1), date(2025, 6, 1))):
+            timestamps = np.arange(local_midnight(first), local_midnight(end), QUARTER)
+            self.meter_point.intervals.append(timestamps, np.full(len(timestamps), 0.25))
+        self.assertIsNone(self.contract.time_of_use_bill(date(2025, 4, 1), date(2025, 4, 30)))
+        self.assertIsNone(self.contract.time_of_use_bill(date(2025, 3, 25), date(2025, 4, 2)))
+        self.assertIsNotNone(self.contract.time_of_use_bill(date(2025, 5, 1), date(2025, 5, 31)))
+        call_command("billing_run", period="2025-04", stdout=StringIO())
+        self.assertFalse(Invoice.objects.filter(user=self.user).exists())
+
+        # The feed backfills April: the month is priced from the intervals.
+        timestamps = np.arange(local_midnight(date(2025, 4, 1)), local_midnight(date(2025, 5, 1)), QUARTER)
+        self.meter_point.intervals.append(timestamps, np.full(len(timestamps), 0.25))
+        self.assertEqual(self.contract.time_of_use_bill(date(2025, 4, 1), date(2025, 4, 30)).consumption_kwh, 720)
+
+    def test_without_interval_data_readings_use_blended_price(self):
+        self.assertIsNone(self.contract.time_of_use_bill(date(2025, 3, 1), date(2025, 3, 31)))
+        for reading_date, value in ((date(2025, 2, 28), 1000), (date(2025, 3, 31), 1100)):
+            MeterReading.objects.create(
+                user=self.user, reading_date=reading_date, value_kwh=value, status=MeterReading.STATUS_VALIDATED
+            )
+        call_command("billing_run", period="2025-03", stdout=StringIO())
+        invoice = Invoice.objects.get(user=self.user)
+        # 60 % x 0.3150 + 40 % x 0.2350 = 0.2830; 12.00 + 100 x 0.2830
+        self.assertEqual(invoice.unit_price_eur_kwh, Decimal("0.2830"))
+        self.assertEqual(invoice.amount_eur, Decimal("40.30"))
@@ -0,0 +1,57 @@
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from portal.models import Attachment, Domiciliation, SupportRequest
+from portal.validators import MAX_UPLOAD_SIZE
+
+
+class RestrictedUploadTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media_override = override_settings(MEDIA_ROOT=media_root)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+
+        self.user = get_user_model().objects.create_user(username="alice", password="pass1234")
+        self.client.force_login(self.user)
+
+    def _post_request(self, upload):
+        return self.client.post(
+            reverse("client_requests"),
+            {"subject": "Question", "message": "Bonjour", "attachments": upload},
+        )
+
+    def test_valid_pdf_is_accepted(self):
+        self._post_request(SimpleUploadedFile("facture.pdf", b"%PDF-1.4 contenu"))
+        self.assertEqual(Attachment.objects.count(), 1)
+
+    def test_content_not_matching_extension_is_rejected(self):
+        response = self._post_request(SimpleUploadedFile("facture.pdf", b"\x89PNG\r\n\x1a\n image"))
+
+        self.assertContains(response, "ne correspond pas")
+        self.assertFalse(SupportRequest.objects.exists())
+
+    def test_unknown_extension_is_rejected(self):
+        response = self._post_request(SimpleUploadedFile("script.exe", b"MZ\x90\x00"))
+        self.assertContains(response, "Type de fichier non autoris")
+        self.assertFalse(SupportRequest.objects.exists())
+
+    def test_oversized_file_is_rejected_while_streaming(self):
+        response = self.client.post(
+            reverse("client_direct_debit"),
+            {"document": SimpleUploadedFile("mandat.pdf", b"%PDF-" + b"0" * MAX_UPLOAD_SIZE)},
+        )
+        self.assertContains(response, "dépasse 5 Mo")
+        self.assertFalse(Domiciliation.objects.exists())
+
+    @override_settings(UPLOAD_MAX_REQUEST_SIZE=1024)
+    def test_oversized_request_body_is_not_read(self):
+        response = self._post_request(SimpleUploadedFile("facture.pdf", b"%PDF-" + b"0" * 4096))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(SupportRequest.objects.exists())
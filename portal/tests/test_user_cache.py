@@ -0,0 +1,70 @@
+import os
+import unittest
+
+from django.core.cache import cache
+from django.core.cache.backends.db import DatabaseCache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from portal import routers
+from portal.user_cache import NAMESPACE_KEY, invalidate_user_cache, user_cache_key
+
+DB_CACHE = {"default": {"BACKEND": "django.core.cache.backends.db.DatabaseCache", "LOCATION": "portal_cache"}}
+
+
+class UserCacheNamespaceMixin:
+    def test_invalidation_only_affects_one_user(self):
+        cache.set(user_cache_key(1, "dashboard"), "a")
+        cache.set(user_cache_key(2, "dashboard"), "b")
+
+        invalidate_user_cache(1)
+
+        self.assertIsNone(cache.get(user_cache_key(1, "dashboard")))
+        self.assertEqual(cache.get(user_cache_key(2, "dashboard")), "b")
+
+    def test_evicted_version_never_revives_old_entries(self):
+        old_key = user_cache_key(3, "dashboard")
+        cache.set(old_key, "stale")
+        cache.delete(NAMESPACE_KEY.format(user_id=3))
+
+        self.assertNotEqual(user_cache_key(3, "dashboard"), old_key)
+        invalidate_user_cache(3)
+        self.assertNotEqual(user_cache_key(3, "dashboard"), old_key)
+
+
+class LocMemUserCacheTests(UserCacheNamespaceMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+
+
+@override_settings(CACHES=DB_CACHE)
+class DatabaseUserCacheTests(UserCacheNamespaceMixin, TestCase):
+    def setUp(self):
+        call_command("createcachetable", verbosity=0)
+
+    def test_cache_queries_do_not_pin_to_primary(self):
+        model = DatabaseCache("portal_cache", {}).cache_model_class
+        token = routers._wrote.set(False)
+        try:
+            self.assertEqual(routers.PrimaryReplicaRouter().db_for_write(model), "default")
+            self.assertFalse(routers._wrote.get())
+        finally:
+            routers._wrote.reset(token)
+
+
+# Run against a local Redis-protocol server: docker compose --profile redis up -d redis
+@unittest.skipUnless(os.environ.get("CACHE_TEST_REDIS_URL"), "CACHE_TEST_REDIS_URL not set")
+class RedisUserCacheTests(UserCacheNamespaceMixin, TestCase):
+    def setUp(self):
+        settings_override = override_settings(
+            CACHES={
+                "default": {
+                    "BACKEND": "django.core.cache.backends.redis.RedisCache",
+                    "LOCATION": os.environ.get("CACHE_TEST_REDIS_URL"),
+                    "KEY_PREFIX": "electruc-test",
+                }
+            }
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        cache.clear()
@@ -0,0 +1,40 @@
+from unittest import mock
+
+from django.apps import apps
+from django.db import connections
+from django.template import engines
+from django.test import TestCase, override_settings
+
+from portal import pdf, warmup
+
+
+class WarmupTests(TestCase):
+    def test_warm_up_runs_every_step(self):
+        timings = warmup.warm_up()
+
+        self.assertEqual(set(timings), {"urls", "templates", "pdf", "database"})
+        self.assertIsNotNone(pdf._branding_logo())
+
+    def test_templates_are_compiled_into_cached_loader(self):
+        count = warmup.prime_templates()
+
+        cached_loader = engines["django"].engine.template_loaders[0]
+        self.assertGreater(count, 0)
+        self.assertIn("client/dashboard.html", {key.split("-")[0] for key in cached_loader.get_template_cache})
+
+    def test_server_warms_up_and_closes_connections_only_when_enabled(self):
+        with mock.patch("portal.warmup.warm_up") as warm_up, mock.patch.object(connections, "close_all") as close_all:
+            warmup.warm_up_server()
+            warm_up.assert_not_called()
+
+            with override_settings(PORTAL_WARMUP=True):
+                warmup.warm_up_server()
+            warm_up.assert_called_once_with()
+            close_all.assert_called_once_with()
+
+    @override_settings(PORTAL_WARMUP=True)
+    def test_management_commands_do_not_warm_up(self):
+        # App loading (every manage.py command) never runs the warm-up or its database ping.
+        with mock.patch("portal.warmup.warm_up") as warm_up:
+            apps.get_app_config("portal").ready()
+        warm_up.assert_not_called()
@@ -0,0 +1,25 @@
+"""Project URLs with the async client views in front (same paths and names)."""
+from django.urls import path
+
+from electruc.urls import urlpatterns as project_urlpatterns
+from portal import views_async
+
+urlpatterns = [
+    path("inscription/", views_async.registration_start, name="registration_start"),
+    path("espace-client/", views_async.client_dashboard, name="client_dashboard"),
+    path("espace-client/contrat/", views_async.client_contract, name="client_contract"),
+    path("espace-client/contrat/pdf/", views_async.contract_pdf_download, name="contract_pdf_download"),
+    path("espace-client/contrat/cgv/", views_async.cgv_download, name="cgv_download"),
+    path("espace-client/factures/", views_async.client_invoices, name="client_invoices"),
+    path(
+        "espace-client/factures/<int:invoice_id>/pdf/",
+        views_async.invoice_pdf_download,
+        name="invoice_pdf_download",
+    ),
+    path("espace-client/releves/", views_async.client_readings, name="client_readings"),
+    path(
+        "espace-client/domiciliation/formulaire/",
+        views_async.direct_debit_template_download,
+        name="direct_debit_template_download",
+    ),
+] + project_urlpatterns
@@ -0,0 +1,151 @@
+"""Time-of-use pricing: split interval consumption into tariff bands with NumPy masks and price each band.
+
+A TouCalendar gives the band of every local (weekday, hour) plus dates priced entirely in one band.
+It is turned once per billing span into one band per UTC hour. Belgian offsets are whole hours,
+so every interval of an hour falls in the same band. Consumption of any number of meters sharing
+the same timestamps is then split with a single matrix product against the one-hot band masks.
+"""
+from datetime import date, datetime
+from decimal import ROUND_HALF_UP, Decimal
+from functools import lru_cache
+
+from django.utils import timezone
+
+from . import intervals
+
+np = intervals.np
+HOUR = 3600
+DAY = 86400
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+# Unit prices have 4 decimals: work in 1/10000 EUR per kWh, amounts in cents.
+PRICE_SCALE = 10000
+CENTS_SCALE = 100
+
+PEAK = 0
+OFFPEAK = 1
+BAND_LABELS = ("Heures pleines", "Heures creuses")
+# Bi-hourly meters: peak hours on weekdays from 7:00 to 22:00 (local time), off-peak otherwise.
+PEAK_START_HOUR = 7
+PEAK_END_HOUR = 22
+# Share of consumption in peak hours assumed when a bi-hourly contract has no interval data.
+DEFAULT_PEAK_SHARE = Decimal("0.60")
+
+
+def _utc_offsets(hours):
+    """UTC offset of TIME_ZONE (seconds) at each hour start; probed once a day, hourly on change days."""
+    zone = timezone.get_current_timezone()
+
+    def offset(epoch_second):
+        return int(datetime.fromtimestamp(int(epoch_second), zone).utcoffset().total_seconds())
+
+    offsets = np.empty(len(hours), dtype=np.int64)
+    for first in range(0, len(hours), 24):
+        day = hours[first : first + 24]
+        first_offset, last_offset = offset(day[0]), offset(day[-1])
+        if first_offset == last_offset:
+            offsets[first : first + len(day)] = first_offset
+        else:
+            offsets[first : first + len(day)] = [offset(hour) for hour in day]
+    return offsets
+
+
+class TouCalendar:
+    """Tariff calendar: band index per local (weekday, hour), Monday = 0, and whole-day holidays."""
+
+    def __init__(self, week_table, labels=BAND_LABELS, holidays=(), holiday_band=OFFPEAK):
+        self.week_table = np.asarray(week_table, dtype=np.int8).reshape(7, 24)
+        self.labels = tuple(labels)
+        self.holidays = np.array(sorted(day.toordinal() - EPOCH_ORDINAL for day in holidays), dtype=np.int64)
+        self.holiday_band = holiday_band
+        # ((start, end), bands) of the last span, swapped as one tuple: safe to share across threads.
+        self._cached = None
+
+    @property
+    def band_count(self) -> int:
+        return len(self.labels)
+
+    def hour_bands(self, start, end):
+        """Band of every UTC hour in [start, end) (epoch seconds, whole hours); the last span is kept."""
+        cached = self._cached
+        if cached is None or cached[0] != (start, end):
+            hours = np.arange(start, end, HOUR, dtype=np.int64)
+            local = hours + _utc_offsets(hours)
+            local_days = local // DAY
+            weekdays = (local_days + 3) % 7  # 1970-01-01 was a Thursday
+            bands = self.week_table[weekdays, (local % DAY) // HOUR]
+            if len(self.holidays):
+                bands[np.isin(local_days, self.holidays)] = self.holiday_band
+            cached = self._cached = ((start, end), bands)
+        return cached[1]
+
+    def bands(self, timestamps):
+        """Band of each interval start (epoch seconds)."""
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        if not len(timestamps):
+            return np.zeros(0, dtype=np.int8)
+        start = int(timestamps.min()) // HOUR * HOUR
+        end = int(timestamps.max()) // HOUR * HOUR + HOUR
+        return self.hour_bands(start, end)[(timestamps - start) // HOUR]
+
+    def masks(self, timestamps):
+        """One-hot (intervals x bands) float matrix: kwh @ masks sums consumption per band."""
+        return (self.bands(timestamps)[:, None] == np.arange(self.band_count)).astype(np.float64)
+
+    def split(self, timestamps, kwh):
+        """kWh per band; kwh is one meter (intervals,) or many meters (meters x intervals)."""
+        return np.asarray(kwh, dtype=np.float64) @ self.masks(timestamps)
+
+
+def bihourly_calendar(holidays=()) -> TouCalendar:
+    week_table = np.full((7, 24), OFFPEAK, dtype=np.int8)
+    week_table[:5, PEAK_START_HOUR:PEAK_END_HOUR] = PEAK
+    return TouCalendar(week_table, holidays=holidays)
+
+
+BIHOURLY = bihourly_calendar() if np is not None else None
+
+
+def to_units(value, scale) -> int:
+    return int((Decimal(value) * scale).to_integral_value(rounding=ROUND_HALF_UP))
+
+
+def band_amounts_cents(band_kwh, unit_prices):
+    """(whole kWh, amount in cents) per band: kWh and amounts rounded half-up, like estimate_invoice_amount."""
+    kwh = np.floor(np.asarray(band_kwh, dtype=np.float64) + 0.5).astype(np.int64)
+    units = np.array([to_units(price, PRICE_SCALE) for price in unit_prices], dtype=np.int64)
+    step = PRICE_SCALE // CENTS_SCALE
+    return kwh, (kwh * units + step // 2) // step
+
+
+@lru_cache(maxsize=256)
+def blended_unit_price(peak_price, offpeak_price, peak_share=DEFAULT_PEAK_SHARE) -> Decimal:
+    """Single price of a bi-hourly offer, computed once per price pair (Decimals are immutable)."""
+    price = Decimal(peak_price) * peak_share + Decimal(offpeak_price) * (1 - peak_share)
+    return price.quantize(Decimal("0.0001"), rounding=ROUND_HALF_UP)
+
+
+class TouBill:
+    """Priced bands of one period: lines of (label, kWh, unit price, amount) plus totals."""
+
+    def __init__(self, labels, kwh, cents, unit_prices, standing_charge):
+        self.lines = [
+            (label, int(band_kwh), Decimal(price), Decimal(int(band_cents)) / CENTS_SCALE)
+            for label, band_kwh, band_cents, price in zip(labels, kwh, cents, unit_prices)
+        ]
+        self.consumption_kwh = int(kwh.sum())
+        self.energy_amount = Decimal(int(cents.sum())) / CENTS_SCALE
+        self.standing_charge = Decimal(standing_charge)
+        self.total = self.standing_charge + self.energy_amount
+
+    @property
+    def average_unit_price(self) -> Decimal:
+        """Energy amount per kWh over all bands (stored on the invoice)."""
+        if not self.consumption_kwh:
+            return self.lines[0][2] if self.lines else Decimal("0")
+        return (self.energy_amount / self.consumption_kwh).quantize(Decimal("0.0001"), rounding=ROUND_HALF_UP)
+
+
+def price_intervals(calendar, timestamps, kwh, unit_prices, standing_charge) -> TouBill:
+    """Bill one meter's intervals with one unit price per band of the calendar."""
+    band_kwh, cents = band_amounts_cents(calendar.split(timestamps, kwh), unit_prices)
+    return TouBill(calendar.labels, band_kwh, cents, unit_prices, standing_charge)
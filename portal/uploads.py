@@ -0,0 +1,73 @@
+"""Upload handler rejecting oversized or mislabelled customer files while they stream in."""
+from django.conf import settings
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile, StopUpload
+
+from .validators import ALLOWED_EXTENSIONS, MAGIC_BYTES, MAX_UPLOAD_SIZE, upload_extension
+
+REJECTED_TOO_LARGE = "Le fichier dépasse 5 Mo."
+REJECTED_TYPE = "Type de fichier non autorisé."
+REJECTED_CONTENT = "Le contenu du fichier ne correspond pas à son extension."
+REJECTED_REQUEST = "Envoi trop volumineux."
+
+
+def restrict_uploads(view_func):
+    """Mark a view whose uploads go through RestrictedUploadHandler."""
+    view_func.restrict_uploads = True
+    return view_func
+
+
+def upload_rejections(request) -> dict:
+    """{field name: message} of the files dropped by RestrictedUploadHandler for this request."""
+    return getattr(request, "_upload_rejections", {})
+
+
+def add_upload_errors(request, form):
+    """Report dropped files as form errors (otherwise they would silently be missing)."""
+    for field_name, message in upload_rejections(request).items():
+        form.add_error(field_name if field_name in form.fields else None, message)
+
+
+class RestrictedUploadHandler(FileUploadHandler):
+    """First handler of FILE_UPLOAD_HANDLERS, active for views marked with @restrict_uploads.
+
+    Files with a wrong extension, wrong leading bytes or more than MAX_UPLOAD_SIZE bytes are
+    skipped chunk by chunk (never spooled); a body above UPLOAD_MAX_REQUEST_SIZE is not read at all.
+    """
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        match = getattr(self.request, "resolver_match", None)
+        self.active = bool(match and getattr(match.func, "restrict_uploads", False))
+        self.request_too_large = self.active and content_length > settings.UPLOAD_MAX_REQUEST_SIZE
+        return None
+
+    def new_file(self, field_name, file_name, *args, **kwargs):
+        super().new_file(field_name, file_name, *args, **kwargs)
+        if not self.active:
+            return
+        if self.request_too_large:
+            self._reject(REJECTED_REQUEST)
+            raise StopUpload(connection_reset=True)
+        self.received = 0
+        self.extension = upload_extension(file_name)
+        if self.extension not in ALLOWED_EXTENSIONS:
+            self._reject(REJECTED_TYPE)
+            raise SkipFile()
+
+    def receive_data_chunk(self, raw_data, start):
+        if not self.active:
+            return raw_data
+        if start == 0 and not raw_data.startswith(MAGIC_BYTES[self.extension]):
+            self._reject(REJECTED_CONTENT)
+            raise SkipFile()
+        self.received += len(raw_data)
+        if self.received > MAX_UPLOAD_SIZE:
+            self._reject(REJECTED_TOO_LARGE)
+            raise SkipFile()
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
+
+    def _reject(self, message):
+        rejections = self.request.__dict__.setdefault("_upload_rejections", {})
+        rejections.setdefault(self.field_name, f"{self.file_name}: {message}" if self.file_name else message)
@@ -0,0 +1,29 @@
+"""Per-user cache namespaces: bump one version key to invalidate everything cached for a customer."""
+import time
+
+from django.core.cache import cache
+
+NAMESPACE_KEY = "user-ns:{user_id}"
+
+
+def _initial_version():
+    # Time based, so a namespace whose version key was evicted never reuses an old version.
+    return time.time_ns()
+
+
+def user_namespace(user_id) -> str:
+    version = cache.get_or_set(NAMESPACE_KEY.format(user_id=user_id), _initial_version, timeout=None)
+    return f"user:{user_id}:{version}"
+
+
+def user_cache_key(user_id, name: str) -> str:
+    return f"{user_namespace(user_id)}:{name}"
+
+
+def invalidate_user_cache(user_id):
+    """Make every key built with user_cache_key() for this user unreachable (old entries expire)."""
+    key = NAMESPACE_KEY.format(user_id=user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _initial_version(), timeout=None)
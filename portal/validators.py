@@ -3,6 +3,15 @@ from django.core.exceptions import ValidationError
 
 MAX_UPLOAD_SIZE = 5 * 1024 * 1024  # 5 MB
 ALLOWED_EXTENSIONS = {"pdf", "png", "jpg", "jpeg", "doc", "docx"}
+# Leading bytes expected for each allowed extension (checked on the first upload chunk).
+MAGIC_BYTES = {
+    "pdf": (b"%PDF-",),
+    "png": (b"\x89PNG\r\n\x1a\n",),
+    "jpg": (b"\xff\xd8\xff",),
+    "jpeg": (b"\xff\xd8\xff",),
+    "doc": (b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1",),
+    "docx": (b"PK\x03\x04",),
+}
 
 
 def validate_upload_size(file_obj):
@@ -11,9 +20,12 @@ def validate_upload_size(file_obj):
         raise ValidationError("Le fichier dépasse 5 Mo.")
 
 
+def upload_extension(name) -> str:
+    return name.rsplit(".", 1)[-1].lower() if "." in name else ""
+
+
 def validate_upload_extension(file_obj):
     """Allow only known extensions."""
-    name = getattr(file_obj, "name", "")
-    extension = name.rsplit(".", 1)[-1].lower() if "." in name else ""
+    extension = upload_extension(getattr(file_obj, "name", ""))
     if extension not in ALLOWED_EXTENSIONS:
         raise ValidationError("Type de fichier non autorisé.")
@@ -0,0 +1,186 @@
+"""Async variants of the client views, served under ASGI when PORTAL_ASYNC_VIEWS=1.
+
+Independent queries are gathered, and PDF rendering and password hashing run in the bounded
+blocking pool (portal/executors.py). Templates only receive evaluated data, because lazy
+querysets cannot be evaluated from async code.
+"""
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.contrib.auth.hashers import make_password
+from django.http import Http404
+from django.shortcuts import redirect, render
+
+from .account import aget_account
+from .downloads import stored_file_response
+from .executors import run_blocking
+from .forms import MeterReadingForm, RegistrationForm
+from .models import Invoice, MeterReading
+from .pdf import build_cgv_pdf, build_contract_pdf, build_direct_debit_form_pdf, build_invoice_pdf
+from .rollups import monthly_chart
+from .routers import read_from_replica
+from .views import DASHBOARD_CHART_MONTHS, _pdf_response, _register_customer, _send_activation_email
+
+
+async def _auser(request):
+    """Resolve the user asynchronously and pin it on the request for template rendering."""
+    user = await request.auser()
+    request.user = user
+    request._cached_user = user
+    return user
+
+
+async def _alist(queryset):
+    return [item async for item in queryset]
+
+
+async def _aaccount(request, user):
+    """Load request.account from async code (the lazy one would query synchronously)."""
+    request.account = await aget_account(user)
+    return request.account
+
+
+async def registration_start(request):
+    """Self-registration using EAN + invitation secret code."""
+    user = await _auser(request)
+    if user.is_authenticated:
+        return redirect("client_dashboard")
+
+    if request.method == "POST":
+        form = RegistrationForm(request.POST)
+        if await sync_to_async(form.is_valid)():
+            password_hash = await run_blocking(make_password, form.cleaned_data["password1"])
+            user = await sync_to_async(_register_customer)(form.cleaned_data, password_hash)
+            await sync_to_async(_send_activation_email)(user)
+            return redirect("registration_sent")
+    else:
+        form = RegistrationForm()
+
+    return render(request, "portal/registration_start.html", {"form": form})
+
+
+@read_from_replica
+@login_required
+async def client_dashboard(request):
+    """Client dashboard (protected)."""
+    user = await _auser(request)
+    readings, latest_invoice, invoices_count = await asyncio.gather(
+        _alist(
+            MeterReading.objects.filter(user=user, status=MeterReading.STATUS_VALIDATED)
+            .order_by("-reading_date")[:5]
+        ),
+        Invoice.objects.filter(user=user).order_by("-issue_date").afirst(),
+        Invoice.objects.filter(user=user).acount(),
+    )
+    readings.reverse()
+    account = await _aaccount(request, user)
+    # Rollup files are small: read them in the thread pool rather than on the event loop.
+    chart = await sync_to_async(monthly_chart)(account.meter_point, DASHBOARD_CHART_MONTHS)
+    if chart:
+        chart_labels, chart_values = chart
+    else:
+        chart_labels = [item.reading_date.strftime("%b %Y") for item in readings]
+        chart_values = [item.value_kwh for item in readings]
+    context = {
+        "chart_labels_json": json.dumps(chart_labels),
+        "chart_values_json": json.dumps(chart_values),
+        "chart_from_meter": bool(chart),
+        "validated_readings_count": len(readings),
+        "invoices_count": invoices_count,
+        "latest_invoice": latest_invoice,
+    }
+    return render(request, "client/dashboard.html", context)
+
+
+@read_from_replica
+@login_required
+async def client_contract(request):
+    """Client contract page (protected)."""
+    await _aaccount(request, await _auser(request))
+    return render(request, "client/contract.html")
+
+
+@read_from_replica
+@login_required
+async def client_invoices(request):
+    """Client invoices page (protected)."""
+    user = await _auser(request)
+    invoices = await _alist(Invoice.objects.filter(user=user).order_by("-issue_date"))
+    return render(request, "client/invoices.html", {"invoices": invoices})
+
+
+@read_from_replica
+@login_required
+async def client_readings(request):
+    """Client meter readings page (protected)."""
+    user = await _auser(request)
+    # Estimated indexes do not bind the customer: a real reading may correct them downwards.
+    last_validated = (
+        await MeterReading.objects.filter(user=user, status=MeterReading.STATUS_VALIDATED, is_estimated=False)
+        .order_by("-reading_date")
+        .afirst()
+    )
+
+    if request.method == "POST":
+        form = MeterReadingForm(request.POST, last_validated=last_validated)
+        if form.is_valid():
+            reading = form.save(commit=False)
+            reading.user = user
+            reading.status = MeterReading.STATUS_SUBMITTED
+            await reading.asave()
+            messages.success(request, "Votre releve a ete envoye pour validation.")
+            form = MeterReadingForm(last_validated=last_validated)
+    else:
+        form = MeterReadingForm(last_validated=last_validated)
+
+    readings = await _alist(MeterReading.objects.filter(user=user).order_by("-reading_date"))
+    return render(
+        request,
+        "client/readings.html",
+        {"readings": readings, "form": form, "last_validated": last_validated},
+    )
+
+
+@read_from_replica
+@login_required
+async def invoice_pdf_download(request, invoice_id):
+    """Download the invoice PDF if it belongs to the user."""
+    user = await _auser(request)
+    invoice, account = await asyncio.gather(
+        Invoice.objects.filter(id=invoice_id, user=user).afirst(),
+        _aaccount(request, user),
+    )
+    if invoice is None:
+        raise Http404("Facture introuvable.")
+    if invoice.pdf_file:
+        return stored_file_response(request, invoice.pdf_file)
+    content = await run_blocking(build_invoice_pdf, invoice, user, account.profile)
+    return _pdf_response(content, f"facture-{invoice.reference}.pdf")
+
+
+@read_from_replica
+@login_required
+async def contract_pdf_download(request):
+    """Generate a contract PDF on the fly for the logged-in user."""
+    user = await _auser(request)
+    account = await _aaccount(request, user)
+    contract = account.contract
+    if not contract:
+        raise Http404("Contrat non disponible.")
+    content = await run_blocking(build_contract_pdf, contract, user, account.profile)
+    return _pdf_response(content, f"contrat-{contract.reference}.pdf")
+
+
+@login_required
+async def cgv_download(request):
+    """Download branded CGV PDF."""
+    return _pdf_response(await run_blocking(build_cgv_pdf), "cgv_electruc.pdf")
+
+
+@login_required
+async def direct_debit_template_download(request):
+    """Download a fillable direct debit form (PDF AcroForm)."""
+    return _pdf_response(await run_blocking(build_direct_debit_form_pdf), "domiciliation_electruc_editable.pdf")
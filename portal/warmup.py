@@ -0,0 +1,75 @@
+"""Worker warm-up: pay one-off import, compile and connect costs before the first real request."""
+import logging
+import time
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.template.loader import get_template
+from django.urls import reverse
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_SUFFIXES = {".html", ".txt"}
+
+
+def _project_template_dirs():
+    yield Path(settings.BASE_DIR) / "templates"
+    yield Path(apps.get_app_config("portal").path) / "templates"
+
+
+def prime_templates():
+    """Compile every project template into the cached template loader."""
+    count = 0
+    for directory in _project_template_dirs():
+        for path in sorted(directory.rglob("*")):
+            if path.suffix in TEMPLATE_SUFFIXES:
+                get_template(path.relative_to(directory).as_posix())
+                count += 1
+    return count
+
+
+def prime_pdf():
+    """Render one document: imports reportlab, loads font metrics and resolves the branding logo."""
+    from .pdf import build_cgv_pdf
+
+    build_cgv_pdf()
+
+
+def warm_database():
+    """Open (and health-check) the database connections of the current process."""
+    for alias in connections:
+        try:
+            connections[alias].ensure_connection()
+        except DatabaseError:
+            logger.warning("Warm-up: database %s unreachable", alias, exc_info=True)
+
+
+def warm_up(database=True):
+    """Run every warm-up step and return the time spent per step (seconds)."""
+    steps = [
+        ("urls", lambda: reverse("home")),
+        ("templates", prime_templates),
+        ("pdf", prime_pdf),
+    ]
+    if database:
+        steps.append(("database", warm_database))
+
+    timings = {}
+    for name, step in steps:
+        started = time.perf_counter()
+        step()
+        timings[name] = time.perf_counter() - started
+    logger.info("Warm-up done: %s", ", ".join(f"{name}={value * 1000:.0f}ms" for name, value in timings.items()))
+    return timings
+
+
+def warm_up_server():
+    """Warm up a server process when PORTAL_WARMUP=1 (called by the WSGI/ASGI modules, not by manage.py)."""
+    if not settings.PORTAL_WARMUP:
+        return
+    warm_up()
+    # With gunicorn preload_app this runs in the master: never hand open connections
+    # to forked workers (each worker reconnects in post_fork, see gunicorn.conf.py).
+    connections.close_all()